@@ -0,0 +1,304 @@
+"""
+Benchmarks for the simulation's hot paths, swept over node count, density, walls and communication range.
+
+Each case times one entry point (Network.update_neighbors, World.step, World.is_occupied, WorldGUI.draw_world...) on seeded random
+worlds, so every run measures the same work. Per configuration it records the best time per call, throughput (nodes or lookups
+per second), the memory its setup holds (the world and any lookup tables) and the peak memory allocated by the call itself.
+Across node counts it fits a scaling exponent (1.0 is linear, 2.0 quadratic), which is what catches a hot path going quadratic
+even on a faster or slower machine.
+
+    python benchmark.py --save-baseline benchmark_baseline.json   # record a baseline on this machine
+    python benchmark.py                                             # compare against it, exit status 1 on a regression
+
+draw_world is measured through WorldRenderer, the retained-mode drawing WorldGUI.draw_world delegates to, on a NullCanvas,
+so it runs without tkinter or a display.
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from renderer import WorldRenderer
+from scenario import random_world
+from vector_engine import np
+from world import World
+
+Params = Dict[str, Any]
+Result = Dict[str, Any]
+Case = Callable[[Params], Tuple[Callable[[], None], Callable[[], None], int]] # Returns (prepare, run, operations per run).
+
+DEFAULT_BASELINE = "benchmark_baseline.json"
+SEED = 1234 # Every world is built from this seed, so runs are reproducible.
+PROBES = 10000 # Cells looked up per is_occupied run.
+
+AXES: Dict[str, List[Any]] = {
+    "nodes": [250, 1000, 4000],
+    "density": [0.05, 0.2], # Nodes per cell; the (square) world is sized to match.
+    "walls": [0.0, 0.1], # Fraction of cells that are walls.
+    "comm_range": [2, 4],
+}
+QUICK_AXES: Dict[str, List[Any]] = {"nodes": [250, 1000], "density": [0.05], "walls": [0.0], "comm_range": [2]} # A subset of AXES, so it compares against the same baseline.
+
+
+class NullCanvas:
+    """A canvas that accepts every call the renderer makes and draws nothing, so drawing can be timed without tkinter."""
+
+    def __init__(self):
+        self._next_item: int = 0
+
+    def _create(self, *args: Any, **kwargs: Any) -> int:
+        self._next_item += 1
+        return self._next_item
+
+    create_oval = create_text = create_line = create_rectangle = _create
+
+    def coords(self, *args: Any) -> None:
+        pass
+
+    def itemconfig(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def delete(self, *args: Any) -> None:
+        pass
+
+    def tag_lower(self, *args: Any) -> None:
+        pass
+
+    def tag_raise(self, *args: Any) -> None:
+        pass
+
+
+def make_world(params: Params, vectorized: bool = False) -> World:
+    """Build the seeded random world a configuration describes."""
+    size = max(2, math.ceil(math.sqrt(params["nodes"] / params["density"])))
+    wall_count = int(size * size * params["walls"])
+    return random_world(size, size, params["nodes"], params["comm_range"], wall_count, seed=SEED, vectorized=vectorized)
+
+
+def _nothing() -> None:
+    pass
+
+
+def _tick(world: World) -> None: # This function moves the world on by one step, outside the timed call.
+    moves = world.step()
+    world.apply_moves(moves)
+    world.network.update_neighbors_incremental(node for node, old_pos, new_pos in moves if old_pos != new_pos)
+
+
+def case_update_neighbors(params: Params):
+    world = make_world(params)
+    return _nothing, world.network.update_neighbors, params["nodes"]
+
+
+def case_update_neighbors_incremental(params: Params):
+    world = make_world(params)
+    network = world.network
+    network.update_neighbors()
+    moved = []
+
+    def prepare() -> None:
+        moves = world.step()
+        world.apply_moves(moves)
+        moved[:] = [node for node, old_pos, new_pos in moves if old_pos != new_pos]
+
+    return prepare, lambda: network.update_neighbors_incremental(moved), params["nodes"]
+
+
+def case_step(params: Params):
+    world = make_world(params)
+    return _nothing, world.step, params["nodes"]
+
+
+def case_step_vectorized(params: Params):
+    world = make_world(params, vectorized=True)
+    return _nothing, world.step, params["nodes"]
+
+
+def case_is_occupied(params: Params):
+    world = make_world(params)
+    rng = random.Random(SEED)
+    probes = [(rng.randrange(world.width), rng.randrange(world.height)) for _ in range(PROBES)]
+    is_occupied = world.is_occupied
+
+    def run() -> None:
+        for pos in probes:
+            is_occupied(pos)
+
+    return _nothing, run, PROBES
+
+
+def case_draw_world_initial(params: Params):
+    world = make_world(params)
+    world.network.update_neighbors()
+    renderers = []
+
+    def prepare() -> None:
+        for renderer in renderers:
+            world.network.remove_link_listener(renderer.apply_link_delta)
+        renderers[:] = [WorldRenderer(NullCanvas(), world, 60)]
+
+    return prepare, lambda: renderers[0].sync(), params["nodes"]
+
+
+def case_draw_world_tick(params: Params):
+    world = make_world(params)
+    world.network.update_neighbors()
+    renderer = WorldRenderer(NullCanvas(), world, 60)
+    renderer.sync()
+    return lambda: _tick(world), renderer.sync, params["nodes"]
+
+
+CASES: Dict[str, Case] = {
+    "update_neighbors": case_update_neighbors,
+    "update_neighbors_incremental": case_update_neighbors_incremental,
+    "step": case_step,
+    "step_vectorized": case_step_vectorized,
+    "is_occupied": case_is_occupied,
+    "draw_world_initial": case_draw_world_initial,
+    "draw_world_tick": case_draw_world_tick,
+}
+
+
+def configurations(axes: Dict[str, List[Any]]) -> List[Params]:
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*(axes[name] for name in names))]
+
+
+def key(case: str, params: Params) -> str:
+    return case + "[" + ",".join(f"{name}={value}" for name, value in sorted(params.items())) + "]"
+
+
+def measure(case: Case, params: Params, repeats: int) -> Result:
+    """Time one case on one configuration (best of repeats), then measure its memory in a separate, untimed pass."""
+    prepare, run, operations = case(params)
+    best = math.inf
+    for _ in range(repeats):
+        prepare()
+        gc.collect()
+        gc.disable() # Keep collector pauses out of the timings.
+        try:
+            started = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - started)
+        finally:
+            gc.enable()
+    # Memory is traced separately, as tracing slows every allocation down.
+    tracemalloc.start()
+    try:
+        prepare, run, operations = case(params)
+        setup_bytes = tracemalloc.get_traced_memory()[0]
+        prepare()
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        run()
+        peak_bytes = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return {
+        "ms_per_call": best * 1000,
+        "ops_per_sec": operations / best if best > 0 else math.inf,
+        "setup_kb": setup_bytes / 1024,
+        "peak_kb": peak_bytes / 1024,
+    }
+
+
+def scaling(results: Dict[str, Result], runs: List[Tuple[str, Params]]) -> Dict[str, float]:
+    """
+    Fit how time per call grows with node count for each case and each setting of the other axes:
+    the exponent of a straight line through (log nodes, log time) from the smallest to the largest node count.
+    """
+    groups: Dict[str, List[Tuple[int, float]]] = {}
+    for case, params in runs:
+        others = {name: value for name, value in params.items() if name != "nodes"}
+        groups.setdefault(key(case, others), []).append((params["nodes"], results[key(case, params)]["ms_per_call"]))
+    exponents = {}
+    for group, points in groups.items():
+        points.sort()
+        (n1, t1), (n2, t2) = points[0], points[-1]
+        if n2 > n1 and t1 > 0 and t2 > 0:
+            exponents[group.replace("[", f"[nodes={n1}..{n2},", 1)] = math.log(t2 / t1) / math.log(n2 / n1) # Keyed by the node span, as exponents over different spans don't compare.
+    return exponents
+
+
+def run_suite(cases: List[str], axes: Dict[str, List[Any]], repeats: int = 5, progress: Optional[Callable[[str, Result], None]] = None) -> Dict[str, Any]:
+    """Run every case on every configuration. Returns {"results": {key: metrics}, "scaling": {group: exponent}}."""
+    runs = []
+    results: Dict[str, Result] = {}
+    for case in cases:
+        if case == "step_vectorized" and np is None:
+            continue # The vectorized engine needs NumPy.
+        for params in configurations(axes):
+            result = measure(CASES[case], params, repeats)
+            results[key(case, params)] = result
+            runs.append((case, params))
+            if progress is not None:
+                progress(key(case, params), result)
+    return {"results": results, "scaling": scaling(results, runs)}
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], time_tolerance: float = 0.5, memory_tolerance: float = 0.25,
+            exponent_tolerance: float = 0.3) -> List[str]:
+    """
+    Compare a run against a baseline and describe every regression: a call that got slower or allocates more than the tolerance
+    allows, or a scaling exponent that grew (e.g. a linear path turning quadratic). Entries missing from either side are skipped.
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        if result["ms_per_call"] > before["ms_per_call"] * (1 + time_tolerance):
+            regressions.append(f"{name}: {result['ms_per_call']:.3f} ms per call, baseline {before['ms_per_call']:.3f} ms")
+        for metric in ("setup_kb", "peak_kb"):
+            if result[metric] > before[metric] * (1 + memory_tolerance) + 64: # A little slack, so tiny allocations don't flap.
+                regressions.append(f"{name}: {metric} {result[metric]:.0f}, baseline {before[metric]:.0f}")
+    for group, exponent in current["scaling"].items():
+        before = baseline.get("scaling", {}).get(group)
+        if before is not None and exponent > before + exponent_tolerance:
+            regressions.append(f"{group}: scales as nodes^{exponent:.2f}, baseline nodes^{before:.2f}")
+    return regressions
+
+
+def _print_result(name: str, result: Result) -> None:
+    print(f"{name:<95} {result['ms_per_call']:>10.3f} ms {result['ops_per_sec']:>14,.0f}/s {result['setup_kb']:>10.0f} KB setup {result['peak_kb']:>9.0f} KB peak")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the simulation's hot paths and compare them against a stored baseline.")
+    parser.add_argument("--case", action="append", choices=list(CASES), help="Only run this case (repeatable). Defaults to every case.")
+    parser.add_argument("--quick", action="store_true", help="Run a small sweep (two node counts, one setting of every other axis).")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per configuration; the best is kept.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline to compare against, if the file exists.")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Save this run's results as a baseline instead of comparing.")
+    parser.add_argument("--time-tolerance", type=float, default=0.5, help="How much slower (as a fraction) a call may get before it counts as a regression.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.case or list(CASES), QUICK_AXES if args.quick else AXES, args.repeats, None if args.json else _print_result)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for group, exponent in sorted(report["scaling"].items()):
+            print(f"{group:<95} scales as nodes^{exponent:.2f}")
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump(report, baseline_file, indent=2, sort_keys=True)
+        return 0
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline, encoding="utf-8") as baseline_file:
+        regressions = compare(report, json.load(baseline_file), args.time_tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,370 @@
+"""
+A shared-memory bridge between a simulation running in its own process and a GUI drawing it.
+
+The simulation process owns the World: it steps it at its own pace, and after every tick publishes a frame (each node's position
+and adhoc flag, and every directed link) into a double-buffered multiprocessing.shared_memory block. The GUI process holds a
+RemoteWorld, a read-only stand-in for the World (like recording.TraceReplay) whose refresh() reads the latest complete frame straight
+out of shared memory and moves its nodes to match, so a heavy tick never freezes rendering and a slow render never throttles the simulation.
+User actions (run, pause, step, toggle adhoc, send a message, open an inbox) go back to the simulation over a command queue; simulation
+events (messages sent, warnings) and inbox contents come back over an event queue and are re-emitted into this process's event log.
+
+    world = RemoteWorld(build_world, arguments...)   # build_world(arguments...) runs in the simulation process and returns a World
+    WorldGUI(world).run()
+
+Frames are written with a per-slot sequence number (odd while the slot is being written), so a reader that raced a writer
+simply reads again: the writer alternates slots, so it only ever touches the slot a reader could be on every other tick.
+"""
+
+import itertools
+import multiprocessing
+import queue
+import time
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from eventlog import INFO, WARNING, log
+from network import LinkDelta, Network
+from node import Node
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, only the bridge needs it.
+    np = None
+
+HEADER = 4 # int64s at the start of each slot: sequence number, tick, link count, and whether the links were truncated.
+LINKS_PER_NODE = 64 # Link capacity per node in the frame buffer. Frames with more links than this times the node count are truncated (and flagged as such).
+IndexLink = Tuple[int, int]
+
+
+class Frame(NamedTuple):
+    """Views of one slot of a FrameBuffer (not copies: check FrameBuffer.unchanged after reading them)."""
+    slot: int
+    sequence: int
+    tick: int
+    positions: 'np.ndarray' # (node count, 2) int32.
+    adhoc: 'np.ndarray' # (node count,) uint8.
+    links: 'np.ndarray' # (link count, 2) int32 node indexes, one row per directed link.
+    truncated: bool # True if the world had more links than the buffer can hold, so some are missing.
+
+
+class FrameBuffer:
+    """
+    Two frame slots in one shared memory block, plus the index of the latest complete one.
+    The writer always fills the slot that isn't the latest, then flips the latest index; readers always read the latest.
+    """
+
+    def __init__(self, memory: shared_memory.SharedMemory, nodes: int, link_capacity: int, owner: bool):
+        if np is None:
+            raise ImportError("The shared-memory bridge requires NumPy. Install it with 'pip install numpy'.")
+        self.memory = memory
+        self.nodes: int = nodes
+        self.link_capacity: int = link_capacity
+        self.owner: bool = owner # Whether closing this buffer also unlinks the block.
+        self._latest = np.ndarray((1,), dtype=np.int64, buffer=memory.buf) # Which slot (0 or 1) holds the latest complete frame, or -1 for none yet.
+        slot_size = self.slot_size(nodes, link_capacity)
+        self._slots = []
+        for slot in range(2):
+            offset = 8 + slot * slot_size
+            header = np.ndarray((HEADER,), dtype=np.int64, buffer=memory.buf, offset=offset)
+            positions = np.ndarray((nodes, 2), dtype=np.int32, buffer=memory.buf, offset=offset + HEADER * 8)
+            links = np.ndarray((link_capacity, 2), dtype=np.int32, buffer=memory.buf, offset=offset + HEADER * 8 + nodes * 8)
+            adhoc = np.ndarray((nodes,), dtype=np.uint8, buffer=memory.buf, offset=offset + HEADER * 8 + nodes * 8 + link_capacity * 8)
+            self._slots.append((header, positions, adhoc, links))
+
+    @staticmethod
+    def slot_size(nodes: int, link_capacity: int) -> int:
+        return HEADER * 8 + nodes * 8 + link_capacity * 8 + nodes
+
+    @classmethod
+    def create(cls, nodes: int, link_capacity: int) -> 'FrameBuffer':
+        memory = shared_memory.SharedMemory(create=True, size=8 + 2 * cls.slot_size(nodes, link_capacity))
+        buffer = cls(memory, nodes, link_capacity, owner=True)
+        buffer._latest[0] = -1
+        return buffer
+
+    @classmethod
+    def attach(cls, name: str, nodes: int, link_capacity: int) -> 'FrameBuffer':
+        return cls(shared_memory.SharedMemory(name=name), nodes, link_capacity, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def publish(self, tick: int, positions: List[Tuple[int, int]], adhoc: List[bool], links: List[IndexLink]) -> None:
+        """Write a frame into the slot readers aren't on, then make it the latest."""
+        slot = 1 if self._latest[0] == 0 else 0
+        header, slot_positions, slot_adhoc, slot_links = self._slots[slot]
+        header[0] += 1 # Odd: being written.
+        if positions:
+            slot_positions[:] = positions
+            slot_adhoc[:] = adhoc
+        count = min(len(links), self.link_capacity)
+        if count:
+            slot_links[:count] = links[:count]
+        header[1] = tick
+        header[2] = count
+        header[3] = len(links) > count
+        header[0] += 1 # Even: complete.
+        self._latest[0] = slot
+
+    def latest(self) -> Optional[Frame]:
+        """The latest complete frame, as views into shared memory, or None if nothing has been published yet."""
+        for _ in range(100):
+            slot = int(self._latest[0])
+            if slot < 0:
+                return None
+            header, positions, adhoc, links = self._slots[slot]
+            sequence = int(header[0])
+            if sequence % 2 == 0:
+                return Frame(slot, sequence, int(header[1]), positions, adhoc, links[:int(header[2])], bool(header[3]))
+            time.sleep(0) # The writer lapped this reader and is rewriting the slot right now; let it finish.
+        return None
+
+    def unchanged(self, frame: Frame) -> bool:
+        """Whether a frame's slot still holds that frame, i.e. whatever was read from its views is consistent."""
+        return int(self._slots[frame.slot][0][0]) == frame.sequence
+
+    def close(self) -> None:
+        self._slots = self._latest = None # Views have to go before the memory can be closed.
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+class RemoteWorld:
+    """
+    A stand-in for a World whose simulation runs in another process (see the module docstring). It holds one Node per simulated node
+    inside a real Network (so the renderer's link listener works unchanged), and refresh() brings them in line with the latest frame.
+    The GUI can't change it directly: toggle_adhoc, send_message, step and set_running ask the simulation process to.
+    """
+
+    def __init__(self, build: Callable[..., Any], *arguments: Any, ticks_per_second: float = 2.0, forward_level: int = INFO):
+        if np is None:
+            raise ImportError("The shared-memory bridge requires NumPy. Install it with 'pip install numpy'.")
+        context = multiprocessing.get_context("spawn") # A fresh interpreter, so nothing of this process (e.g. Tk) leaks into the simulation.
+        self.commands = context.Queue() # (command, arguments...) tuples to the simulation process.
+        self.events = context.Queue() # (kind, payload) tuples from it.
+        self.process = context.Process(target=_simulate, args=(build, arguments, self.commands, self.events, ticks_per_second, forward_level),
+                                       name="simulation", daemon=True)
+        self.process.start()
+        while True: # The simulation describes its world first.
+            try:
+                kind, info = self.events.get(timeout=0.5)
+                break
+            except queue.Empty:
+                if not self.process.is_alive():
+                    kind, info = "failed", f"exit code {self.process.exitcode}"
+                    break
+        if kind == "failed":
+            self.process.join()
+            raise RuntimeError(f"The simulation process failed to start:\n{info}")
+        self.width: int = info["width"]
+        self.height: int = info["height"]
+        self.walls: List[Tuple[int, int]] = [tuple(wall) for wall in info["walls"]]
+        self.table: List[Node] = [Node(entry["id"], entry["name"], tuple(entry["position"]), entry["comm_range"], entry["color"]) for entry in info["nodes"]]
+        self.network: Network = Network()
+        self.network.nodes.replace(self.table)
+        self.frames: FrameBuffer = FrameBuffer.attach(info["frames"], len(self.table), info["link_capacity"])
+        self.tick: int = -1 # The tick of the frame currently shown, -1 before the first.
+        self._frame: Tuple[int, int] = (-1, -1) # The (slot, sequence) of the frame currently shown. A toggle republishes the same tick, so ticks alone can't tell frames apart.
+        self.truncated: bool = False # Whether the frame shown is missing links (the world outgrew the buffer's link capacity).
+        # What the frame currently shown holds, as arrays, so a new frame is diffed against it in NumPy and only changed nodes and links are touched in Python.
+        self._positions = np.array([node.position for node in self.table], dtype=np.int32).reshape(-1, 2)
+        self._adhoc = np.ones(len(self.table), dtype=np.uint8) # Nodes start with adhoc enabled.
+        self._link_codes = np.empty(0, dtype=np.int64) # Every link shown, encoded as node * node count + neighbor, sorted.
+        self._replies: Dict[int, Callable[[Any], None]] = {} # Callbacks waiting on a reply from the simulation, by request id.
+        self._request_ids = itertools.count()
+        self.refresh()
+
+    def node_at(self, pos: Tuple[int, int]) -> Optional[Node]:
+        return self.network.nodes.at(pos)
+
+    def refresh(self) -> Optional[List[Tuple[Node, Tuple[int, int], Tuple[int, int]]]]:
+        """
+        Show the latest frame: set every node's position, adhoc flag and neighbors, and send the link changes to the network's
+        link listeners. Returns (node, old_pos, new_pos) for nodes that moved, like World.step, or None if there is no new frame
+        (a frame republished after a toggle has the same tick as the one before it, and no moves).
+        """
+        count = len(self.table)
+        for _ in range(10):
+            frame = self.frames.latest()
+            if frame is None or (frame.slot, frame.sequence) == self._frame:
+                return None
+            # Compare the shared memory views with the frame shown, copying out only the rows that changed.
+            # If the writer lapped us meanwhile, read again.
+            moved = np.flatnonzero((frame.positions != self._positions).any(axis=1))
+            positions = frame.positions[moved]
+            toggled = np.flatnonzero(frame.adhoc != self._adhoc)
+            adhoc = frame.adhoc[toggled]
+            link_codes = np.unique(frame.links[:, 0].astype(np.int64) * count + frame.links[:, 1])
+            if self.frames.unchanged(frame):
+                break
+        else:
+            return None
+        up = np.setdiff1d(link_codes, self._link_codes, assume_unique=True)
+        down = np.setdiff1d(self._link_codes, link_codes, assume_unique=True)
+        self._positions[moved] = positions
+        self._adhoc[toggled] = adhoc
+        self._link_codes = link_codes
+        table = self.table
+        nodes = self.network.nodes
+        moves = []
+        for index, (x, y) in zip(moved.tolist(), positions.tolist()):
+            node = table[index]
+            moves.append((node, node.position, (x, y)))
+            nodes.moved(node, node.position, (x, y))
+            node._position = (x, y)
+        for index, enabled in zip(toggled.tolist(), adhoc.tolist()):
+            table[index].adhoc_enabled = bool(enabled)
+        up = [divmod(code, count) for code in up.tolist()]
+        down = [divmod(code, count) for code in down.tolist()]
+        for index, neighbor in down:
+            table[index]._neighbors.remove(table[neighbor])
+        for index, neighbor in up:
+            table[index]._neighbors.append(table[neighbor])
+        if frame.truncated and not self.truncated and log.threshold <= WARNING:
+            log.emit(WARNING, "bridge.truncated", f"The world has more links than the frame buffer holds ({self.frames.link_capacity}); some aren't shown.")
+        self.truncated = frame.truncated
+        self.tick = frame.tick
+        self._frame = (frame.slot, frame.sequence)
+        self.network._notify_link_listeners(LinkDelta({(table[a], table[b]) for a, b in up}, {(table[a], table[b]) for a, b in down}))
+        return moves
+
+    def poll(self) -> None:
+        """Handle whatever the simulation process has sent: re-emit its events into this process's log, and run reply callbacks."""
+        while True:
+            try:
+                kind, payload = self.events.get_nowait()
+            except queue.Empty:
+                return
+            if kind == "event":
+                level, event_kind, message, fields = payload
+                if log.threshold <= level:
+                    log.emit(level, event_kind, message, **fields)
+            elif kind == "reply":
+                request_id, value = payload
+                callback = self._replies.pop(request_id, None)
+                if callback is not None:
+                    callback(value)
+            elif kind == "failed":
+                if log.threshold <= WARNING:
+                    log.emit(WARNING, "bridge.failed", f"The simulation process stopped with an error:\n{payload}")
+
+    # Commands, carried out by the simulation process; their effects show up in later frames.
+
+    def request_step(self) -> None:
+        self.commands.put(("step",))
+
+    def set_running(self, running: bool, ticks_per_second: Optional[float] = None) -> None:
+        self.commands.put(("run" if running else "pause", ticks_per_second))
+
+    def set_rate(self, ticks_per_second: float) -> None:
+        self.commands.put(("rate", ticks_per_second))
+
+    def toggle_adhoc(self, node: Node) -> None:
+        self.commands.put(("toggle_adhoc", node.node_id))
+
+    def send_message(self, sender: Node, target: Node, message: str) -> None:
+        self.commands.put(("send", sender.node_id, target.node_id, message))
+
+    def request_inbox(self, node: Node, callback: Callable[[List[Tuple[int, str]]], None]) -> None:
+        """Ask for a node's inbox; callback receives its (sender id, message) pairs from a later poll()."""
+        request_id = next(self._request_ids)
+        self._replies[request_id] = callback
+        self.commands.put(("inbox", request_id, node.node_id))
+
+    def close(self) -> None:
+        """Stop the simulation process and let go of the frame buffer. Closing twice does nothing."""
+        if self.frames is None:
+            return
+        if self.process.is_alive():
+            self.commands.put(("stop",))
+            self.process.join(5)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.frames.close()
+        self.frames = None
+
+
+def _simulate(build: Callable[..., Any], arguments: tuple, commands, events, ticks_per_second: float, forward_level: int) -> None:
+    """The simulation process: build the world, then step it and publish frames while carrying out the GUI's commands."""
+    import traceback
+    frames = None
+    try:
+        world = build(*arguments)
+        network = world.network
+        table = list(network.nodes)
+        index = {node: position for position, node in enumerate(table)}
+        link_capacity = min(len(table) * (len(table) - 1), LINKS_PER_NODE * len(table)) # Every possible link for tiny worlds, a fixed budget per node otherwise (overflow is flagged as truncated).
+        frames = FrameBuffer.create(len(table), max(1, link_capacity))
+        log.subscribe(lambda event: events.put(("event", (event.level, event.kind, event.message, event.fields))), forward_level)
+        network.update_neighbors()
+        events.put(("world", {
+            "width": world.width, "height": world.height, "walls": [list(wall) for wall in world.walls],
+            "frames": frames.name, "link_capacity": frames.link_capacity,
+            "nodes": [{"id": node.node_id, "name": node.node_name, "position": list(node.position), "comm_range": node.comm_range,
+                       "color": node.base_color} for node in table],
+        }))
+    except Exception:
+        if frames is not None:
+            frames.close()
+        events.put(("failed", traceback.format_exc()))
+        return
+
+    def publish() -> None:
+        links = [(index[node], index[neighbor]) for node in table for neighbor in node.neighbors if neighbor in index]
+        frames.publish(tick, [node.position for node in table], [node.adhoc_enabled for node in table], links)
+
+    def step() -> None:
+        nonlocal tick
+        moves = world.step()
+        world.apply_moves(moves)
+        network.update_neighbors_incremental(node for node, old_pos, new_pos in moves if old_pos != new_pos)
+        tick += 1
+        publish()
+
+    tick = 0
+    publish()
+    running = False
+    period = 1 / ticks_per_second
+    due = time.perf_counter()
+    try:
+        while True:
+            timeout = max(0.0, due - time.perf_counter()) if running else None
+            try:
+                command = commands.get(timeout=timeout)
+            except queue.Empty:
+                command = None
+            if command is not None:
+                name = command[0]
+                if name == "stop":
+                    break
+                elif name == "step":
+                    step()
+                elif name in ("run", "pause"):
+                    running = name == "run"
+                    if command[1]:
+                        period = 1 / command[1]
+                    due = time.perf_counter()
+                elif name == "rate":
+                    period = 1 / command[1]
+                elif name == "toggle_adhoc":
+                    node = network.nodes.get(command[1])
+                    if node is not None:
+                        node.adhoc_enabled = not node.adhoc_enabled
+                        network.update_neighbors_incremental([node])
+                        publish()
+                elif name == "send":
+                    sender, target = network.nodes.get(command[1]), network.nodes.get(command[2])
+                    if sender is not None and target is not None:
+                        network.send_message(sender, target, command[3])
+                elif name == "inbox":
+                    node = network.nodes.get(command[2])
+                    events.put(("reply", (command[1], list(node.messages) if node is not None else [])))
+            if running and time.perf_counter() >= due:
+                step()
+                # Keep the target rate, but don't try to catch up on ticks a slow step already missed.
+                due = max(due + period, time.perf_counter())
+    except Exception:
+        events.put(("failed", traceback.format_exc()))
+    finally:
+        frames.close()
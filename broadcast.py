@@ -0,0 +1,247 @@
+"""
+Network-wide broadcast: simple flooding, probabilistic gossip and counter-based suppression.
+
+A broadcast starts at one node and spreads hop by hop as scheduled events: a node that transmits reaches every node in its
+neighbor list hop_latency later. Every node keeps a bounded seen-message cache (an LRU of message ids), so each copy a node hears
+is checked for duplicates in constant time and only the first one is delivered or considered for forwarding. How many nodes
+forward what they hear is up to the forwarding strategy:
+
+    Flooding()                 every node forwards once
+    Gossip(0.7)                every node forwards with probability 0.7
+    CounterSuppression(3, 1.0) every node waits a random delay of up to 1.0, and only forwards if it heard fewer than 3 copies meanwhile
+
+    broadcaster = Broadcaster(world.network, CounterSuppression(3), seed=1)
+    report = broadcaster.broadcast(source, "hello")
+    print(report.reached, report.redundant)
+"""
+
+import random
+from collections import OrderedDict
+from typing import Callable, Dict, NamedTuple, Optional
+from eventlog import INFO, log
+from metrics import metrics
+from network import Network
+from node import Node
+from scheduler import EventScheduler
+
+
+class SeenCache:
+    """The ids of the most recent messages a node has seen, forgetting the least recently seen once capacity is reached."""
+    __slots__ = ("_ids", "capacity")
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("A seen-message cache needs room for at least one id.")
+        self._ids: OrderedDict = OrderedDict()
+        self.capacity: int = capacity
+
+    def add(self, message_id: int) -> bool:
+        """Mark a message id as seen. Returns False if it had already been seen (a duplicate)."""
+        ids = self._ids
+        if message_id in ids:
+            ids.move_to_end(message_id)
+            return False
+        ids[message_id] = None
+        if len(ids) > self.capacity:
+            ids.popitem(last=False)
+        return True
+
+    def __contains__(self, message_id: int) -> bool:
+        return message_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+class Flooding:
+    """Simple flooding: every node forwards the first copy it hears, straight away."""
+
+    def forward_delay(self, rng: random.Random) -> float: # This function returns how long a node waits before deciding whether to forward.
+        return 0.0
+
+    def should_forward(self, rng: random.Random, duplicates: int) -> bool: # This function decides, given the copies heard while waiting.
+        return True
+
+
+class Gossip(Flooding):
+    """Probabilistic gossip: every node forwards the first copy it hears with a fixed probability."""
+
+    def __init__(self, probability: float = 0.7):
+        if not 0.0 <= probability <= 1.0:
+            raise ValueError("The gossip probability must be between 0 and 1.")
+        self.probability: float = probability
+
+    def should_forward(self, rng: random.Random, duplicates: int) -> bool:
+        return rng.random() < self.probability
+
+
+class CounterSuppression(Flooding):
+    """
+    Counter-based suppression: a node waits a random assessment delay after its first copy, counting further copies,
+    and only forwards if it heard fewer than threshold copies in total (dense areas suppress most rebroadcasts).
+    """
+
+    def __init__(self, threshold: int = 3, max_delay: float = 1.0):
+        if threshold < 1:
+            raise ValueError("The suppression threshold must be at least 1.")
+        self.threshold: int = threshold
+        self.max_delay: float = max_delay # Upper bound of the random assessment delay.
+
+    def forward_delay(self, rng: random.Random) -> float:
+        return rng.uniform(0.0, self.max_delay)
+
+    def should_forward(self, rng: random.Random, duplicates: int) -> bool:
+        return 1 + duplicates < self.threshold
+
+
+class DisseminationReport(NamedTuple):
+    """What one broadcast achieved."""
+    message_id: int
+    reached: int # Nodes that received the message, including the source.
+    reachable: int # Nodes the message could have reached over the links at the time it was sent, including the source.
+    transmissions: int # Times any node transmitted it (the source's first transmission included).
+    receptions: int # Copies received in total.
+    redundant: int # Copies received by nodes that had already seen the message.
+    suppressed: int # Nodes that heard the message but decided not to forward it.
+    duration: float # Simulated time from the first transmission to the last reception.
+
+    @property
+    def coverage(self) -> float:
+        return self.reached / self.reachable if self.reachable else 0.0
+
+
+class _Dissemination:
+    """The bookkeeping of one broadcast in progress."""
+    __slots__ = ("message_id", "source", "message", "started", "finished", "reached", "reachable", "transmissions", "receptions",
+                 "redundant", "suppressed", "waiting", "pending", "on_done")
+
+    def __init__(self, message_id: int, source: Node, message: str, started: float, reachable: int,
+                 on_done: Optional[Callable[[DisseminationReport], None]]):
+        self.message_id: int = message_id
+        self.source: Node = source
+        self.message: str = message
+        self.started: float = started
+        self.finished: float = started
+        self.reached: int = 1
+        self.reachable: int = reachable
+        self.transmissions: int = 0
+        self.receptions: int = 0
+        self.redundant: int = 0
+        self.suppressed: int = 0
+        self.waiting: Dict[Node, int] = {} # Nodes deciding whether to forward, and how many duplicates they've heard so far.
+        self.pending: int = 0 # Events still scheduled for this broadcast; it is finished when this reaches 0.
+        self.on_done = on_done
+
+    def report(self) -> DisseminationReport:
+        return DisseminationReport(self.message_id, self.reached, self.reachable, self.transmissions, self.receptions,
+                                   self.redundant, self.suppressed, self.finished - self.started)
+
+
+class Broadcaster:
+    """
+    Disseminates messages across a network with a forwarding strategy (Flooding by default).
+    Nodes' seen-message caches live here rather than on the nodes, and are only created for nodes that hear a broadcast.
+    If deliver is True, each node's first copy goes into its inbox (which is bounded, so floods never blow it up).
+    """
+
+    def __init__(self, network: Network, strategy: Optional[Flooding] = None, seen_capacity: int = 64, hop_latency: float = 1.0,
+                 deliver: bool = True, seed: Optional[int] = None):
+        self.network: Network = network
+        self.strategy: Flooding = strategy or Flooding()
+        self.seen_capacity: int = seen_capacity # Message ids each node remembers; more than the broadcasts in flight at once.
+        self.hop_latency: float = hop_latency
+        self.deliver: bool = deliver
+        self.rng = random.Random(seed) if seed is not None else random # Forwarding decisions and delays; seeded for reproducible runs.
+        self._seen: Dict[Node, SeenCache] = {}
+        self._next_id: int = 0
+
+    def seen(self, node: Node) -> SeenCache:
+        cache = self._seen.get(node)
+        if cache is None:
+            cache = self._seen[node] = SeenCache(self.seen_capacity)
+        return cache
+
+    def broadcast(self, source: Node, message: str, scheduler: Optional[EventScheduler] = None,
+                  on_done: Optional[Callable[[DisseminationReport], None]] = None) -> Optional[DisseminationReport]:
+        """
+        Broadcast a message from source to every node it can reach.
+        Without a scheduler the broadcast runs to completion on a private scheduler and its report is returned.
+        With one, it is only scheduled (alongside whatever else the scheduler is running); on_done receives the report when it finishes.
+        """
+        own_scheduler = scheduler is None
+        if own_scheduler:
+            scheduler = EventScheduler()
+        message_id = self._next_id
+        self._next_id += 1
+        state = _Dissemination(message_id, source, message, scheduler.now, self._reachable(source), on_done)
+        self.seen(source).add(message_id)
+        self._transmit(scheduler, state, source) # The source always transmits.
+        if not own_scheduler:
+            return None
+        scheduler.run()
+        return state.report()
+
+    def _reachable(self, source: Node) -> int: # This function counts the nodes reachable from source over directed links, for coverage.
+        seen = {source}
+        stack = [source]
+        while stack:
+            for neighbor in stack.pop().neighbors:
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    stack.append(neighbor)
+        return len(seen)
+
+    def _schedule(self, scheduler: EventScheduler, state: _Dissemination, delay: float, callback, *args) -> None:
+        state.pending += 1
+        scheduler.schedule(delay, callback, scheduler, state, *args)
+
+    def _event_done(self, state: _Dissemination) -> None:
+        state.pending -= 1
+        if state.pending:
+            return
+        report = state.report()
+        if metrics.enabled:
+            metrics.count("broadcast.transmissions", report.transmissions)
+            metrics.count("broadcast.redundant", report.redundant)
+        if log.threshold <= INFO:
+            log.emit(INFO, "broadcast.done", f"Broadcast from {state.source.node_name} reached {report.reached} of {report.reachable} nodes "
+                     f"with {report.transmissions} transmissions ({report.redundant} redundant copies).", **report._asdict())
+        if state.on_done is not None:
+            state.on_done(report)
+
+    def _transmit(self, scheduler: EventScheduler, state: _Dissemination, node: Node) -> None: # This function sends one node's copy to everyone in its range.
+        state.transmissions += 1
+        self._schedule(scheduler, state, self.hop_latency, self._receive_all, list(node.neighbors))
+
+    def _receive_all(self, scheduler: EventScheduler, state: _Dissemination, receivers) -> None: # This function delivers one transmission.
+        message_id = state.message_id
+        strategy = self.strategy
+        waiting = state.waiting
+        for node in receivers:
+            state.receptions += 1
+            if not self.seen(node).add(message_id):
+                state.redundant += 1 # The cache says this node already has it, so the copy is dropped.
+                if node in waiting:
+                    waiting[node] += 1
+                continue
+            state.reached += 1
+            if self.deliver:
+                node.receive_message(state.source, state.message)
+            delay = strategy.forward_delay(self.rng)
+            if delay > 0:
+                waiting[node] = 0
+                self._schedule(scheduler, state, delay, self._decide, node)
+            else:
+                self._forward_or_suppress(scheduler, state, node, 0)
+        state.finished = scheduler.now
+        self._event_done(state)
+
+    def _decide(self, scheduler: EventScheduler, state: _Dissemination, node: Node) -> None: # This function ends a node's assessment delay.
+        self._forward_or_suppress(scheduler, state, node, state.waiting.pop(node))
+        self._event_done(state)
+
+    def _forward_or_suppress(self, scheduler: EventScheduler, state: _Dissemination, node: Node, duplicates: int) -> None:
+        if node.adhoc_enabled and self.strategy.should_forward(self.rng, duplicates):
+            self._transmit(scheduler, state, node)
+        else:
+            state.suppressed += 1
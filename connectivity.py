@@ -0,0 +1,182 @@
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Set
+from node import Node
+from network import LinkDelta
+
+
+class PartitionStats(NamedTuple):
+    """A summary of how the network is partitioned at one moment."""
+    nodes: int
+    components: int # Number of partitions, counting isolated nodes as partitions of one.
+    largest: int # Size of the largest partition.
+    isolated: int # Nodes with no link in either direction.
+
+    @property
+    def largest_fraction(self) -> float:
+        return self.largest / self.nodes if self.nodes else 0.0
+
+
+class Connectivity:
+    """
+    Keeps the network's connected components up to date from its link deltas, so partition questions never need a graph walk.
+    A link in either direction connects two nodes. Every node carries its component's label:
+      - a link coming up merges two components by relabelling the smaller one into the larger (weighted union),
+        so a node is relabelled at most log2(n) times over any run of merges, and find is a single dictionary lookup;
+      - a link going down searches from both ends at once, always growing the side that has seen fewer nodes.
+        If the searches meet, nothing changed; if one side runs out first it is a whole component on its own and gets a new label.
+        Either way the search is bounded by the smaller side, not the whole component.
+    Attach it with Network.set_connectivity(Connectivity()), which also tells it about nodes joining and leaving.
+    """
+
+    def __init__(self):
+        self._label: Dict[Node, int] = {} # Maps every tracked node to its component label.
+        self._members: Dict[int, Set[Node]] = {} # Maps a component label to its nodes.
+        self._adjacent: Dict[Node, Dict[Node, int]] = {} # Undirected adjacency: each linked node and how many directions (1 or 2) link them.
+        self._size_counts: Dict[int, int] = {} # How many components there are of each size, for constant-ish time statistics.
+        self._next_label: int = 0
+
+    def reset(self, nodes: Iterable[Node] = ()) -> None:
+        """Forget everything, then start tracking the given nodes and the links in their neighbor lists."""
+        self._label.clear()
+        self._members.clear()
+        self._adjacent.clear()
+        self._size_counts.clear()
+        nodes = list(nodes)
+        for node in nodes:
+            self.node_added(node)
+        self.links_changed(LinkDelta({(node, neighbor) for node in nodes for neighbor in node.neighbors}, set()))
+
+    # Queries
+
+    def connected(self, a: Node, b: Node) -> bool:
+        """Whether a message could reach b from a over some chain of links (in either direction). O(1)."""
+        label = self._label.get(a)
+        return label is not None and label == self._label.get(b)
+
+    def component_size(self, node: Node) -> int:
+        return len(self._members[self._label[node]])
+
+    def component_of(self, node: Node) -> Set[Node]:
+        """The nodes in node's component (a copy, so it's safe to keep)."""
+        return set(self._members[self._label[node]])
+
+    def sizes(self) -> List[int]:
+        """Every component's size, largest first."""
+        return sorted((len(members) for members in self._members.values()), reverse=True)
+
+    def __len__(self) -> int:
+        return len(self._members) # The number of components.
+
+    def stats(self) -> PartitionStats:
+        """Partition statistics, in time proportional to the number of distinct component sizes (not nodes)."""
+        return PartitionStats(len(self._label), len(self._members), max(self._size_counts, default=0), self._size_counts.get(1, 0))
+
+    # Updates
+
+    def node_added(self, node: Node) -> None:
+        if node not in self._label:
+            self._adjacent[node] = {}
+            self._new_component({node})
+
+    def node_removed(self, node: Node) -> None:
+        """Stop tracking a node, splitting its component if it was holding it together."""
+        if node not in self._label:
+            return
+        for other in list(self._adjacent[node]):
+            del self._adjacent[other][node]
+            del self._adjacent[node][other]
+            self._split_if_disconnected(node, other)
+        self._drop(node)
+        del self._adjacent[node]
+
+    def links_changed(self, delta: LinkDelta) -> None:
+        """
+        Apply one neighbor update. Links going down are handled one at a time, before any merges, so each split check
+        sees an exact labelling; links coming up are merged afterwards.
+        """
+        adjacent = self._adjacent
+        for a, b in delta.down:
+            linked = adjacent.get(a)
+            if linked is None or b not in linked:
+                continue # Already gone, e.g. one end was removed from the network.
+            if linked[b] > 1:
+                linked[b] -= 1 # Still linked in the other direction.
+                adjacent[b][a] -= 1
+                continue
+            del linked[b]
+            del adjacent[b][a]
+            self._split_if_disconnected(a, b)
+        for a, b in delta.up:
+            if a not in self._label or b not in self._label:
+                continue # A node that isn't being tracked (not in the network).
+            linked = adjacent[a]
+            linked[b] = linked.get(b, 0) + 1
+            adjacent[b][a] = linked[b]
+            self._union(a, b)
+
+    def _union(self, a: Node, b: Node) -> None: # This function merges the components of a and b, relabelling the smaller one.
+        label_a, label_b = self._label[a], self._label[b]
+        if label_a == label_b:
+            return
+        members_a, members_b = self._members[label_a], self._members[label_b]
+        if len(members_a) < len(members_b):
+            label_a, label_b, members_a, members_b = label_b, label_a, members_b, members_a
+        self._count_size(len(members_a), -1)
+        self._count_size(len(members_b), -1)
+        label = self._label
+        for node in members_b:
+            label[node] = label_a
+        members_a.update(members_b)
+        del self._members[label_b]
+        self._count_size(len(members_a), 1)
+
+    def _split_if_disconnected(self, a: Node, b: Node) -> None: # This function checks whether a and b are still connected after a link between them went down.
+        adjacent = self._adjacent
+        seen_a, seen_b = {a}, {b}
+        queue_a, queue_b = deque([a]), deque([b])
+        while queue_a and queue_b:
+            # Grow the side that has seen fewer nodes, so the work is bounded by the smaller of the two sides.
+            if len(seen_a) <= len(seen_b):
+                queue, seen, other = queue_a, seen_a, seen_b
+            else:
+                queue, seen, other = queue_b, seen_b, seen_a
+            node = queue.popleft()
+            for neighbor in adjacent[node]:
+                if neighbor in other:
+                    return # The two searches met, so a and b are still connected.
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    queue.append(neighbor)
+        # One search ran out of nodes without meeting the other, so everything it saw is a component of its own.
+        part = seen_a if not queue_a else seen_b
+        members = self._members[self._label[a]]
+        self._count_size(len(members), -1)
+        members.difference_update(part)
+        self._count_size(len(members), 1)
+        self._new_component(part)
+
+    def _new_component(self, nodes: Set[Node]) -> None:
+        label = self._next_label
+        self._next_label += 1
+        self._members[label] = nodes
+        for node in nodes:
+            self._label[node] = label
+        self._count_size(len(nodes), 1)
+
+    def _drop(self, node: Node) -> None: # This function removes an (isolated) node from its component.
+        label = self._label.pop(node)
+        members = self._members[label]
+        self._count_size(len(members), -1)
+        members.discard(node)
+        if members:
+            self._count_size(len(members), 1)
+        else:
+            del self._members[label]
+
+    def _count_size(self, size: int, change: int) -> None:
+        count = self._size_counts.get(size, 0) + change
+        if count:
+            self._size_counts[size] = count
+        else:
+            del self._size_counts[size]
+
@@ -0,0 +1,497 @@
+"""
+Delay-tolerant (store-carry-forward) messaging: epidemic, spray-and-wait and PRoPHET routing over an indexed contact history.
+
+In a sparse network the target of a message is rarely in range, and often not even in the same partition. A DTNRouter buffers
+such messages instead of failing them, and hands copies over whenever two nodes meet. Meetings come from a ContactIndex, which
+turns the network's link deltas into per-pair contact intervals (a contact is open while a link is up in either direction), so
+nothing rescans neighbor lists: only the pairs whose contact just started exchange messages, and a copy handed over is passed on
+to its new carrier's other open contacts straight away. Which copies are handed over is up to the forwarding strategy:
+
+    Epidemic()          every carrier copies every message to every node it meets
+    SprayAndWait(8)     a message has 8 copies; a carrier with more than one hands over half, a carrier with one waits for the target
+    Prophet()           a carrier hands over a copy when the node it meets is more likely to meet the target (delivery predictabilities)
+
+    router = DTNRouter(Prophet(), ttl=500)
+    world.network.set_dtn(router)                 # Network.send_message now buffers what it can't deliver
+    for tick in range(1, steps + 1):
+        router.advance(tick)                      # The clock contact intervals, latencies and expiry are measured in
+        moves = world.step()
+        world.apply_moves(moves)
+        world.network.update_neighbors_incremental(node for node, old_pos, new_pos in moves if old_pos != new_pos)
+    print(router.stats().delivery_ratio)
+
+Delivery statistics are running totals, so stats() is constant time however long the run and however full the buffers.
+"""
+
+from collections import OrderedDict, deque
+from bisect import bisect_right
+from typing import Deque, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from eventlog import DEBUG, INFO, log
+from metrics import metrics
+from network import LinkDelta
+from node import Node
+
+Pair = Tuple[Node, Node] # An undirected pair of nodes, the one with the lower node_id first (see ContactIndex.pair).
+Interval = Tuple[float, float] # When a contact started and ended.
+
+DEFAULT_BUFFER_CAPACITY = 64 # How many messages each node carries unless configured otherwise.
+RESCALE_BELOW = 1e-100 # Prophet folds aging into a node's stored predictabilities once it has shrunk them by this factor.
+
+
+class ContactIndex:
+    """
+    The contact history of a network, kept up to date from its link deltas: which pairs of nodes are in contact now, since when,
+    and every interval they were in contact before. Time is whatever the caller says it is (set now, e.g. to the tick number,
+    before each neighbor update); a link change is timestamped with the time it was reported at.
+    Looking up the open contacts of a node, whether a pair is in contact, or a pair's total contact time is constant time,
+    and whether a pair was in contact at a past time is a binary search over that pair's intervals.
+    """
+
+    def __init__(self):
+        self.now: float = 0.0
+        self._peers: Dict[Node, Dict[Node, int]] = {} # Open contacts: each node's peers, and how many directions (1 or 2) link them.
+        self._opened: Dict[Pair, float] = {} # When each open contact started.
+        self._closed: Dict[Pair, List[Interval]] = {} # Each pair's finished contacts, oldest first.
+        self._closed_time: Dict[Pair, float] = {} # Each pair's total time in finished contacts.
+        self.started: int = 0 # Contacts started since the last reset.
+
+    def reset(self, nodes: Iterable[Node] = ()) -> List[Pair]:
+        """Forget the history, then open a contact for every link in the given nodes' neighbor lists. Returns those contacts."""
+        self._peers.clear()
+        self._opened.clear()
+        self._closed.clear()
+        self._closed_time.clear()
+        self.started = 0
+        return self.links_changed(LinkDelta({(node, neighbor) for node in nodes for neighbor in node.neighbors}, set()))
+
+    @staticmethod
+    def pair(a: Node, b: Node) -> Pair: # This function orders a pair of nodes, so both directions index the same history.
+        return (a, b) if a.node_id <= b.node_id else (b, a)
+
+    def links_changed(self, delta: LinkDelta) -> List[Pair]:
+        """
+        Apply one neighbor update, closing the contacts whose last link went down and opening those whose first link came up.
+        Returns the contacts that started, ordered by node_id, so whatever reacts to them does so in a reproducible order.
+        """
+        now = self.now
+        peers = self._peers
+        for a, b in delta.down:
+            linked = peers.get(a)
+            if linked is None or b not in linked:
+                continue # Not in contact, e.g. the link came up before this index was attached.
+            if linked[b] > 1:
+                linked[b] -= 1 # Still linked in the other direction.
+                peers[b][a] -= 1
+                continue
+            del linked[b]
+            del peers[b][a]
+            pair = self.pair(a, b)
+            started = self._opened.pop(pair)
+            self._closed.setdefault(pair, []).append((started, now))
+            self._closed_time[pair] = self._closed_time.get(pair, 0.0) + now - started
+        opened = []
+        for a, b in delta.up:
+            if a is b:
+                continue
+            linked = peers.setdefault(a, {})
+            count = linked.get(b, 0) + 1
+            linked[b] = count
+            peers.setdefault(b, {})[a] = count
+            if count == 1:
+                pair = self.pair(a, b)
+                self._opened[pair] = now
+                opened.append(pair)
+        opened.sort(key=lambda pair: (pair[0].node_id, pair[1].node_id))
+        self.started += len(opened)
+        return opened
+
+    # Queries
+
+    def peers(self, node: Node) -> List[Node]:
+        """The nodes node is in contact with now."""
+        return list(self._peers.get(node, ()))
+
+    def in_contact(self, a: Node, b: Node) -> bool:
+        return b in self._peers.get(a, ())
+
+    def intervals(self, a: Node, b: Node) -> List[Interval]:
+        """Every contact between a and b, oldest first. An open contact is included, ending now."""
+        pair = self.pair(a, b)
+        intervals = list(self._closed.get(pair, ()))
+        started = self._opened.get(pair)
+        if started is not None:
+            intervals.append((started, self.now))
+        return intervals
+
+    def encounters(self, a: Node, b: Node) -> int:
+        """How many times a and b have met (an open contact counts)."""
+        pair = self.pair(a, b)
+        return len(self._closed.get(pair, ())) + (pair in self._opened)
+
+    def contact_time(self, a: Node, b: Node) -> float:
+        """How long a and b have been in contact in total, up to now."""
+        pair = self.pair(a, b)
+        started = self._opened.get(pair)
+        return self._closed_time.get(pair, 0.0) + (self.now - started if started is not None else 0.0)
+
+    def in_contact_at(self, a: Node, b: Node, time: float) -> bool:
+        """Whether a and b were in contact at a given time (a contact covers its start, up to but not including its end)."""
+        pair = self.pair(a, b)
+        started = self._opened.get(pair)
+        if started is not None and started <= time <= self.now:
+            return True
+        closed = self._closed.get(pair)
+        if not closed:
+            return False
+        index = bisect_right(closed, (time, float("inf"))) - 1 # The last contact that started at or before time.
+        return index >= 0 and time < closed[index][1]
+
+    def __len__(self) -> int:
+        return len(self._opened) # The number of open contacts.
+
+
+class Epidemic:
+    """Epidemic routing: every carrier copies every message it holds to every node it meets that doesn't have it yet."""
+    initial_copies: int = 1 # Copies a new message starts with. Epidemic routing replicates freely, so it only matters for spraying.
+
+    def reset(self) -> None: # This function forgets whatever the strategy learned from past contacts.
+        pass
+
+    def contact(self, router: 'DTNRouter', a: Node, b: Node) -> None: # This function is told about every contact that starts, before messages are exchanged.
+        pass
+
+    def forward(self, router: 'DTNRouter', carrier: Node, peer: Node, target: Node, copies: int) -> Tuple[int, int]:
+        """Decide a handover from carrier (holding copies of a message for target) to peer. Returns (copies peer gets, copies carrier keeps)."""
+        return 1, copies
+
+
+class SprayAndWait(Epidemic):
+    """
+    Spray-and-wait: a message starts with a fixed number of copies. In binary mode (the default) a carrier with more than one
+    hands half of them over; otherwise they are handed out one at a time (only the source ever holds more than one).
+    A carrier left with one copy waits to meet the target.
+    """
+
+    def __init__(self, copies: int = 8, binary: bool = True):
+        if copies < 1:
+            raise ValueError("Spray-and-wait needs at least one copy of each message.")
+        self.initial_copies = copies
+        self.binary: bool = binary
+
+    def forward(self, router: 'DTNRouter', carrier: Node, peer: Node, target: Node, copies: int) -> Tuple[int, int]:
+        if copies < 2:
+            return 0, copies # The wait phase: only the target itself gets it (the router delivers that directly).
+        given = copies // 2 if self.binary else 1
+        return given, copies - given
+
+
+class Prophet(Epidemic):
+    """
+    PRoPHET: every node keeps a delivery predictability for each node it has heard of. Meeting a node raises it (by p_encounter of
+    what's missing), it ages by gamma per unit of time, and it is transitive: meeting b raises a's predictability for the nodes b
+    often meets (scaled by beta). A carrier hands a copy over when the node it meets is more likely to meet the target than it is.
+    Aging is lazy: each node's table is stored relative to the time it was last rescaled, so aging costs nothing until a value is read,
+    and a contact only costs the transitive update, one pass over the other node's table. Transitive predictabilities below threshold
+    aren't recorded (nor kept when a table is rescaled), so tables hold the nodes a node is likely to meet rather than everyone it ever heard of.
+    Set threshold to 0 to keep every value, as the protocol itself does; in large sparse networks that makes each contact cost a pass over
+    most of the network, for forwarding decisions made between vanishingly small predictabilities.
+    """
+
+    def __init__(self, p_encounter: float = 0.75, beta: float = 0.25, gamma: float = 0.98, threshold: float = 0.001):
+        if not 0.0 < p_encounter <= 1.0 or not 0.0 <= beta <= 1.0 or not 0.0 < gamma <= 1.0:
+            raise ValueError("PRoPHET needs 0 < p_encounter <= 1, 0 <= beta <= 1 and 0 < gamma <= 1.")
+        self.p_encounter: float = p_encounter
+        self.beta: float = beta
+        self.gamma: float = gamma
+        self.threshold: float = threshold
+        # Each node's predictabilities, stored unaged: the predictability at time t is the stored value * gamma ** (t - base).
+        self._predictability: Dict[Node, Dict[Node, float]] = {}
+        self._base: Dict[Node, float] = {} # The time each node's stored values are relative to.
+
+    def reset(self) -> None:
+        self._predictability.clear()
+        self._base.clear()
+
+    def predictability(self, router: 'DTNRouter', node: Node, target: Node) -> float:
+        """How likely node is to meet target, aged to the router's current time."""
+        table = self._predictability.get(node)
+        if not table or target not in table:
+            return 0.0
+        return table[target] * self.gamma ** (router.now - self._base[node])
+
+    def _table(self, node: Node, now: float) -> Tuple[Dict[Node, float], float]: # This function returns a node's stored values and the aging factor that applies to them now.
+        table = self._predictability.get(node)
+        if table is None:
+            table = self._predictability[node] = {}
+            self._base[node] = now
+        scale = self.gamma ** (now - self._base[node])
+        if scale < RESCALE_BELOW:
+            for other, value in list(table.items()): # Fold the aging into the stored values before they grow too large to be precise.
+                value *= scale
+                if value < self.threshold:
+                    del table[other]
+                else:
+                    table[other] = value
+            self._base[node] = now
+            scale = 1.0
+        return table, scale
+
+    def contact(self, router: 'DTNRouter', a: Node, b: Node) -> None:
+        now = router.now
+        table_a, scale_a = self._table(a, now)
+        table_b, scale_b = self._table(b, now)
+        for table, scale, met in ((table_a, scale_a, b), (table_b, scale_b, a)):
+            previous = table.get(met, 0.0) * scale
+            table[met] = (previous + (1.0 - previous) * self.p_encounter) / scale
+        if not self.beta:
+            return
+        items_a, items_b = list(table_a.items()), list(table_b.items()) # Both transitive updates use the values from before either.
+        for table, scale, met, items, met_scale, node in ((table_a, scale_a, b, items_b, scale_b, a), (table_b, scale_b, a, items_a, scale_a, b)):
+            via = table[met] * self.beta * met_scale # Maps a stored value of met's to a stored value of node's (the scales of node's value cancel out).
+            floor = self.threshold / scale
+            get = table.get
+            for other, value in items:
+                transitive = via * value
+                if transitive >= floor and transitive > get(other, 0.0):
+                    table[other] = transitive
+            table.pop(node, None) # met's predictability for node itself came along, but a node doesn't predict meeting itself.
+
+    def forward(self, router: 'DTNRouter', carrier: Node, peer: Node, target: Node, copies: int) -> Tuple[int, int]:
+        if self.predictability(router, peer, target) > self.predictability(router, carrier, target):
+            return 1, copies
+        return 0, copies
+
+
+class DeliveryStats(NamedTuple):
+    """What a DTN router has achieved so far."""
+    created: int # Messages buffered for store-carry-forward delivery.
+    delivered: int # Messages that reached their target.
+    expired: int # Messages whose time to live ran out first.
+    lost: int # Messages whose every copy was evicted from full buffers.
+    in_flight: int # Messages still buffered somewhere.
+    relayed: int # Copies handed from one carrier to another (deliveries not included).
+    evicted: int # Copies evicted from full buffers.
+    total_latency: float # Time from creation to delivery, summed over delivered messages.
+    max_latency: float
+
+    @property
+    def delivery_ratio(self) -> float:
+        return self.delivered / self.created if self.created else 0.0
+
+    @property
+    def mean_latency(self) -> float:
+        return self.total_latency / self.delivered if self.delivered else 0.0
+
+    @property
+    def overhead(self) -> float:
+        """Relayed copies per delivered message."""
+        return self.relayed / self.delivered if self.delivered else 0.0
+
+
+class _Bundle:
+    """One message in store-carry-forward delivery, and every node holding a copy of it."""
+    __slots__ = ("bundle_id", "source", "target", "message", "created", "holders", "done", "delivered")
+
+    def __init__(self, bundle_id: int, source: Node, target: Node, message: str, created: float):
+        self.bundle_id: int = bundle_id
+        self.source: Node = source
+        self.target: Node = target
+        self.message: str = message
+        self.created: float = created
+        self.holders: Set[Node] = set()
+        self.done: bool = False # Delivered, expired or lost; its copies are gone.
+        self.delivered: bool = False
+
+
+class DTNRouter:
+    """
+    Buffers messages that can't be delivered now and carries them across contacts until they reach their target,
+    with a forwarding strategy (Epidemic by default) deciding which carriers get copies.
+    Attach it with Network.set_dtn(router): Network.send_message then hands it whatever it can't deliver directly or over a route.
+    Each node's buffer holds up to buffer_capacity messages, evicting its oldest when a new one arrives; messages older than ttl
+    (if given) are dropped everywhere. Once a message is delivered every other copy is dropped too, as if the target's acknowledgement
+    reached every carrier, so buffers only ever hold messages that are still undelivered.
+    """
+
+    def __init__(self, strategy: Optional[Epidemic] = None, buffer_capacity: int = DEFAULT_BUFFER_CAPACITY, ttl: Optional[float] = None):
+        if buffer_capacity < 1:
+            raise ValueError("A DTN buffer needs room for at least one message.")
+        self.strategy: Epidemic = strategy or Epidemic()
+        self.buffer_capacity: int = buffer_capacity
+        self.ttl: Optional[float] = ttl
+        self.contacts: ContactIndex = ContactIndex()
+        self._buffers: Dict[Node, OrderedDict] = {} # Each carrier's messages, oldest first: bundle id -> copies held.
+        self._bundles: Dict[int, _Bundle] = {} # Messages still in flight, by id.
+        self._expiry: Deque[Tuple[float, int]] = deque() # (expiry time, bundle id), in creation order, so also in expiry order.
+        self._next_id: int = 0
+        self._created = self._delivered = self._expired = self._lost = self._relayed = self._evicted = 0
+        self._total_latency: float = 0.0
+        self._max_latency: float = 0.0
+
+    @property
+    def now(self) -> float:
+        return self.contacts.now
+
+    def reset(self, nodes: Iterable[Node] = ()) -> None:
+        """Forget every buffered message, statistic and contact, then start from the links in the given nodes' neighbor lists as open contacts."""
+        self._buffers.clear()
+        self._bundles.clear()
+        self._expiry.clear()
+        self._created = self._delivered = self._expired = self._lost = self._relayed = self._evicted = 0
+        self._total_latency = self._max_latency = 0.0
+        self.strategy.reset()
+        for a, b in self.contacts.reset(nodes):
+            self.strategy.contact(self, a, b)
+
+    def advance(self, now: float) -> None:
+        """Move the clock forward, dropping the messages whose time to live ran out."""
+        self.contacts.now = now
+        expiry = self._expiry
+        while expiry and expiry[0][0] <= now:
+            bundle = self._bundles.get(expiry.popleft()[1])
+            if bundle is not None:
+                self._expired += 1
+                self._finish(bundle)
+                if log.threshold <= DEBUG:
+                    log.emit(DEBUG, "dtn.expired", f"Message from {bundle.source.node_name} to {bundle.target.node_name} expired undelivered.",
+                             sender_id=bundle.source.node_id, target_id=bundle.target.node_id, age=now - bundle.created)
+
+    def stats(self) -> DeliveryStats:
+        return DeliveryStats(self._created, self._delivered, self._expired, self._lost, len(self._bundles), self._relayed,
+                             self._evicted, self._total_latency, self._max_latency)
+
+    def buffered(self, node: Node) -> int:
+        """How many messages node is carrying."""
+        return len(self._buffers.get(node, ()))
+
+    def store(self, sender: Node, target: Node, message: str) -> bool:
+        """
+        Take a message for store-carry-forward delivery. It is offered to sender's open contacts straight away, and from them on,
+        so it is delivered now if target is reachable through them. Returns whether it was delivered before this returned.
+        """
+        bundle = _Bundle(self._next_id, sender, target, message, self.now)
+        self._next_id += 1
+        self._created += 1
+        self._bundles[bundle.bundle_id] = bundle
+        if self.ttl is not None:
+            self._expiry.append((bundle.created + self.ttl, bundle.bundle_id))
+        if log.threshold <= INFO:
+            log.emit(INFO, "message.buffered", f"{sender.node_name} buffers a message for {target.node_name} until they meet: \"{message}\"",
+                     sender_id=sender.node_id, target_id=target.node_id)
+        if target is sender:
+            self._deliver(bundle)
+            return True
+        self._hold(sender, bundle, self.strategy.initial_copies)
+        self._spread(deque((sender, peer, [bundle.bundle_id]) for peer in self.contacts.peers(sender)))
+        return bundle.delivered
+
+    def links_changed(self, delta: LinkDelta) -> None:
+        """Called by the network after every neighbor update. Only the contacts that just started exchange messages."""
+        started = self.contacts.links_changed(delta)
+        if not started:
+            return
+        strategy = self.strategy
+        pending: Deque[Tuple[Node, Node, Optional[List[int]]]] = deque()
+        for a, b in started:
+            strategy.contact(self, a, b)
+            if a in self._buffers:
+                pending.append((a, b, None))
+            if b in self._buffers:
+                pending.append((b, a, None))
+        self._spread(pending)
+
+    def _spread(self, pending: Deque[Tuple[Node, Node, Optional[List[int]]]]) -> None: # This function runs handovers until no carrier has anything new for its open contacts.
+        contacts = self.contacts
+        # Each message is offered to each node at most once per spread. Otherwise, with full buffers, a copy that evicted
+        # another could be handed straight back to the node that just evicted it, and the two would trade copies forever.
+        offered: Set[Tuple[int, Node]] = set()
+        while pending:
+            carrier, peer, bundle_ids = pending.popleft()
+            received = self._offer(carrier, peer, bundle_ids, offered)
+            if received:
+                pending.extend((peer, other, received) for other in contacts.peers(peer) if other is not carrier)
+
+    def _offer(self, carrier: Node, peer: Node, bundle_ids: Optional[List[int]], offered: Set[Tuple[int, Node]]) -> List[int]:
+        """
+        Offer carrier's messages (all of them, or just the given ids) to peer, skipping those already offered to peer (recorded in offered).
+        Returns the ids peer took a copy of.
+        """
+        buffer = self._buffers.get(carrier)
+        if not buffer:
+            return []
+        if bundle_ids is None:
+            peer_buffer = self._buffers.get(peer)
+            # Only what peer doesn't have yet is worth looking at: one set difference, rather than a check per message, when both buffers are full.
+            bundle_ids = sorted(buffer.keys() - peer_buffer.keys()) if peer_buffer else list(buffer)
+        strategy = self.strategy
+        bundles = self._bundles
+        received = []
+        for bundle_id in bundle_ids:
+            copies = buffer.get(bundle_id)
+            if copies is None:
+                continue # Delivered, expired or evicted since it was queued.
+            if (bundle_id, peer) in offered:
+                continue
+            offered.add((bundle_id, peer))
+            bundle = bundles[bundle_id]
+            if bundle.target is peer:
+                self._deliver(bundle)
+                continue
+            if peer in bundle.holders:
+                continue
+            given, kept = strategy.forward(self, carrier, peer, bundle.target, copies)
+            if not given:
+                continue
+            self._relayed += 1
+            if kept:
+                buffer[bundle_id] = kept
+            else:
+                del buffer[bundle_id]
+                bundle.holders.discard(carrier)
+            self._hold(peer, bundle, given)
+            if not bundle.done:
+                received.append(bundle_id) # Unless making room for it evicted the last other copy.
+        if metrics.enabled and received:
+            metrics.count("dtn.relayed", len(received))
+        return received
+
+    def _hold(self, node: Node, bundle: _Bundle, copies: int) -> None: # This function puts copies of a message in a node's buffer, evicting its oldest message if it is full.
+        buffer = self._buffers.get(node)
+        if buffer is None:
+            buffer = self._buffers[node] = OrderedDict()
+        if len(buffer) >= self.buffer_capacity:
+            evicted = self._bundles[buffer.popitem(last=False)[0]]
+            evicted.holders.discard(node)
+            self._evicted += 1
+            if not evicted.holders:
+                self._lost += 1
+                self._finish(evicted)
+        buffer[bundle.bundle_id] = copies
+        bundle.holders.add(node)
+
+    def _deliver(self, bundle: _Bundle) -> None:
+        target = bundle.target
+        latency = self.now - bundle.created
+        self._delivered += 1
+        bundle.delivered = True
+        self._total_latency += latency
+        if latency > self._max_latency:
+            self._max_latency = latency
+        self._finish(bundle)
+        if metrics.enabled:
+            metrics.count("dtn.delivered")
+        if log.threshold <= INFO:
+            log.emit(INFO, "message.sent", f"SUCCESS: {bundle.source.node_name} sends message to {target.node_name} after {latency:g} time units in buffers: \"{bundle.message}\"",
+                     sender_id=bundle.source.node_id, target_id=target.node_id, latency=latency, dtn=True)
+        target.receive_message(bundle.source, bundle.message)
+
+    def _finish(self, bundle: _Bundle) -> None: # This function drops every copy of a message that is no longer in flight.
+        bundle.done = True
+        del self._bundles[bundle.bundle_id]
+        buffers = self._buffers
+        for node in bundle.holders:
+            buffer = buffers[node]
+            del buffer[bundle.bundle_id]
+            if not buffer:
+                del buffers[node]
+        bundle.holders.clear()
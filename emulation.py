@@ -0,0 +1,286 @@
+"""
+Emulation mode: every node runs its own protocol coroutine as an asyncio task, and messages travel for real.
+
+Where the rest of the simulator calls methods in one synchronous loop, an Emulation gives each node an Endpoint with its own inbox
+queue and starts protocol(endpoint) for every node in a single event loop, so thousands of nodes run concurrently with real timers,
+timeouts and retries. Sending is gated by the network's neighbor relation at the moment of sending, exactly like Network.send_message.
+Messages travel either through in-process queues (transport="queue", the fast default) or as JSON datagrams between one localhost
+UDP socket per node (transport="udp", which needs JSON-serialisable payloads and a file descriptor per node). If a world is given,
+it keeps moving every tick seconds while the protocols run, and links come and go under them.
+
+    async def hello(endpoint):
+        endpoint.broadcast("hello")
+        while (envelope := await endpoint.recv(timeout=1.0)) is not None:
+            print(endpoint.node.node_name, "heard from", envelope.sender)
+
+    stats = asyncio.run(Emulation(world.network).run(hello, duration=5.0))
+
+Run this module directly for a ping/pong-with-retries demo over a random world, e.g. python emulation.py --nodes 2000 --transport udp
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+from eventlog import INFO, log
+from network import Network
+from node import Node
+
+TRANSPORTS = ("queue", "udp")
+
+
+class Envelope(NamedTuple):
+    """One message as a node's protocol receives it."""
+    sender: int # The sending node's id.
+    payload: Any
+    sent_at: float # Event loop time it was sent at, so protocols can measure latency.
+
+
+class EmulationStats:
+    """Message counts over one emulation run."""
+    __slots__ = ("sent", "delivered", "refused", "dropped", "duration")
+
+    def __init__(self):
+        self.sent: int = 0 # Messages handed to the transport.
+        self.delivered: int = 0 # Messages put into the target's inbox.
+        self.refused: int = 0 # Sends refused because the target wasn't a neighbor (or isn't emulated).
+        self.dropped: int = 0 # Messages lost because the target's inbox was full.
+        self.duration: float = 0.0 # Wall clock seconds the run took.
+
+    def as_dict(self) -> Dict[str, float]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+Protocol = Callable[['Endpoint'], Awaitable[None]]
+
+
+class Endpoint:
+    """A node's handle on the emulated network, passed to its protocol coroutine."""
+
+    def __init__(self, emulation: 'Emulation', node: Node, inbox_size: int):
+        self.emulation: Emulation = emulation
+        self.node: Node = node
+        self.inbox: asyncio.Queue = asyncio.Queue(inbox_size) # Messages that arrived and haven't been received yet.
+        self.address: Optional[Tuple[str, int]] = None # The localhost address of this node's socket (UDP transport only).
+        self._socket: Optional[asyncio.DatagramTransport] = None
+        self.results: Any = None # Whatever the node's protocol wants to leave behind for whoever ran the emulation.
+
+    @property
+    def node_id(self) -> int:
+        return self.node.node_id
+
+    @property
+    def neighbors(self) -> List[int]:
+        """The ids of the nodes this node can currently reach."""
+        return [neighbor.node_id for neighbor in self.node.neighbors]
+
+    def send(self, target: int, payload: Any) -> bool:
+        """Send a payload to the node with id target. Returns False (and sends nothing) if it isn't a neighbor right now."""
+        return self.emulation._send(self, target, payload)
+
+    def broadcast(self, payload: Any) -> int:
+        """Send a payload to every current neighbor. Returns how many it was sent to."""
+        return sum(1 for target in self.neighbors if self.emulation._send(self, target, payload))
+
+    async def recv(self, timeout: Optional[float] = None) -> Optional[Envelope]:
+        """Wait for the next message. Returns None if timeout seconds pass without one."""
+        inbox = self.inbox
+        if timeout is None:
+            return await inbox.get()
+        if not inbox.empty():
+            return inbox.get_nowait()
+        # Not asyncio.wait_for: before Python 3.12 it can swallow a cancellation that arrives just as the message does,
+        # which would leave this node's task running after the emulation has ended.
+        getter = asyncio.ensure_future(inbox.get())
+        try:
+            await asyncio.wait((getter,), timeout=timeout)
+        finally:
+            getter.cancel() # Does nothing if it already has a message; otherwise the message stays queued.
+        return getter.result() if getter.done() and not getter.cancelled() else None
+
+    def now(self) -> float:
+        return asyncio.get_running_loop().time()
+
+
+class _DatagramReceiver(asyncio.DatagramProtocol):
+    """Feeds the datagrams arriving at one node's socket into its inbox."""
+
+    def __init__(self, endpoint: Endpoint):
+        self.endpoint: Endpoint = endpoint
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        sender, sent_at, payload = json.loads(data)
+        self.endpoint.emulation._deliver(self.endpoint, Envelope(sender, payload, sent_at))
+
+
+class Emulation:
+    """
+    Runs one protocol coroutine per node of a network, concurrently, in the current event loop.
+    latency delays every queue delivery by that many seconds (it is ignored for UDP, whose deliveries take as long as the loopback takes).
+    If mirror_inbox is True, every delivered message is also put into the receiving Node's own inbox, so the GUI can show it.
+    """
+
+    def __init__(self, network: Network, transport: str = "queue", inbox_size: int = 256, latency: float = 0.0, mirror_inbox: bool = False):
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Unknown transport {transport!r}, expected one of {', '.join(TRANSPORTS)}.")
+        self.network: Network = network
+        self.transport: str = transport
+        self.inbox_size: int = inbox_size
+        self.latency: float = latency
+        self.mirror_inbox: bool = mirror_inbox
+        self.endpoints: Dict[int, Endpoint] = {} # Maps a node id to its endpoint, for the nodes being emulated.
+        self.stats: EmulationStats = EmulationStats()
+
+    async def run(self, protocol: Protocol, duration: Optional[float] = None, world=None, tick: float = 1.0) -> EmulationStats:
+        """
+        Start protocol(endpoint) for every node in the network and wait until they all return, or until duration seconds have passed
+        (the protocols still running are then cancelled). If world is given, it takes a step every tick seconds meanwhile.
+        A network with no nodes returns empty stats straight away, or after duration if a world is being stepped.
+        Re-raises the first exception any protocol raised, after every task has been stopped and every socket closed.
+        """
+        started = time.perf_counter()
+        self.stats = EmulationStats()
+        await self._open()
+        loop = asyncio.get_running_loop()
+        tasks = [loop.create_task(protocol(endpoint), name=f"node-{node_id}") for node_id, endpoint in self.endpoints.items()]
+        mobility = loop.create_task(self._move(world, tick)) if world is not None else None
+        done = set()
+        try:
+            if tasks:
+                done, _ = await asyncio.wait(tasks, timeout=duration, return_when=asyncio.FIRST_EXCEPTION)
+            elif mobility is not None and duration is not None:
+                await asyncio.sleep(duration) # No nodes to wait on, but the world still moves for the whole run.
+        finally:
+            for task in tasks:
+                task.cancel()
+            if mobility is not None:
+                mobility.cancel()
+            await asyncio.gather(*tasks, *([mobility] if mobility else []), return_exceptions=True)
+            self._close()
+        self.stats.duration = time.perf_counter() - started
+        if log.threshold <= INFO:
+            log.emit(INFO, "emulation.done", f"Emulated {len(tasks)} nodes for {self.stats.duration:.2f}s: {self.stats.delivered} messages delivered, "
+                     f"{self.stats.refused} refused, {self.stats.dropped} dropped.", nodes=len(tasks), **self.stats.as_dict())
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+        return self.stats
+
+    async def _open(self) -> None: # This function creates an endpoint (and, for UDP, a bound socket) for every node.
+        self.endpoints = {node.node_id: Endpoint(self, node, self.inbox_size) for node in self.network.nodes}
+        if self.transport == "udp":
+            loop = asyncio.get_running_loop()
+            try:
+                for endpoint in self.endpoints.values():
+                    endpoint._socket, _ = await loop.create_datagram_endpoint(lambda endpoint=endpoint: _DatagramReceiver(endpoint),
+                                                                              local_addr=("127.0.0.1", 0))
+                    endpoint.address = endpoint._socket.get_extra_info("sockname")[:2]
+            except OSError:
+                self._close() # E.g. out of file descriptors: don't leak the sockets that did open.
+                raise
+
+    def _close(self) -> None:
+        for endpoint in self.endpoints.values():
+            if endpoint._socket is not None:
+                endpoint._socket.close()
+                endpoint._socket = None
+
+    async def _move(self, world, tick: float) -> None: # This function keeps the world moving (and links changing) while protocols run.
+        network = world.network
+        while True:
+            await asyncio.sleep(tick)
+            moves = world.step()
+            world.apply_moves(moves)
+            network.update_neighbors_incremental(node for node, old_pos, new_pos in moves if old_pos != new_pos)
+
+    def _send(self, source: Endpoint, target: int, payload: Any) -> bool:
+        endpoint = self.endpoints.get(target)
+        if endpoint is None or endpoint.node not in source.node.neighbors:
+            self.stats.refused += 1
+            return False
+        self.stats.sent += 1
+        sent_at = asyncio.get_running_loop().time()
+        if self.transport == "udp":
+            source._socket.sendto(json.dumps((source.node_id, sent_at, payload)).encode("utf-8"), endpoint.address)
+        elif self.latency > 0:
+            asyncio.get_running_loop().call_later(self.latency, self._deliver, endpoint, Envelope(source.node_id, payload, sent_at))
+        else:
+            self._deliver(endpoint, Envelope(source.node_id, payload, sent_at))
+        return True
+
+    def _deliver(self, endpoint: Endpoint, envelope: Envelope) -> None:
+        try:
+            endpoint.inbox.put_nowait(envelope)
+        except asyncio.QueueFull:
+            self.stats.dropped += 1
+            return
+        self.stats.delivered += 1
+        if self.mirror_inbox:
+            sender = self.endpoints[envelope.sender].node
+            endpoint.node.receive_message(sender, str(envelope.payload))
+
+
+async def ping_neighbors(endpoint: Endpoint, rounds: int = 3, timeout: float = 0.2, retries: int = 2) -> None:
+    """
+    A demo protocol: every round, ping each current neighbor and wait for its pong, retrying each unanswered ping up to retries times.
+    It answers other nodes' pings while it waits, and afterwards until the emulation ends. Leaves (answered, lost) in endpoint.results.
+    """
+    answered = lost = 0
+    for round_number in range(rounds):
+        for target in endpoint.neighbors:
+            for attempt in range(retries + 1):
+                token = [round_number, attempt]
+                endpoint.send(target, {"ping": token})
+                if await _await_pong(endpoint, target, token, timeout):
+                    answered += 1
+                    break
+            else:
+                lost += 1
+    endpoint.results = (answered, lost)
+    while True: # Keep answering, so slower nodes still get their pongs.
+        await _await_pong(endpoint, None, None, None)
+
+
+async def _await_pong(endpoint: Endpoint, target: Optional[int], token: Any, timeout: Optional[float]) -> bool: # This function answers pings until target's pong for token arrives, or timeout passes.
+    deadline = endpoint.now() + timeout if timeout is not None else None
+    while True:
+        envelope = await endpoint.recv(None if deadline is None else max(0.0, deadline - endpoint.now()))
+        if envelope is None:
+            return False
+        message = envelope.payload
+        if "ping" in message:
+            endpoint.send(envelope.sender, {"pong": message["ping"]})
+        elif envelope.sender == target and message["pong"] == token:
+            return True
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from scenario import random_world
+
+    parser = argparse.ArgumentParser(description="Emulate every node of a random world as an asyncio task running a ping/pong protocol.")
+    parser.add_argument("--width", type=int, default=100)
+    parser.add_argument("--height", type=int, default=100)
+    parser.add_argument("--nodes", type=int, default=1000)
+    parser.add_argument("--range", dest="comm_range", type=int, default=3)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--transport", choices=TRANSPORTS, default="queue")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds each queue delivery takes.")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds to run for (the demo protocol keeps answering until then).")
+    parser.add_argument("--move-every", type=float, help="Step the world every this many seconds while emulating.")
+    args = parser.parse_args(argv)
+
+    world = random_world(args.width, args.height, args.nodes, args.comm_range, seed=args.seed)
+    world.network.update_neighbors()
+    emulation = Emulation(world.network, args.transport, latency=args.latency)
+    stats = asyncio.run(emulation.run(ping_neighbors, args.duration, world if args.move_every else None, args.move_every or 1.0))
+    results = [endpoint.results for endpoint in emulation.endpoints.values()]
+    summary = stats.as_dict()
+    summary["finished"] = sum(1 for result in results if result is not None)
+    summary["pings_answered"] = sum(result[0] for result in results if result is not None)
+    summary["pings_lost"] = sum(result[1] for result in results if result is not None)
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Level-gated structured event logging for the simulation's hot paths.
+
+Simulation code reports what happens (a node moved, a message was delivered...) as events with a level, a kind, a readable message
+and structured fields. Subscribers (the console, the GUI log pane, a batch file) receive the events at or above their own level.
+The module-level log has no subscribers until something subscribes, and every call site checks log.threshold before building
+its message, so a run with logging off pays one integer comparison per event and never formats a string.
+
+    from eventlog import log, INFO, print_event
+    log.subscribe(print_event, INFO)
+"""
+
+import json
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, TextIO, Tuple
+
+DEBUG = 10 # Per-node chatter from the hottest paths: moves, neighbor updates, nodes joining.
+INFO = 20 # Things a person watching the simulation cares about: messages sent and delivered.
+WARNING = 30 # Something was refused: a node couldn't be placed, a message couldn't be delivered.
+ERROR = 40
+OFF = 100 # Above every level, so nothing is emitted.
+
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+
+class LogEvent(NamedTuple):
+    """One thing that happened in the simulation."""
+    level: int
+    kind: str # A dotted event name, e.g. "node.move" or "message.delivered".
+    message: str # The human readable description.
+    fields: Dict[str, Any] # Structured details (ids, positions...), safe to serialise as JSON.
+    timestamp: float # Wall clock time the event was emitted.
+
+
+Subscriber = Callable[[LogEvent], None]
+
+
+class EventLog:
+    """
+    Dispatches events to subscribers. Each subscriber has its own minimum level;
+    threshold is the lowest level any subscriber wants, so call sites can skip building events nobody will receive.
+    """
+
+    def __init__(self):
+        self._subscribers: List[Tuple[Subscriber, int]] = []
+        self.threshold: int = OFF # Events below this level are never built. OFF while nobody is subscribed.
+
+    def enabled(self, level: int) -> bool:
+        return level >= self.threshold
+
+    def subscribe(self, subscriber: Subscriber, level: int = INFO) -> Subscriber:
+        """Start sending events at or above level to subscriber. Returns the subscriber, so it can be unsubscribed later."""
+        self._subscribers.append((subscriber, level))
+        self._update_threshold()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers = [(existing, level) for existing, level in self._subscribers if existing is not subscriber]
+        self._update_threshold()
+
+    def clear(self) -> None:
+        """Remove every subscriber, turning logging off entirely."""
+        self._subscribers = []
+        self._update_threshold()
+
+    def _update_threshold(self) -> None:
+        self.threshold = min((level for _, level in self._subscribers), default=OFF)
+
+    def emit(self, level: int, kind: str, message: str, **fields: Any) -> None:
+        """Send an event to every subscriber that wants its level. Call sites should check log.threshold first."""
+        if level < self.threshold:
+            return
+        event = LogEvent(level, kind, message, fields, time.time())
+        for subscriber, subscriber_level in self._subscribers:
+            if level >= subscriber_level:
+                subscriber(event)
+
+
+def print_event(event: LogEvent) -> None:
+    """A subscriber that prints each event's message to stdout, as the simulator used to."""
+    print(event.message)
+
+
+class BatchFileSink:
+    """
+    A subscriber that writes events to a file as JSON lines, buffering them and writing batch_size at a time,
+    so bulk runs don't pay for a write per event. Call close() (or use it as a context manager) to write what's left.
+    """
+
+    def __init__(self, path: str, batch_size: int = 1000):
+        self._file: TextIO = open(path, "a", encoding="utf-8")
+        self.batch_size: int = batch_size
+        self._buffer: List[str] = []
+
+    def __call__(self, event: LogEvent) -> None:
+        self._buffer.append(json.dumps({
+            "time": event.timestamp,
+            "level": LEVEL_NAMES.get(event.level, event.level),
+            "kind": event.kind,
+            "message": event.message,
+            **event.fields,
+        }, default=str))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._file.write("\n".join(self._buffer) + "\n")
+            self._buffer.clear()
+        self._file.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self._file.close()
+
+    def __enter__(self) -> 'BatchFileSink':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def parse_level(name: Optional[str]) -> int:
+    """Turn a level name such as 'info' into its number ('off' turns logging off)."""
+    if name is None:
+        return OFF
+    levels = {level_name.lower(): level for level, level_name in LEVEL_NAMES.items()}
+    levels["off"] = OFF
+    return levels[name.lower()]
+
+
+log = EventLog() # The simulation-wide event log.
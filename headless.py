@@ -0,0 +1,201 @@
+import argparse
+import json
+import random
+import sys
+import time
+from typing import List, Optional, Tuple
+from connectivity import Connectivity
+from dtn import DEFAULT_BUFFER_CAPACITY, DTNRouter, Epidemic, Prophet, SprayAndWait
+from eventlog import DEBUG, INFO, OFF, BatchFileSink, log, parse_level, print_event
+from metrics import metrics
+from radio import LineOfSight
+from recording import TraceRecorder
+from scenario import load_world, random_world
+from world import World
+
+DTN_STRATEGIES = {"epidemic": Epidemic, "spray": SprayAndWait, "prophet": Prophet} # The --dtn choices.
+
+
+def run(world: World, steps: int, out=None, as_json: bool = False, recorder: Optional[TraceRecorder] = None,
+        dtn: Optional[DTNRouter] = None, dtn_messages: int = 1, seed: Optional[int] = None) -> None:
+    """
+    Run a world for a number of ticks with no GUI, printing one summary line per tick.
+    Each tick plans and applies a step, then updates neighbors incrementally around the nodes that moved.
+    Partition counts come from a connectivity service kept up to date from the link changes, so they cost no graph walk per tick.
+    If a recorder is given, the starting state and every tick are recorded to its trace.
+    If a DTN router is given, dtn_messages messages between random pairs of nodes are handed to it every tick (picked with seed),
+    and its running delivery statistics are printed too.
+    """
+    out = out or sys.stdout
+    network = world.network
+    network.update_neighbors()
+    connectivity = Connectivity()
+    network.set_connectivity(connectivity)
+    if dtn is not None:
+        network.set_dtn(dtn)
+        rng = random.Random(seed)
+    links = sum(len(node.neighbors) for node in network.nodes) # Directed links, kept up to date from each tick's link delta.
+    if recorder is not None:
+        recorder.record()
+    for tick in range(1, steps + 1):
+        started = time.perf_counter()
+        if dtn is not None:
+            dtn.advance(tick)
+        moves = world.step()
+        world.apply_moves(moves)
+        delta = network.update_neighbors_incremental(node for node, old_pos, new_pos in moves if old_pos != new_pos)
+        if dtn is not None and len(network.nodes) > 1:
+            nodes = network.nodes
+            for _ in range(dtn_messages):
+                sender, target = rng.sample(range(len(nodes)), 2)
+                dtn.store(nodes[sender], nodes[target], f"tick {tick}")
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if recorder is not None:
+            recorder.record()
+
+        links += len(delta.up) - len(delta.down)
+        node_count = len(network.nodes)
+        partitions = connectivity.stats()
+        row = {
+            "tick": tick,
+            "nodes": node_count,
+            "moved": sum(1 for node, old_pos, new_pos in moves if old_pos != new_pos),
+            "links": links,
+            "links_up": len(delta.up),
+            "links_down": len(delta.down),
+            "avg_degree": round(links / node_count, 3) if node_count else 0.0,
+            "isolated": sum(1 for node in network.nodes if not node.neighbors),
+            "components": partitions.components,
+            "largest_component": partitions.largest,
+            "step_ms": round(elapsed_ms, 3),
+        }
+        if dtn is not None:
+            delivery = dtn.stats()
+            row["dtn_delivered"] = delivery.delivered
+            row["dtn_in_flight"] = delivery.in_flight
+            row["dtn_delivery_ratio"] = round(delivery.delivery_ratio, 4)
+            row["dtn_mean_latency"] = round(delivery.mean_latency, 3)
+        if as_json:
+            out.write(json.dumps(row) + "\n")
+        else:
+            out.write(" ".join(f"{key}={value}" for key, value in row.items()) + "\n")
+    network.set_connectivity(None)
+    if dtn is not None:
+        network.set_dtn(None)
+
+
+def run_sharded(world: World, steps: int, tiles: Tuple[int, int], out=None, as_json: bool = False) -> None:
+    """
+    Like run, but with the world's grid split into tiles stepped by worker processes (see sharding.py). Only the counts the workers
+    report are printed, so no per-node work is done in this process; the world itself is left as it was.
+    """
+    out = out or sys.stdout
+    sharded = world.shard(tiles)
+    try:
+        links = len(sharded.links())
+        for tick in range(1, steps + 1):
+            started = time.perf_counter()
+            result = sharded.step()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            links += len(result.links_up) - len(result.links_down)
+            row = {
+                "tick": tick,
+                "nodes": sharded.count,
+                "moved": result.moved,
+                "links": links,
+                "links_up": len(result.links_up),
+                "links_down": len(result.links_down),
+                "avg_degree": round(links / sharded.count, 3) if sharded.count else 0.0,
+                "step_ms": round(elapsed_ms, 3),
+            }
+            if as_json:
+                out.write(json.dumps(row) + "\n")
+            else:
+                out.write(" ".join(f"{key}={value}" for key, value in row.items()) + "\n")
+    finally:
+        sharded.close()
+
+
+def parse_tiles(text: str) -> Tuple[int, int]:
+    cols, _, rows = text.lower().partition("x")
+    try:
+        return int(cols), int(rows or 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected tiles as COLSxROWS (e.g. 4x2), got {text!r}.")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run a MANET simulation headless (no GUI, no tkinter) and print per-step metrics.")
+    parser.add_argument("--scenario", help="Path to a JSON or JSON Lines scenario file (see scenario.py). If given, the random world options are ignored.")
+    parser.add_argument("--width", type=int, default=50, help="World width in cells (random world).")
+    parser.add_argument("--height", type=int, default=50, help="World height in cells (random world).")
+    parser.add_argument("--nodes", type=int, default=100, help="Number of nodes (random world).")
+    parser.add_argument("--walls", type=int, default=0, help="Number of randomly placed walls (random world).")
+    parser.add_argument("--range", dest="comm_range", type=int, default=2, help="Communication range of every node (random world).")
+    parser.add_argument("--seed", type=int, help="Random seed, for reproducible runs.")
+    parser.add_argument("--steps", type=int, default=10, help="Number of ticks to simulate.")
+    parser.add_argument("--vectorized", action="store_true", help="Use the NumPy movement engine (requires NumPy).")
+    parser.add_argument("--json", action="store_true", help="Print metrics as JSON lines instead of key=value text.")
+    parser.add_argument("--verbose", action="store_true", help="Print every simulation event (same as --log-level debug).")
+    parser.add_argument("--log-level", choices=["debug", "info", "warning", "error", "off"], help="Print simulation events at or above this level (off by default).")
+    parser.add_argument("--log-file", help="Also write simulation events (at --log-level, or info) to this file as JSON lines, in batches.")
+    parser.add_argument("--metrics", action="store_true", help="Time each phase and count hot-path work, printing the totals as JSON to stderr at the end.")
+    parser.add_argument("--metrics-port", type=int, help="Serve live metrics in Prometheus text format on http://127.0.0.1:PORT/metrics while running.")
+    parser.add_argument("--line-of-sight", action="store_true", help="Let walls block radio links (see radio.py), instead of range alone.")
+    parser.add_argument("--wall-factor", type=float, default=0.0, help="With --line-of-sight, the range left per wall crossed (0 blocks, 0.5 halves).")
+    parser.add_argument("--tiles", type=parse_tiles, help="Split the grid into COLSxROWS tiles, each stepped by a worker process (implies --vectorized).")
+    parser.add_argument("--trace", help="Record the run to this trace directory (binary columns, see recording.py) for later replay.")
+    parser.add_argument("--keyframe-interval", type=int, default=100, help="Ticks between full link snapshots in the trace.")
+    parser.add_argument("--dtn", choices=sorted(DTN_STRATEGIES), help="Send random messages every tick with store-carry-forward (DTN) routing, printing delivery statistics (see dtn.py).")
+    parser.add_argument("--dtn-messages", type=int, default=1, help="With --dtn, messages sent between random pairs of nodes per tick.")
+    parser.add_argument("--dtn-ttl", type=float, help="With --dtn, ticks a message is carried before it is dropped undelivered (forever by default).")
+    parser.add_argument("--dtn-buffer", type=int, default=DEFAULT_BUFFER_CAPACITY, help="With --dtn, messages each node can carry.")
+    args = parser.parse_args(argv)
+    if args.tiles and args.trace:
+        parser.error("--trace can't be combined with --tiles: the tile workers don't send back the positions a trace records.")
+    if args.tiles and args.line_of_sight:
+        parser.error("--line-of-sight can't be combined with --tiles: the tile workers only link nodes by range.")
+    if args.tiles and args.dtn:
+        parser.error("--dtn can't be combined with --tiles: the tile workers don't report the contacts DTN routing needs.")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    level = DEBUG if args.verbose else parse_level(args.log_level)
+    if level != OFF:
+        log.subscribe(print_event, level)
+    if args.metrics:
+        metrics.enable()
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    sink = None
+    if args.log_file:
+        sink = log.subscribe(BatchFileSink(args.log_file), INFO if level == OFF else level)
+    try:
+        vectorized = args.vectorized or args.tiles is not None
+        if args.scenario:
+            world = load_world(args.scenario, vectorized=vectorized, seed=args.seed, neighbors=False) # run() builds neighbors, after any link model is plugged in.
+        else:
+            world = random_world(args.width, args.height, args.nodes, args.comm_range, args.walls, args.seed, vectorized)
+        if args.line_of_sight:
+            world.network.set_link_model(LineOfSight(world, args.wall_factor))
+        dtn = DTNRouter(DTN_STRATEGIES[args.dtn](), args.dtn_buffer, args.dtn_ttl) if args.dtn else None
+        if args.tiles:
+            run_sharded(world, args.steps, args.tiles, as_json=args.json)
+        elif args.trace:
+            with TraceRecorder(args.trace, world, args.keyframe_interval) as recorder:
+                run(world, args.steps, as_json=args.json, recorder=recorder, dtn=dtn, dtn_messages=args.dtn_messages, seed=args.seed)
+        else:
+            run(world, args.steps, as_json=args.json, dtn=dtn, dtn_messages=args.dtn_messages, seed=args.seed)
+        if args.metrics:
+            print(json.dumps(metrics.snapshot(), indent=2), file=sys.stderr)
+    finally:
+        metrics.stop()
+        if sink is not None:
+            log.unsubscribe(sink)
+            sink.close()
+
+
+if __name__ == "__main__":
+    main()
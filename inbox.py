@@ -0,0 +1,54 @@
+from collections import deque
+from typing import Deque, Iterator, Tuple
+
+DROP_OLDEST = "drop-oldest" # When full, a new message pushes out the oldest one (a ring buffer).
+DROP_NEWEST = "drop-newest" # When full, new messages are refused and the inbox keeps what it already has.
+POLICIES = (DROP_OLDEST, DROP_NEWEST)
+
+DEFAULT_CAPACITY = 256 # How many messages an inbox holds unless configured otherwise.
+DEFAULT_POLICY = DROP_OLDEST
+
+Message = Tuple[int, str] # (sender_id, text)
+
+
+class Inbox:
+    """
+    A bounded message buffer of (sender_id, text) tuples.
+    Once capacity messages are held, the eviction policy decides whether the oldest message is dropped to make room (drop-oldest)
+    or the incoming one is refused (drop-newest). Either way the inbox never grows past capacity, and dropped counts what was lost.
+    """
+    __slots__ = ("_messages", "policy", "dropped")
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, policy: str = DEFAULT_POLICY):
+        if capacity < 1:
+            raise ValueError("An inbox needs room for at least one message.")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown inbox policy {policy!r}, expected one of {POLICIES}.")
+        self._messages: Deque[Message] = deque(maxlen=capacity) # The deque's maxlen makes it a ring buffer.
+        self.policy: str = policy
+        self.dropped: int = 0 # How many messages were evicted or refused because the inbox was full.
+
+    @property
+    def capacity(self) -> int:
+        return self._messages.maxlen
+
+    def append(self, message: Message) -> bool: # This function stores a message, returning False if it was refused.
+        messages = self._messages
+        if len(messages) == messages.maxlen:
+            self.dropped += 1
+            if self.policy == DROP_NEWEST:
+                return False
+        messages.append(message) # Under drop-oldest, a full deque discards its oldest message by itself.
+        return True
+
+    def clear(self) -> None:
+        self._messages.clear()
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __iter__(self) -> Iterator[Message]:
+        return iter(self._messages)
+
+    def __repr__(self):
+        return repr(list(self._messages))
@@ -1,16 +1,32 @@
-from node import Node
-from world import World
+import argparse
+import os
+from eventlog import INFO, log, print_event
+from scenario import load_world
 from worldGUI import WorldGUI
 
+DEMO_SCENARIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "demo_scenario.jsonl") # The four devices the GUI starts with by default.
+
 
 def main():
-    # Set up world and nodes
-    world = World(10, 10)
+    parser = argparse.ArgumentParser(description="Run the MANET simulator GUI.")
+    parser.add_argument("--scenario", default=DEMO_SCENARIO, help="Scenario file to load (JSON or JSON Lines, see scenario.py). Defaults to the four device demo.")
+    parser.add_argument("--replay", help="Replay a recorded trace directory (see headless.py --trace) instead of simulating.")
+    parser.add_argument("--sim-process", action="store_true", help="Run the simulation in its own process, so the GUI only draws the frames it publishes.")
+    args = parser.parse_args()
+    if args.replay:
+        from recording import open_replay # Only replays need NumPy.
+        WorldGUI(open_replay(args.replay)).run()
+        return
+
+    log.subscribe(print_event, INFO) # Echo simulation events (messages sent, received and refused) to the terminal.
+
+    if args.sim_process:
+        from bridge import RemoteWorld # Only the shared-memory bridge needs NumPy.
+        WorldGUI(RemoteWorld(load_world, args.scenario)).run() # The simulation process loads the same scenario, and forwards its events here.
+        return
 
-    world.create_node(1, "Phone", (1, 1), comm_range=2, base_color="#ff0000") # red
-    world.create_node(2, "Tablet", (2, 2), comm_range=2, base_color="#007fff") # blue
-    world.create_node(3, "Laptop", (5, 5), comm_range=2, base_color="#24c81e") # green
-    world.create_node(4, "SmartWatch", (8, 8), comm_range=2, base_color="#ff9000") # orange
+    # Set up world and nodes (streamed in from the scenario file, with neighbors built once at the end)
+    world = load_world(args.scenario)
 
     # Launch GUI, passing the world (all simulation happens through the GUI)
     gui = WorldGUI(world)
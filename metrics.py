@@ -0,0 +1,174 @@
+"""
+Per-phase timers and counters for the simulation's hot paths, with an optional Prometheus endpoint.
+
+Simulation code times its phases (movement planning, neighbor updates, routing, drawing) and counts its work (pairs tested,
+cells probed, messages delivered or dropped, canvas items created) into the module-level registry. The registry starts disabled,
+and every call site checks metrics.enabled before reading the clock or counting, so a run with metrics off pays one attribute
+check per phase.
+
+    from metrics import metrics
+    metrics.enable()
+    ...
+    print(metrics.snapshot())
+    metrics.serve(9100)   # http://127.0.0.1:9100/metrics, in Prometheus text format
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+PREFIX = "manet_" # Prepended to every exported metric name.
+
+# What each metric measures, exported as its Prometheus HELP text. Metrics not listed here are still exported.
+DESCRIPTIONS: Dict[str, str] = {
+    "world.step": "Time spent planning one step of movement (World.step).",
+    "world.cells_probed": "Candidate cells checked while planning moves.",
+    "world.occupancy_checks": "Calls to World.is_occupied.",
+    "network.update_neighbors": "Time spent rebuilding or incrementally updating neighbor lists.",
+    "network.pairs_tested": "Candidate node pairs distance-tested for neighborship.",
+    "network.route": "Time spent finding multi-hop routes.",
+    "messages.delivered": "Messages delivered to their target.",
+    "messages.undeliverable": "Messages that couldn't be delivered (no link or route).",
+    "messages.dropped": "Messages evicted or refused by a full inbox.",
+    "broadcast.transmissions": "Transmissions made by finished broadcasts.",
+    "broadcast.redundant": "Broadcast copies received by nodes that had already seen the message.",
+    "dtn.relayed": "Message copies handed between DTN carriers.",
+    "dtn.delivered": "Messages delivered by store-carry-forward (DTN) routing.",
+    "draw": "Time spent drawing the world onto the canvas.",
+    "canvas.items_created": "Canvas items created by the renderer.",
+}
+
+
+class TimerStats:
+    """How many times a phase ran, and its total and longest wall clock time in seconds."""
+    __slots__ = ("count", "total", "maximum")
+
+    def __init__(self):
+        self.count: int = 0
+        self.total: float = 0.0
+        self.maximum: float = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {"count": self.count, "total_seconds": self.total, "max_seconds": self.maximum,
+                "mean_seconds": self.total / self.count if self.count else 0.0}
+
+
+class MetricsRegistry:
+    """
+    Named counters and phase timers. Call sites should check enabled first, e.g.
+
+        started = time.perf_counter() if metrics.enabled else 0.0
+        ...
+        if started:
+            metrics.observe("world.step", time.perf_counter() - started)
+    """
+
+    def __init__(self):
+        self.enabled: bool = False # Nothing is timed or counted while this is False.
+        self.counters: Dict[str, int] = {}
+        self.timers: Dict[str, TimerStats] = {}
+        self._lock = threading.Lock() # Guards snapshots taken by the HTTP thread against new names being added mid-read.
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        """Forget every counter and timer (whether enabled or not)."""
+        with self._lock:
+            self.counters = {}
+            self.timers = {}
+
+    def count(self, name: str, amount: int = 1) -> None:
+        counters = self.counters
+        if name in counters:
+            counters[name] += amount
+        else:
+            with self._lock:
+                counters[name] = counters.get(name, 0) + amount
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record one run of a timed phase."""
+        stats = self.timers.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self.timers.setdefault(name, TimerStats())
+        stats.count += 1
+        stats.total += seconds
+        if seconds > stats.maximum:
+            stats.maximum = seconds
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Every counter and timer as plain dicts, e.g. for printing as JSON."""
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "timers": {name: stats.as_dict() for name, stats in self.timers.items()},
+            }
+
+    def prometheus_text(self) -> str:
+        """Render every metric in the Prometheus text exposition format. Timers are summaries (_sum and _count) plus a _max_seconds gauge."""
+        lines = []
+        snapshot = self.snapshot()
+        for name, value in sorted(snapshot["counters"].items()):
+            metric = _metric_name(name) + "_total"
+            lines.append(f"# HELP {metric} {DESCRIPTIONS.get(name, name)}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for name, stats in sorted(snapshot["timers"].items()):
+            metric = _metric_name(name) + "_seconds"
+            lines.append(f"# HELP {metric} {DESCRIPTIONS.get(name, name)}")
+            lines.append(f"# TYPE {metric} summary")
+            lines.append(f"{metric}_sum {stats['total_seconds']!r}")
+            lines.append(f"{metric}_count {stats['count']}")
+            longest = _metric_name(name) + "_max_seconds"
+            lines.append(f"# HELP {longest} Longest single run: {DESCRIPTIONS.get(name, name)}")
+            lines.append(f"# TYPE {longest} gauge")
+            lines.append(f"{longest} {stats['max_seconds']!r}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int = 9100, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Serve /metrics in Prometheus text format from a background thread (and enable the registry).
+        Binds to localhost by default. Returns the server; call stop() to shut it down.
+        """
+        if self._server is not None:
+            raise RuntimeError("The metrics endpoint is already being served.")
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass # Scrapes shouldn't print to the simulation's terminal.
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-endpoint", daemon=True).start()
+        self.enable()
+        return self._server
+
+    def stop(self) -> None:
+        """Shut the HTTP endpoint down, if it is running."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _metric_name(name: str) -> str:
+    return PREFIX + "".join(character if character.isalnum() else "_" for character in name)
+
+
+metrics = MetricsRegistry() # The simulation-wide metrics registry.
@@ -1,5 +1,28 @@
-from typing import List, Tuple
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
 from node import Node
+from eventlog import DEBUG, ERROR, INFO, WARNING, log
+from metrics import metrics
+from registry import NodeRegistry
+from spatial import SpatialGrid
+
+if TYPE_CHECKING:
+    from connectivity import Connectivity
+    from dtn import DTNRouter
+    from radio import LinkModel
+    from routing import RoutingProtocol
+    from scheduler import EventScheduler
+
+NodeState = Tuple[Tuple[int, int], bool, int]
+
+Link = Tuple[Node, Node] # A directed link (node, neighbor): neighbor appears in node's neighbor list.
+
+
+class LinkDelta(NamedTuple):
+    """The links that appeared (up) and disappeared (down) during one neighbor update."""
+    up: Set[Link]
+    down: Set[Link]
+
 
 class Network:
     """
@@ -8,61 +31,341 @@ class Network:
     """
 
     def __init__(self):
-        self.nodes: List[Node] = []
+        self.nodes: NodeRegistry = NodeRegistry() # Every node in join order, with constant time membership and lookups by node_id and by cell.
+        self._order: Dict[Node, int] = {} # The order each node joined in, used to keep neighbor lists in network order.
+        self._next_order: int = 0
+        self._grid: Optional[SpatialGrid] = None # The spatial index from the last neighbor update, kept so later updates can be incremental.
+        self._state: Dict[Node, NodeState] = {} # Each indexed node's (position, adhoc_enabled, comm_range) at the last neighbor update.
+        self._added: Dict[Node, None] = {} # Nodes added since the last neighbor update (kept in insertion order).
+        self._removed: Dict[Node, None] = {} # Nodes removed since the last neighbor update, whose links still need tearing down.
+        self._link_listeners: List[Callable[[LinkDelta], None]] = [] # Called with the link delta after every neighbor update.
+        self.routing: Optional['RoutingProtocol'] = None # An optional multi-hop routing protocol, used when the target isn't a direct neighbor.
+        self.connectivity: Optional['Connectivity'] = None # An optional service tracking connected components (partitions) from the link changes.
+        self.link_model: Optional['LinkModel'] = None # An optional radio model (e.g. walls blocking line of sight) applied on top of range.
+        self.dtn: Optional['DTNRouter'] = None # An optional store-carry-forward router, holding messages no link or route can deliver yet.
+        self._dirty: Dict[Node, None] = {} # Nodes whose links must be rescanned at the next update even if they didn't change (e.g. a wall appeared near them).
+
+    def add_link_listener(self, listener: Callable[[LinkDelta], None]) -> None: # This function subscribes a callback to the links that change on every neighbor update.
+        self._link_listeners.append(listener)
+
+    def remove_link_listener(self, listener: Callable[[LinkDelta], None]) -> None:
+        self._link_listeners.remove(listener)
+
+    def set_routing(self, routing: Optional['RoutingProtocol']) -> None: # This function plugs a routing protocol into the network (or removes it, with None).
+        if self.routing is not None:
+            self.remove_link_listener(self.routing.links_changed)
+        self.routing = routing
+        if routing is not None:
+            routing.reset()
+            self.add_link_listener(routing.links_changed) # The protocol keeps its route caches valid from the link changes alone.
+
+    def set_connectivity(self, connectivity: Optional['Connectivity']) -> None: # This function attaches a connectivity service (or detaches it, with None).
+        if self.connectivity is not None:
+            self.remove_link_listener(self.connectivity.links_changed)
+        self.connectivity = connectivity
+        if connectivity is not None:
+            connectivity.reset(self.nodes) # Start from the nodes and neighbor lists as they are now.
+            self.add_link_listener(connectivity.links_changed)
+
+    def set_dtn(self, dtn: Optional['DTNRouter']) -> None: # This function attaches a delay-tolerant router (or detaches it, with None).
+        if self.dtn is not None:
+            self.remove_link_listener(self.dtn.links_changed)
+        self.dtn = dtn
+        if dtn is not None:
+            dtn.reset(self.nodes) # The links up now are its first contacts.
+            self.add_link_listener(dtn.links_changed) # Messages are handed over as contacts start, from the link changes alone.
+
+    def set_link_model(self, link_model: Optional['LinkModel']) -> None: # This function plugs in a radio model deciding which in-range nodes can hear each other (None for free space).
+        self.link_model = link_model
+        self._grid = None # Every link may change, so the next update is a full rebuild.
+
+    def links_may_have_changed(self, pos: Tuple[int, int]) -> None: # This function marks the nodes around a position for a rescan, e.g. after a wall was added there.
+        if self._grid is not None:
+            self._dirty.update(dict.fromkeys(self._grid.nearby(pos)))
 
     def add_node(self, new_node: Node) -> None: #This function adds a node to this network's list of nodes (neighbors)
-        self.nodes.append(new_node)
-        print(f"Node added to network: {new_node.node_name} at position {new_node.position}")
+        self.nodes.add(new_node)
+        self._order[new_node] = self._next_order
+        self._next_order += 1
+        self._added[new_node] = None
+        self._removed.pop(new_node, None)
+        if self.connectivity is not None:
+            self.connectivity.node_added(new_node)
+        if log.threshold <= DEBUG:
+            log.emit(DEBUG, "network.node_added", f"Node added to network: {new_node.node_name} at position {new_node.position}", node_id=new_node.node_id, position=new_node.position)
+
+    def add_nodes(self, new_nodes: Iterable[Node]) -> None: # This function adds a batch of nodes, as add_node does, but reports them with a single event.
+        nodes, order, added, removed = self.nodes, self._order, self._added, self._removed
+        count = 0
+        for new_node in new_nodes:
+            nodes.add(new_node)
+            order[new_node] = self._next_order
+            self._next_order += 1
+            added[new_node] = None
+            removed.pop(new_node, None)
+            if self.connectivity is not None:
+                self.connectivity.node_added(new_node)
+            count += 1
+        if log.threshold <= DEBUG:
+            log.emit(DEBUG, "network.nodes_added", f"{count} nodes added to network.", count=count)
 
     def remove_node(self, node: Node) -> None: #This function removes a node from this network's list of neighbor
-        if node in self.nodes: # Check if the node is already in the network's list of registered nodes.
-            self.nodes.remove(node) # If it is, we remove the node from the network.
-            print(f"\nNode removed from network: {node.node_name}")
+        if self.nodes.remove(node): # Remove the node if it is in the network's registry of nodes.
+            self._order.pop(node, None)
+            self._added.pop(node, None)
+            self._removed[node] = None
+            if self.connectivity is not None:
+                self.connectivity.node_removed(node)
+            if log.threshold <= INFO:
+                log.emit(INFO, "network.node_removed", f"Node removed from network: {node.node_name}", node_id=node.node_id)
         else:
-            print(f"Tried to remove node not in network: {node.node_name}") # Otherwise, explain that we cannot remove nodes from the network that arent in the network.
+            if log.threshold <= WARNING:
+                log.emit(WARNING, "network.remove_failed", f"Tried to remove node not in network: {node.node_name}", node_id=node.node_id) # Otherwise, explain that we cannot remove nodes from the network that arent in the network.
 
-    def update_neighbors(self) -> None: # This function updates the neighbor list of every node within this network.
-        print("\nUpdating neighbor lists for all nodes in the network...")
+    def update_neighbors(self) -> LinkDelta: # This function rebuilds the neighbor list of every node within this network, and returns the links that changed.
+        started = time.perf_counter() if metrics.enabled else 0.0 # Read back below, so turning metrics on mid-call is harmless.
+        previous = {node: node._neighbors for node in self.nodes}
+        delta = self._tear_down_removed()
         for node in self.nodes:
+            node._neighbors = [] # A device with adhoc disabled can't see anyone, so it keeps an empty list.
+        self._order = {node: index for index, node in enumerate(self.nodes)} # Used to keep each neighbor list in network order, exactly as a full scan would.
+        self._next_order = len(self.nodes)
+        self._added.clear()
+        self._dirty.clear()
+        participants = [node for node in self.nodes if node.adhoc_enabled]
+        # Bucket every adhoc participant into a grid whose cells are as wide as the longest range,
+        # so each node only has to be compared against the nodes in its own and the 8 surrounding cells.
+        grid = SpatialGrid(max((node.comm_range for node in participants), default=1))
+        for node in participants:
+            grid.insert(node)
+        for node in participants:
+            node._neighbors = self._scan_neighbors(node, grid, self._order, self.link_model)
+        self._grid = grid
+        if metrics.enabled:
+            metrics.count("network.pairs_tested", sum(grid.count_nearby(node.position) - 1 for node in participants))
+        self._state = {node: self._snapshot(node) for node in self.nodes}
+        for node, old_neighbors in previous.items():
+            self._diff_neighbors(node, old_neighbors, delta)
+        if log.threshold <= DEBUG:
+            log.emit(DEBUG, "network.neighbors_updated", f"Neighbor lists updated: {len(delta.up)} links up, {len(delta.down)} links down.", up=len(delta.up), down=len(delta.down), full=True)
+        if started:
+            metrics.observe("network.update_neighbors", time.perf_counter() - started)
+        self._notify_link_listeners(delta)
+        return delta
+
+    def update_neighbors_incremental(self, changed: Optional[Iterable[Node]] = None) -> LinkDelta: # This function only recomputes adjacency around nodes that moved or toggled adhoc mode.
+        """
+        Recompute neighbor lists only for nodes whose position, adhoc_enabled flag or range changed since the last update,
+        plus the nodes close enough to have seen them come or go. Nodes added or removed through this network are always included.
+        If changed is None, every node is checked against its last known state (an O(n) comparison, with no pair tests);
+        passing the moved nodes directly keeps the cost proportional to the number of moves.
+        Returns the links that appeared and disappeared.
+        """
+        if self._grid is None:
+            return self.update_neighbors() # Nothing has been indexed yet, so there is nothing to update incrementally.
+        if changed is None:
+            changed = [node for node in self.nodes if self._state.get(node) != self._snapshot(node)]
+        changed = dict.fromkeys(node for node in changed if node not in self._removed) # De-duplicate while keeping the caller's order.
+        changed.update(self._added)
+        grid = self._grid
+        # Nodes near a new wall haven't changed themselves, but the links they can see may have.
+        dirty = {node: None for node in self._dirty if node in self._order}
+        self._dirty.clear()
+        for node in changed:
+            if node not in self._order:
+                return self.update_neighbors() # This node was put in the node list directly, so it has no place in the network order yet.
+            if node.adhoc_enabled and node.comm_range > grid.cell_size:
+                return self.update_neighbors() # The grid's cells are too narrow for this node's new range, so rebuild with wider ones.
+
+        started = time.perf_counter() if metrics.enabled else 0.0
+        affected: Dict[Node, None] = {}
+        for node in self._removed:
+            state = self._state.pop(node, None)
+            if node in grid:
+                affected.update(dict.fromkeys(grid.nearby(state[0]))) # These nodes may have had the removed node as a neighbor.
+                grid.remove(node)
+        delta = self._tear_down_removed()
+        for node in changed:
+            if node in grid:
+                affected.update(dict.fromkeys(grid.nearby(self._state[node][0]))) # Nodes near where it was may lose it as a neighbor.
+                grid.remove(node)
+            if node.adhoc_enabled:
+                grid.insert(node)
+                affected.update(dict.fromkeys(grid.nearby(node.position))) # Nodes near where it is now may gain it as a neighbor.
+            affected[node] = None
+            self._state[node] = self._snapshot(node)
+        self._added.clear()
+        affected.update(dirty)
+
+        for node in affected:
+            if node not in self._order:
+                continue
+            old_neighbors = node._neighbors
+            node._neighbors = self._scan_neighbors(node, grid, self._order, self.link_model) if node in grid else []
+            self._diff_neighbors(node, old_neighbors, delta)
+        if started:
+            metrics.count("network.pairs_tested", sum(grid.count_nearby(node.position) - 1 for node in affected if node in grid))
+            metrics.observe("network.update_neighbors", time.perf_counter() - started)
+        if log.threshold <= DEBUG:
+            log.emit(DEBUG, "network.neighbors_updated", f"Neighbor lists updated around {len(affected)} nodes: {len(delta.up)} links up, {len(delta.down)} links down.", up=len(delta.up), down=len(delta.down), full=False)
+        self._notify_link_listeners(delta)
+        return delta
+
+    def _notify_link_listeners(self, delta: LinkDelta) -> None:
+        if delta.up or delta.down:
+            for listener in self._link_listeners:
+                listener(delta)
+
+    def _tear_down_removed(self) -> LinkDelta: # This function clears the neighbor lists of removed nodes, recording their links as down.
+        delta = LinkDelta(set(), set())
+        for node in self._removed:
+            delta.down.update((node, neighbor) for neighbor in node._neighbors)
             node._neighbors = []
-            if not node.adhoc_enabled:
-                continue  # This device has adhoc disabled, so it can't see anyone
-            for other in self.nodes:
-                # A device is only considered a neighbor if:
-                # 1. It's not the same device,
-                # 2. It's within range,
-                # 3. The other device ALSO has adhoc enabled.
-                if (
-                        node is not other
-                        and other.adhoc_enabled
-                        and self.in_range(node, other)
-                ):
-                    node._neighbors.append(other)
-        print("Neighbor lists updated.")
+        self._removed.clear()
+        return delta
+
+    @staticmethod
+    def _diff_neighbors(node: Node, old_neighbors: List[Node], delta: LinkDelta) -> None: # This function records how one node's neighbor list changed.
+        new_neighbors = node._neighbors
+        if old_neighbors == new_neighbors:
+            return
+        old_set = set(old_neighbors)
+        new_set = set(new_neighbors)
+        delta.up.update((node, neighbor) for neighbor in new_set - old_set)
+        delta.down.update((node, neighbor) for neighbor in old_set - new_set)
+
+    @staticmethod
+    def _snapshot(node: Node) -> NodeState:
+        return node.position, node.adhoc_enabled, node.comm_range
+
+    @staticmethod
+    def _scan_neighbors(node: Node, grid: SpatialGrid, order: Dict[Node, int], link_model: Optional['LinkModel'] = None) -> List[Node]: # This function returns the neighbors of one node, using the grid to skip distant candidates.
+        # A device is only considered a neighbor if:
+        # 1. It's not the same device,
+        # 2. It's within range,
+        # 3. The other device ALSO has adhoc enabled (only adhoc participants are ever put in the grid),
+        # 4. The link model (if any) agrees, e.g. there's no wall in the way.
+        comm_range = node.comm_range
+        if comm_range < 0:
+            return [] # A negative range can never cover any distance, not even 0.
+        x, y = node.position
+        range_squared = comm_range * comm_range # Compare squared distances so no square root is needed per pair.
+        found = []
+        for other in grid.nearby(node.position):
+            if other is node:
+                continue
+            dx = other.position[0] - x
+            dy = other.position[1] - y
+            distance_squared = dx * dx + dy * dy
+            if distance_squared <= range_squared and (link_model is None or link_model.allows(node.position, other.position, distance_squared, range_squared)):
+                found.append(other)
+        found.sort(key=order.__getitem__)
+        return found
 
     @staticmethod
     def in_range(node1: Node, node2: Node) -> bool: # This function checks if two nodes are within communication range of each other.
+        if metrics.enabled:
+            metrics.count("network.pairs_tested")
         dx = node1.position[0] - node2.position[0] # First, calculate the difference between the x-axis value of both ndoes
         dy = node1.position[1] - node2.position[1] # Do the same for the y-axis
         distance = (dx ** 2 + dy ** 2) ** 0.5 # Then produce a distance value by finding the square root of both distances added together squred.
         return distance <= node1.comm_range # If the communication range of either node is greater than or equal to the distance between the two nodes, the nodes are in range.
 
     def move_node(self, node: Node, new_position: Tuple[int, int]) -> None: # This function moves the location of a node, then updates the neighbors for each node.
-        print(f"\nMoving node: {node.node_name} from {node.position} to {new_position}")
+        if log.threshold <= DEBUG:
+            log.emit(DEBUG, "network.move_node", f"Moving node: {node.node_name} from {node.position} to {new_position}", node_id=node.node_id, old=node.position, new=new_position)
+        old_position = node.position
         node.move(new_position)
-        self.update_neighbors()
+        self.nodes.moved(node, old_position, new_position)
+        self.update_neighbors_incremental([node]) # Only the moved node and the nodes around it need their neighbors recomputed.
 
 
-    def send_message(self, sender: Node, target: Node, message: str) -> None: # This function sends a message from a sender node to a target node.
-        print(f"\nAttempting to send message from {sender.node_name} to {target.node_name}...")
-        if sender not in self.nodes or target not in self.nodes: # Only allow this if the sender and target are within this network (nodes list).
-            print("Error: Sender or target is not in this network.")
-            return
+    def send_message(self, sender: Node, target: Node, message: str) -> bool: # This function sends a message from a sender node to a target node, returning whether it was delivered (a DTN router, if any, buffers it otherwise).
+        if sender not in self.nodes or target not in self.nodes: # Only allow this if the sender and target are within this network (constant time registry lookups).
+            if log.threshold <= ERROR:
+                log.emit(ERROR, "message.rejected", f"Error: Cannot send from {sender.node_name} to {target.node_name}, sender or target is not in this network.", sender_id=sender.node_id, target_id=target.node_id)
+            return False
         if target in sender.neighbors: # Otherwise, add the sender's message to their target's message list, and display this interaction.
-            print(f"SUCCESS: {sender.node_name} sends message to {target.node_name}: \"{message}\"")
+            if log.threshold <= INFO:
+                log.emit(INFO, "message.sent", f"SUCCESS: {sender.node_name} sends message to {target.node_name}: \"{message}\"", sender_id=sender.node_id, target_id=target.node_id, hops=1)
             target.receive_message(sender, message)
+            return True
+        path = self._route(sender, target) # If a routing protocol is plugged in, look for a multi-hop route instead.
+        if path is not None:
+            if log.threshold <= INFO:
+                hops = " -> ".join(node.node_name for node in path)
+                log.emit(INFO, "message.sent", f"SUCCESS: {sender.node_name} sends message to {target.node_name} over {len(path) - 1} hops ({hops}): \"{message}\"",
+                         sender_id=sender.node_id, target_id=target.node_id, hops=len(path) - 1, path=[node.node_id for node in path])
+            target.receive_message(sender, message)
+            return True
+        if self.dtn is not None:
+            return self.dtn.store(sender, target, message) # Buffered, and carried across contacts until it reaches the target.
+        if metrics.enabled:
+            metrics.count("messages.undeliverable")
+        if log.threshold <= WARNING:
+            if self.routing is None:
+                reason = f"FAIL: {target.node_name} is not a neighbor of {sender.node_name}! Message not delivered." # If sender attempts to deliver a message from an out of range node, report an error.
+            else:
+                reason = f"FAIL: No route from {sender.node_name} to {target.node_name}! Message not delivered."
+            log.emit(WARNING, "message.undeliverable", reason, sender_id=sender.node_id, target_id=target.node_id)
+        return False
+
+    def transmit(self, scheduler: 'EventScheduler', sender: Node, target: Node, message: str, hop_latency: float = 1.0,
+                 on_result: Optional[Callable[[bool], None]] = None) -> bool:
+        """
+        Send a message as scheduled events instead of delivering it instantly: each hop takes hop_latency units of simulated time.
+        The route is chosen when the message is sent (directly, or through the routing protocol), and every hop is re-checked when it fires,
+        so a link that breaks while the message is in flight drops it. on_result, if given, is called with whether the message was delivered.
+        Returns whether the message could be sent at all.
+        """
+        if sender not in self.nodes or target not in self.nodes:
+            if log.threshold <= ERROR:
+                log.emit(ERROR, "message.rejected", f"Error: Cannot transmit from {sender.node_name} to {target.node_name}, sender or target is not in this network.", sender_id=sender.node_id, target_id=target.node_id)
+            return False
+        if target in sender.neighbors:
+            path = [sender, target]
         else:
-            print(f"FAIL: {target.node_name} is not a neighbor of {sender.node_name}! Message not delivered.") # If sender attempts to deliver a message from an out of range node, display an error.
+            path = self._route(sender, target)
+        if path is None or len(path) < 2:
+            if metrics.enabled:
+                metrics.count("messages.undeliverable")
+            if log.threshold <= WARNING:
+                log.emit(WARNING, "message.undeliverable", f"FAIL: No route from {sender.node_name} to {target.node_name}! Message not sent.", sender_id=sender.node_id, target_id=target.node_id)
+            if on_result is not None:
+                on_result(False)
+            return False
+        scheduler.schedule(hop_latency, self._transmit_hop, scheduler, path, 1, message, hop_latency, on_result)
+        return True
+
+    def _route(self, sender: Node, target: Node) -> Optional[List[Node]]: # This function asks the routing protocol (if any) for a multi-hop path.
+        if self.routing is None:
+            return None
+        if not metrics.enabled:
+            return self.routing.route(sender, target)
+        started = time.perf_counter()
+        path = self.routing.route(sender, target)
+        metrics.observe("network.route", time.perf_counter() - started)
+        return path
+
+    def _transmit_hop(self, scheduler: 'EventScheduler', path: List[Node], hop: int, message: str, hop_latency: float,
+                      on_result: Optional[Callable[[bool], None]]) -> None: # This function completes one hop of a scheduled transmission.
+        previous, current = path[hop - 1], path[hop]
+        if current not in previous.neighbors:
+            if metrics.enabled:
+                metrics.count("messages.undeliverable")
+            if log.threshold <= WARNING:
+                log.emit(WARNING, "message.dropped", f"FAIL: Link from {previous.node_name} to {current.node_name} broke in flight! Message dropped.", sender_id=path[0].node_id, target_id=path[-1].node_id, at_hop=hop)
+            if on_result is not None:
+                on_result(False)
+            return
+        if hop < len(path) - 1:
+            scheduler.schedule(hop_latency, self._transmit_hop, scheduler, path, hop + 1, message, hop_latency, on_result)
+            return
+        if log.threshold <= INFO:
+            log.emit(INFO, "message.sent", f"SUCCESS: {path[0].node_name} sends message to {current.node_name} after {hop} hops: \"{message}\"", sender_id=path[0].node_id, target_id=current.node_id, hops=hop)
+        current.receive_message(path[0], message)
+        if on_result is not None:
+            on_result(True)
 
     def display_all_neighbors(self) -> None: # This function displays all neighbours for all nodes.
         for node in self.nodes:
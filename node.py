@@ -1,34 +1,56 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple, Union
+from eventlog import DEBUG, INFO, log
+from inbox import DEFAULT_CAPACITY, DEFAULT_POLICY, Inbox
+from metrics import metrics
 class Node:
     """
        Represents a device/node in the MANET simulation.
        Each node has an ID, name, 2D position, communication range, neighbors, and a message buffer.
        Nodes default to a communication range of 100.
+       Nodes use __slots__ and only hold simulation state, so large populations stay small in memory;
+       how a node is currently drawn (mid-animation position and colour) is kept by the GUI's renderer.
     """
+    __slots__ = ("_node_id", "_node_name", "_position", "_comm_range", "_neighbors", "_inbox", "adhoc_enabled", "base_color")
+
+    inbox_capacity: int = DEFAULT_CAPACITY # Default inbox size for every node (see configure_inbox to change it per node).
+    inbox_policy: str = DEFAULT_POLICY # Default eviction policy when an inbox is full ("drop-oldest" or "drop-newest").
+
     def __init__(self, node_id: int, node_name: str, position: tuple[int, int], comm_range: int =100, base_color: str = "#ff0000"):
         self._node_id: int = node_id # The node's (Device's) personal identifier, lets other nodes know who they are 'speaking' to.
         self._node_name: str = node_name # The name of the node/"Device" (, e.g, 'Dennis' iPhone)
         self._position: tuple[int, int] = position # A tuple representing the node's position on the 2D Map (x, y)
-        self.display_pos = (position[0], position[1]) # GUI position, used for smooth drawing.
         self._comm_range: int = comm_range # How close each node has to be to another node has to be in relation to another to communicate
         self._neighbors: List['Node'] = [] # A dynamic list that stores the nodes within this node's range
-        self._messages: List[tuple[int, str]] = [] # A dynamically building list of node_ids (int) paired to messages (str).
+        self._inbox: Optional[Inbox] = None # A bounded buffer of node_ids (int) paired to messages (str). Only created once the first message arrives.
         self.adhoc_enabled: bool = True # A boolean member to represent whether or not a device wants to be an adhoc participant
-        self.display_color: str = base_color # A string variable to represent the assigned colour of the device for the GUI. (Set at creation)
-        self.base_color = base_color
+        self.base_color: str = base_color # A string variable to represent the assigned colour of the device for the GUI. (Set at creation)
+
+    def configure_inbox(self, capacity: int = DEFAULT_CAPACITY, policy: str = DEFAULT_POLICY) -> None: # This function gives this node an inbox with its own size and eviction policy (the most recent messages that fit are kept).
+        inbox = Inbox(capacity, policy)
+        for message in list(self._inbox or ())[-capacity:]:
+            inbox.append(message)
+        self._inbox = inbox
 
 
     def move(self, new_position: tuple[int, int]) -> None: # This function sets a new position value for the node that it is called on.
         original_position = self.position # Start by storing the position of the node before it moved
         self._position = new_position # Change the position of this node to its new value
-        print(f"\n{self.node_name} moved from {original_position} to {self.position}") # Display updated node location
+        if log.threshold <= DEBUG: # Only build the event if someone is listening, this runs for every move.
+            log.emit(DEBUG, "node.move", f"{self.node_name} moved from {original_position} to {self.position}", node_id=self.node_id, old=original_position, new=self.position) # Report updated node location
 
     def receive_message(self, sender: 'Node', message: str) -> None: # This function makes this node (the node that calls the function) add a message from a declared sender to this node's message list.
-        self._messages.append((sender.node_id, message))  # Store the sender's id for tracking and the message they sent as a key and value (tuple) into the message list.
-        print(f"\n{self.node_name} received message from {sender.node_name}: {message}") # Display that this node recieved a message from the sender node, and show the message.
+        if self._inbox is None:
+            self._inbox = Inbox(self.inbox_capacity, self.inbox_policy)
+        if metrics.enabled:
+            metrics.count("messages.delivered")
+            if len(self._inbox) == self._inbox.capacity:
+                metrics.count("messages.dropped") # The inbox is full, so either this message or its oldest one is lost.
+        self._inbox.append((sender.node_id, message))  # Store the sender's id for tracking and the message they sent as a key and value (tuple) into the inbox. A full inbox evicts by its policy.
+        if log.threshold <= INFO:
+            log.emit(INFO, "message.received", f"{self.node_name} received message from {sender.node_name}: {message}", node_id=self.node_id, sender_id=sender.node_id) # Report that this node recieved a message from the sender node, and show the message.
 
     def display_messages(self) -> None: # This function displays all of this node's messages.
-        print(f"\n{self.node_name} messages: {self._messages}")
+        print(f"\n{self.node_name} messages: {list(self.messages)}")
 
     def display_neighbors(self) -> None:
         print(f"{self.node_name} neighbors: {[n.node_name for n in self.neighbors]}")
@@ -53,5 +75,9 @@ class Node:
     def neighbors(self) -> list['Node']:
         return self._neighbors
 
+    @property
+    def messages(self) -> Union[Inbox, Tuple[()]]: # The messages this node has received, oldest first (empty until the first one arrives).
+        return self._inbox if self._inbox is not None else ()
+
     def __repr__(self): #The string representation of a node
         return f"Node: {self._node_id} at position: {self._position}"
@@ -0,0 +1,108 @@
+from typing import Dict, Iterator, Set, Tuple
+
+Cell = Tuple[int, int]
+
+BLOCK = 8 # Side, in cells, of the regions the line of sight cache is split into, so a new wall only clears the regions around it.
+
+
+class LinkModel:
+    """
+    Decides whether two nodes that are within range of each other can actually hear each other. Plugged into a Network with
+    Network.set_link_model; the base model is free space, where range alone decides.
+    """
+
+    def allows(self, a: Cell, b: Cell, distance_squared: float, range_squared: float) -> bool:
+        """Whether a node at a can hear one at b, given their squared distance (already within range_squared)."""
+        return True
+
+    def wall_added(self, pos: Cell) -> None:
+        """Called by the World when a wall is added, so cached decisions near it can be forgotten."""
+
+
+def line_cells(a: Cell, b: Cell) -> Iterator[Cell]:
+    """Yield the cells strictly between a and b on the grid line joining them (Bresenham), in order from a."""
+    if a == b:
+        return # Nothing lies between a cell and itself (and the first step below would step past b).
+    x, y = a
+    x1, y1 = b
+    dx, dy = abs(x1 - x), -abs(y1 - y)
+    sx = 1 if x < x1 else -1
+    sy = 1 if y < y1 else -1
+    error = dx + dy
+    while True:
+        doubled = 2 * error
+        if doubled >= dy:
+            error += dy
+            x += sx
+        if doubled <= dx:
+            error += dx
+            y += sy
+        if (x, y) == b:
+            return
+        yield x, y
+
+
+class LineOfSight(LinkModel):
+    """
+    Walls get in the way of radio: every wall cell on the line between two nodes multiplies the range they can hear each other at
+    by wall_factor (0.0, the default, means any wall blocks the link; 0.5 halves the range for each wall crossed).
+    Raycasts are cached per pair of cells, so nodes moving around an unchanged map rarely raycast at all. The cache is split into
+    BLOCK x BLOCK regions by the first cell of each pair, and a new wall only clears the regions close enough for a cached line to cross it.
+    """
+
+    def __init__(self, world, wall_factor: float = 0.0, max_entries: int = 1_000_000):
+        if not 0.0 <= wall_factor <= 1.0:
+            raise ValueError("wall_factor must be between 0 (walls block) and 1 (walls don't matter).")
+        self.walls: Set[Cell] = world._wall_cells # The world's own wall set, so walls are always current.
+        self.wall_factor: float = wall_factor
+        self._cache: Dict[Cell, Dict[Tuple[Cell, Cell], int]] = {} # Maps a region to {(cell, cell): walls crossed} for pairs starting in it.
+        self._longest: int = 0 # The longest line cached so far (in cells along either axis), which bounds what a new wall can cross.
+        self._entries: int = 0
+        self.max_entries: int = max_entries # The whole cache is dropped when it grows past this, so long runs can't grow it forever.
+        self.raycasts: int = 0 # Raycasts actually performed, i.e. cache misses.
+
+    def walls_between(self, a: Cell, b: Cell) -> int:
+        """The number of wall cells on the line between a and b, from the cache when possible."""
+        if b < a:
+            a, b = b, a # Each pair is cached once, whichever end asks.
+        region = self._cache.get((a[0] // BLOCK, a[1] // BLOCK))
+        if region is None:
+            region = self._cache[(a[0] // BLOCK, a[1] // BLOCK)] = {}
+        crossed = region.get((a, b))
+        if crossed is None:
+            walls = self.walls
+            crossed = sum(1 for cell in line_cells(a, b) if cell in walls)
+            if self._entries >= self.max_entries:
+                self.clear()
+                region = self._cache[(a[0] // BLOCK, a[1] // BLOCK)] = {}
+            region[(a, b)] = crossed
+            self._entries += 1
+            self.raycasts += 1
+            length = max(abs(b[0] - a[0]), abs(b[1] - a[1]))
+            if length > self._longest:
+                self._longest = length
+        return crossed
+
+    def allows(self, a: Cell, b: Cell, distance_squared: float, range_squared: float) -> bool:
+        if not self.walls:
+            return True
+        crossed = self.walls_between(a, b)
+        if crossed == 0:
+            return True
+        if self.wall_factor == 0.0:
+            return False
+        return distance_squared <= range_squared * self.wall_factor ** (2 * crossed)
+
+    def wall_added(self, pos: Cell) -> None:
+        # A cached line can only cross pos if its first cell is within the longest cached line of it.
+        reach = self._longest
+        x0, y0 = (pos[0] - reach) // BLOCK, (pos[1] - reach) // BLOCK
+        x1, y1 = (pos[0] + reach) // BLOCK, (pos[1] + reach) // BLOCK
+        for bx in range(x0, x1 + 1):
+            for by in range(y0, y1 + 1):
+                self._entries -= len(self._cache.pop((bx, by), ()))
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._entries = 0
+        self._longest = 0
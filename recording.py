@@ -0,0 +1,304 @@
+"""
+Binary columnar traces: record a run tick by tick, then replay or scrub it later without re-simulating it.
+
+A trace is a directory of append-only column files, one fixed-width row per tick, so any tick's row is found by arithmetic alone:
+
+    header.json     world size, walls, the node table (id, name, range, colour) and the keyframe interval
+    positions.i32   per tick: the (x, y) of every node in the table, (-1, -1) for nodes no longer in the network
+    adhoc.u8        per tick: every node's adhoc flag
+    ticks.i64       per tick: where its link changes and link keyframe (if any) start in the two files below, and how many links each holds
+    links.i32       the directed links that came up, then went down, at each tick, as (node index, neighbor index) pairs
+    keyframes.i32   the full link set every keyframe_interval ticks, so links at any tick are rebuilt from at most that many deltas
+
+TraceReader memory-maps the files, so traces far larger than RAM can be scrubbed: seeking to a tick reads one row of positions and
+flags, one keyframe and a bounded number of deltas. TraceReplay turns a reader into something WorldGUI can draw in place of a World.
+Requires NumPy.
+
+    with TraceRecorder("run.trace", world) as recorder:
+        recorder.record()  # tick 0, the starting state
+        for _ in range(steps):
+            ...  # step the world and update neighbors
+            recorder.record()
+"""
+
+import json
+import os
+from typing import Dict, List, Optional, Set, Tuple
+from network import LinkDelta, Network
+from node import Node
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, only traces and the vectorized engine need it.
+    np = None
+
+HEADER_FILE = "header.json"
+POSITIONS_FILE = "positions.i32"
+ADHOC_FILE = "adhoc.u8"
+TICKS_FILE = "ticks.i64"
+LINKS_FILE = "links.i32"
+KEYFRAMES_FILE = "keyframes.i32"
+TRACE_VERSION = 1
+
+# Columns of each ticks.i64 row.
+LINKS_OFFSET, LINKS_UP, LINKS_DOWN, KEYFRAME_OFFSET, KEYFRAME_COUNT = range(5)
+TICK_COLUMNS = 5
+
+ABSENT = -1 # The coordinate recorded for a node that has left the network.
+
+IndexLink = Tuple[int, int] # A directed link as (node index, neighbor index) into the trace's node table.
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("Traces require NumPy. Install it with 'pip install numpy'.")
+
+
+class TraceRecorder:
+    """
+    Streams a world's per-tick state into a trace directory. The node table is taken from the network when the recorder is created,
+    and the recorder listens to the network's link deltas, so each record() only writes the links that changed since the last one
+    (plus a full keyframe every keyframe_interval ticks). Rows are buffered and written chunk_ticks at a time;
+    call close() (or use it as a context manager) to write what's left.
+    """
+
+    def __init__(self, path: str, world, keyframe_interval: int = 100, chunk_ticks: int = 64):
+        _require_numpy()
+        if keyframe_interval < 1:
+            raise ValueError("keyframe_interval must be at least 1.")
+        if os.path.isdir(path) and os.listdir(path):
+            raise FileExistsError(f"Trace directory {path} already exists and isn't empty.")
+        os.makedirs(path, exist_ok=True)
+        self.path: str = path
+        self.world = world
+        self.keyframe_interval: int = keyframe_interval
+        self.chunk_ticks: int = chunk_ticks
+        self.nodes: List[Node] = list(world.network.nodes) # The trace's node table; rows of every column follow this order.
+        self._index: Dict[Node, int] = {node: index for index, node in enumerate(self.nodes)}
+        self.ticks: int = 0 # How many ticks have been recorded.
+        self._links_written: int = 0 # Links (pairs) in links.i32 so far, including buffered ones.
+        self._keyframe_written: int = 0 # Links (pairs) in keyframes.i32 so far, including buffered ones.
+        # Links that came up since the last record (and haven't gone down again). Links that already exist count as coming up at tick 0.
+        self._up: Set[IndexLink] = {(self._index[node], self._index[neighbor]) for node in self.nodes for neighbor in node.neighbors}
+        self._down: Set[IndexLink] = set() # Links that went down since the last record (and haven't come back up).
+        self._buffers: Dict[str, List[bytes]] = {name: [] for name in (POSITIONS_FILE, ADHOC_FILE, TICKS_FILE, LINKS_FILE, KEYFRAMES_FILE)}
+        self._buffered: int = 0 # Ticks buffered but not yet written.
+        header = {
+            "version": TRACE_VERSION,
+            "width": world.width,
+            "height": world.height,
+            "walls": [list(wall) for wall in world.walls], # Walls are captured once, when recording starts.
+            "keyframe_interval": keyframe_interval,
+            "nodes": [{"id": node.node_id, "name": node.node_name, "comm_range": node.comm_range, "color": node.base_color} for node in self.nodes],
+        }
+        with open(os.path.join(path, HEADER_FILE), "w", encoding="utf-8") as file:
+            json.dump(header, file)
+        world.network.add_link_listener(self._links_changed)
+
+    def _links_changed(self, delta: LinkDelta) -> None: # This function folds one neighbor update's link delta into the changes for the next tick.
+        index = self._index
+        for node, neighbor in delta.down:
+            link = (index[node], index[neighbor])
+            if link in self._up:
+                self._up.discard(link) # Came up and went down again within one tick.
+            else:
+                self._down.add(link)
+        for node, neighbor in delta.up:
+            if node not in index or neighbor not in index:
+                raise ValueError("Nodes joined after recording started; start a new trace to record them.")
+            link = (index[node], index[neighbor])
+            if link in self._down:
+                self._down.discard(link)
+            else:
+                self._up.add(link)
+
+    def record(self) -> int:
+        """Append the world's current state as the next tick, returning its tick number."""
+        count = len(self.nodes)
+        positions = np.full((count, 2), ABSENT, dtype=np.int32)
+        adhoc = np.zeros(count, dtype=np.uint8)
+        rows = self.world.network.nodes
+        index = self._index
+        if len(rows) > count or any(node not in index for node in rows):
+            raise ValueError("Nodes joined after recording started; start a new trace to record them.")
+        if rows:
+            present = [index[node] for node in rows]
+            positions[present] = [node.position for node in rows]
+            adhoc[present] = [node.adhoc_enabled for node in rows]
+        row = np.zeros(TICK_COLUMNS, dtype=np.int64)
+        row[LINKS_OFFSET] = self._links_written
+        row[LINKS_UP] = len(self._up)
+        row[LINKS_DOWN] = len(self._down)
+        changes = list(self._up) + list(self._down)
+        self._links_written += len(changes)
+        row[KEYFRAME_OFFSET] = ABSENT
+        if self.ticks % self.keyframe_interval == 0:
+            keyframe = [(index[node], index[neighbor]) for node in self.world.network.nodes for neighbor in node.neighbors]
+            row[KEYFRAME_OFFSET] = self._keyframe_written
+            row[KEYFRAME_COUNT] = len(keyframe)
+            self._keyframe_written += len(keyframe)
+            self._buffers[KEYFRAMES_FILE].append(np.array(keyframe, dtype=np.int32).reshape(-1, 2).tobytes())
+        self._up = set()
+        self._down = set()
+        self._buffers[POSITIONS_FILE].append(positions.tobytes())
+        self._buffers[ADHOC_FILE].append(adhoc.tobytes())
+        self._buffers[LINKS_FILE].append(np.array(changes, dtype=np.int32).reshape(-1, 2).tobytes())
+        self._buffers[TICKS_FILE].append(row.tobytes())
+        self._buffered += 1
+        self.ticks += 1
+        if self._buffered >= self.chunk_ticks:
+            self.flush()
+        return self.ticks - 1
+
+    def flush(self) -> None:
+        """Write every buffered tick. The tick index is written last, so a reader never sees a tick whose data isn't there yet."""
+        for name in (POSITIONS_FILE, ADHOC_FILE, LINKS_FILE, KEYFRAMES_FILE, TICKS_FILE):
+            with open(os.path.join(self.path, name), "ab") as file:
+                file.write(b"".join(self._buffers[name]))
+            self._buffers[name].clear()
+        self._buffered = 0
+
+    def close(self) -> None:
+        self.flush()
+        self.world.network.remove_link_listener(self._links_changed)
+
+    def __enter__(self) -> 'TraceRecorder':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _map(path: str, dtype, columns: int):
+    """Memory-map a column file as rows of the given width (an empty array if the file is empty)."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return np.zeros((0, columns), dtype=dtype)
+    rows = os.path.getsize(path) // (np.dtype(dtype).itemsize * columns)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(rows, columns))
+
+
+class TraceReader:
+    """
+    Read-only, memory-mapped access to a trace. Only the pages a seek touches are read from disk,
+    so the trace's size doesn't matter: positions(t) and adhoc(t) are a single row, and links(t) is one keyframe plus at most
+    keyframe_interval - 1 deltas.
+    """
+
+    def __init__(self, path: str):
+        _require_numpy()
+        self.path: str = path
+        with open(os.path.join(path, HEADER_FILE), encoding="utf-8") as file:
+            self.header: dict = json.load(file)
+        if self.header.get("version") != TRACE_VERSION:
+            raise ValueError(f"Unsupported trace version {self.header.get('version')!r} in {path}.")
+        self.keyframe_interval: int = self.header["keyframe_interval"]
+        self.node_count: int = len(self.header["nodes"])
+        self._ticks = _map(os.path.join(path, TICKS_FILE), np.int64, TICK_COLUMNS)
+        self._positions = _map(os.path.join(path, POSITIONS_FILE), np.int32, 2 * self.node_count)
+        self._adhoc = _map(os.path.join(path, ADHOC_FILE), np.uint8, self.node_count)
+        self._links = _map(os.path.join(path, LINKS_FILE), np.int32, 2)
+        self._keyframes = _map(os.path.join(path, KEYFRAMES_FILE), np.int32, 2)
+
+    def __len__(self) -> int:
+        return len(self._ticks) # The tick index is written last, so every tick it lists is complete.
+
+    def _check(self, tick: int) -> None:
+        if not 0 <= tick < len(self):
+            raise IndexError(f"Tick {tick} is outside this trace (0 to {len(self) - 1}).")
+
+    def positions(self, tick: int):
+        """The (x, y) of every node at a tick, as an (nodes, 2) array; (-1, -1) for nodes that had left the network."""
+        self._check(tick)
+        return self._positions[tick].reshape(self.node_count, 2)
+
+    def adhoc(self, tick: int):
+        """Every node's adhoc flag at a tick, as a boolean array."""
+        self._check(tick)
+        return self._adhoc[tick].astype(bool)
+
+    def link_delta(self, tick: int) -> Tuple[List[IndexLink], List[IndexLink]]:
+        """The (up, down) links recorded at a tick, i.e. how the links changed since the tick before."""
+        self._check(tick)
+        offset, up, down = (int(value) for value in self._ticks[tick, :KEYFRAME_OFFSET])
+        rows = self._links[offset:offset + up + down].tolist()
+        return [tuple(link) for link in rows[:up]], [tuple(link) for link in rows[up:]]
+
+    def links(self, tick: int) -> Set[IndexLink]:
+        """Every directed link at a tick, rebuilt from the nearest keyframe at or before it."""
+        self._check(tick)
+        start = tick - tick % self.keyframe_interval
+        offset, count = (int(value) for value in self._ticks[start, KEYFRAME_OFFSET:])
+        links = set(map(tuple, self._keyframes[offset:offset + count].tolist()))
+        for later in range(start + 1, tick + 1):
+            up, down = self.link_delta(later)
+            links.difference_update(down)
+            links.update(up)
+        return links
+
+
+class TraceReplay:
+    """
+    A read-only stand-in for a World, driven by a trace instead of a simulation, so WorldGUI can draw and scrub a recorded run.
+    It holds one Node per entry in the trace's node table inside a real Network (so the renderer's link listener works unchanged);
+    seek() moves them to a recorded tick and announces the link changes to the network's link listeners.
+    """
+
+    def __init__(self, reader: TraceReader):
+        self.reader: TraceReader = reader
+        header = reader.header
+        self.width: int = header["width"]
+        self.height: int = header["height"]
+        self.walls: List[Tuple[int, int]] = [tuple(wall) for wall in header["walls"]]
+        self.network: Network = Network()
+        self.table: List[Node] = [Node(entry["id"], entry["name"], (ABSENT, ABSENT), entry["comm_range"], entry["color"]) for entry in header["nodes"]]
+        self.tick: int = -1 # The tick currently shown, -1 before the first seek.
+        self._links: Set[IndexLink] = set()
+        if len(reader):
+            self.seek(0)
+
+    def __len__(self) -> int:
+        return len(self.reader)
+
+    def node_at(self, pos: Tuple[int, int]) -> Optional[Node]:
+        return self.network.nodes.at(pos)
+
+    def seek(self, tick: int) -> List[Tuple[Node, Tuple[int, int], Tuple[int, int]]]:
+        """
+        Show a recorded tick: set every node's position, adhoc flag and neighbors to what they were, and send the link changes
+        to the network's link listeners. Returns (node, old_pos, new_pos) for nodes that moved, like World.step, for animation.
+        """
+        reader = self.reader
+        positions = reader.positions(tick).tolist()
+        adhoc = reader.adhoc(tick).tolist()
+        if tick == self.tick + 1 and self.tick >= 0:
+            up, down = reader.link_delta(tick) # Stepping forward one tick only needs that tick's changes.
+        else:
+            links = reader.links(tick)
+            up, down = links - self._links, self._links - links
+        self._links.difference_update(down)
+        self._links.update(up)
+        table = self.table
+        moves = []
+        present = []
+        for node, (x, y), enabled in zip(table, positions, adhoc):
+            if x == ABSENT:
+                continue
+            if node.position != (x, y) and node.position[0] != ABSENT:
+                moves.append((node, node.position, (x, y)))
+            node._position = (x, y)
+            node.adhoc_enabled = enabled
+            present.append(node)
+        self.network.nodes.replace(present) # Also reindexes every cell, as positions were just set directly.
+        for index, neighbor in down:
+            table[index]._neighbors.remove(table[neighbor])
+        for index, neighbor in up:
+            table[index]._neighbors.append(table[neighbor])
+        self.tick = tick
+        self.network._notify_link_listeners(LinkDelta({(table[a], table[b]) for a, b in up}, {(table[a], table[b]) for a, b in down}))
+        return moves
+
+
+def open_replay(path: str) -> TraceReplay:
+    """Open a trace directory for replay."""
+    return TraceReplay(TraceReader(path))
+
@@ -0,0 +1,83 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from node import Node
+
+Cell = Tuple[int, int]
+
+
+class NodeRegistry(Sequence):
+    """
+    The nodes of a network, in the order they joined, indexed by identity, node_id and the cell each one stands on.
+    Adding, removing, membership tests and lookups by id or cell are all constant time, so they stay flat as populations grow.
+    It is still a sequence like the list it replaces: indexing works too, but copies the nodes into a list the first time after any change.
+    Ids and cells are expected to be unique (a World never puts two nodes on one cell). If two nodes share one, lookups return the one indexed last.
+    Positions are set in many places without going through the network, so whatever moves a node calls moved() (World.apply_moves shares the cell index directly).
+    """
+    __slots__ = ("_nodes", "_by_id", "cells", "_list")
+
+    def __init__(self, nodes: Iterable[Node] = ()):
+        self._nodes: Dict[Node, None] = {} # Every node, in join order (dicts keep insertion order and find keys in constant time).
+        self._by_id: Dict[int, Node] = {} # Maps a node_id to its node.
+        self.cells: Dict[Cell, Node] = {} # Maps a cell to the node standing on it. World uses this same dict as its occupancy index.
+        self._list: Optional[List[Node]] = None # The nodes as a list, for indexing. Dropped whenever a node joins or leaves.
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: Node) -> None: # This function registers a node at the end of the join order.
+        self._nodes[node] = None
+        self._list = None
+        self._by_id[node.node_id] = node
+        self.cells[node.position] = node
+
+    def remove(self, node: Node) -> bool: # This function unregisters a node, returning whether it was registered.
+        if node not in self._nodes:
+            return False
+        del self._nodes[node]
+        self._list = None
+        if self._by_id.get(node.node_id) is node:
+            del self._by_id[node.node_id]
+        if self.cells.get(node.position) is node:
+            del self.cells[node.position]
+        return True
+
+    def moved(self, node: Node, old_pos: Cell, new_pos: Cell) -> None: # This function keeps the cell index in sync after a node was moved from old_pos to new_pos.
+        if self.cells.get(old_pos) is node:
+            del self.cells[old_pos]
+        if node in self._nodes:
+            self.cells[new_pos] = node
+
+    def replace(self, nodes: Iterable[Node]) -> None: # This function swaps the registered nodes for another set, indexed at their current positions.
+        self._nodes.clear()
+        self._list = None
+        self._by_id.clear()
+        self.cells.clear() # Cleared in place, as the World holds on to this dict.
+        for node in nodes:
+            self.add(node)
+
+    def reindex_cells(self) -> None: # This function rebuilds the cell index from every node's current position, e.g. after positions were written in bulk.
+        self.cells.clear()
+        self.cells.update((node.position, node) for node in self._nodes)
+
+    def get(self, node_id: int) -> Optional[Node]:
+        """Return the node with the given id, or None if there isn't one."""
+        return self._by_id.get(node_id)
+
+    def at(self, pos: Cell) -> Optional[Node]:
+        """Return the node standing at the given position, or None if there isn't one."""
+        return self.cells.get(pos)
+
+    def __contains__(self, node: object) -> bool:
+        return node in self._nodes
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Node, List[Node]]:
+        if self._list is None:
+            self._list = list(self._nodes)
+        return self._list[index]
+
+    def __iter__(self) -> Iterator[Node]:
+        return iter(self._nodes)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __repr__(self) -> str:
+        return f"NodeRegistry({list(self._nodes)!r})"
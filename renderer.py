@@ -0,0 +1,337 @@
+import math
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from metrics import metrics
+from network import LinkDelta
+from node import Node
+
+LINK_COLOR = "#3399FF" # Colour of the line drawn between neighbors.
+DISABLED_COLOR = "#808080" # Colour of nodes with adhoc disabled.
+WALL_COLOR = "#000000" # Colour of walls, also in the heatmap.
+HEAT_BACKGROUND = "#eaf1fb" # Colour of heatmap pixels with nothing in them (the GUI's background).
+HEAT_COLORS = ["#b4e0ff", "#5db9ff", "#2f7fd8", "#7a4fc4", "#c8406e", "#e8202a"] # Heatmap colours, from the sparsest pixels to the densest.
+
+MIN_ZOOM = 0.05 # The furthest out the view can zoom, in pixels per cell.
+MAX_ZOOM = 120 # The furthest in the view can zoom, in pixels per cell.
+DETAIL_MIN_ZOOM = 8 # Below this many pixels per cell nodes are too small to draw one by one, so the view switches to a heatmap.
+MAX_DETAIL_NODES = 2000 # More visible nodes than this are shown as a heatmap too, however far the view is zoomed in.
+MAX_LINKS = 4000 # At most this many link lines are drawn at once; the rest are counted in links_hidden.
+LABEL_MIN_ZOOM = 24 # Node labels are only drawn from this many pixels per cell, as they don't fit any smaller.
+HEAT_PIXEL = 4 # Screen pixels per heatmap pixel: the image is built this much smaller than the view, then zoomed up.
+
+Pair = Tuple[Node, Node] # An undirected pair of nodes, ordered by id() so each pair has one key.
+
+
+def _pair(a: Node, b: Node) -> Pair:
+    return (a, b) if id(a) < id(b) else (b, a)
+
+
+class WorldRenderer:
+    """
+    Retained-mode drawing of a world onto a canvas, through a zoomable, pannable viewport.
+    Every node, link and wall in view gets its canvas items created once; after that, only items whose node actually changed are moved
+    (coords) or recoloured (itemconfig), and link lines are added or removed from the network's link deltas.
+    Anything outside the view has no items at all, and at most MAX_LINKS link lines are drawn, so drawing costs what is on screen.
+    When zoomed out past DETAIL_MIN_ZOOM, or with more than MAX_DETAIL_NODES nodes in view, the view switches to a density heatmap
+    drawn as one image (this needs an image_factory, e.g. one making tkinter PhotoImages; without one the view always draws nodes).
+    Where a node is drawn mid-animation, and in which colour, is display state, so it lives here rather than on the node:
+    display_positions and display_colors only hold entries for nodes that are drawn somewhere other than their position or base colour.
+    It never imports tkinter: anything with the Tk canvas methods it uses (create_*, coords, itemconfig, delete, move, tag_lower) will do.
+    """
+
+    def __init__(self, canvas, world, cell_size: int, image_factory: Optional[Callable[[int, int], object]] = None):
+        self.canvas = canvas # The canvas the world is drawn on.
+        self.world = world # The world being drawn.
+        self.cell_size: int = cell_size # The size in pixels of each cell at the starting zoom.
+        self.zoom: float = cell_size # The current size in pixels of each cell.
+        self.origin: Tuple[float, float] = (0.0, 0.0) # The world coordinates shown at the canvas's top left corner.
+        self.view_size: Optional[Tuple[int, int]] = None # The canvas size in pixels, or None to treat the whole world as in view.
+        self.image_factory = image_factory # Makes a blank (width, height) image with put() and zoom(), for the heatmap. None disables it.
+        self.aggregated: bool = False # Whether the view currently shows the heatmap instead of individual nodes.
+        self.links_hidden: int = 0 # Links with a node in view that weren't drawn because MAX_LINKS was reached.
+        self._node_items: Dict[Node, Tuple[int, ...]] = {} # Maps a node to its (oval, label) canvas items (just the oval when zoomed too far out for labels).
+        self._node_drawn: Dict[Node, Tuple[float, float, str]] = {} # The (x, y, colour) each node was last drawn with.
+        self._link_items: Dict[Pair, int] = {} # Maps an undirected pair to its line item.
+        self._links_by_node: Dict[Node, Set[Pair]] = {} # The drawn pairs each node is part of, so its lines can follow it.
+        self._wall_items: Dict[Tuple[int, int], int] = {} # Maps a wall coordinate to its rectangle item.
+        self._walls_synced = None # The (view rectangle, wall count) walls were last culled for, so unchanged views skip the work.
+        self._heat_item: Optional[int] = None # The heatmap's image item, while aggregated.
+        self._heat_image = None # The heatmap image itself. Tk only keeps weak references to images, so this keeps it alive.
+        self.items_created: int = 0 # Running total of canvas items created, to confirm redraws don't recreate items.
+        self.display_positions: Dict[Node, Tuple[float, float]] = {} # Where animated nodes are currently drawn, if not at their position.
+        self.display_colors: Dict[Node, str] = {} # The colour nodes are drawn with, if not their base colour (e.g. mid-fade, or faded to gray).
+        world.network.add_link_listener(self.apply_link_delta) # Every neighbor update keeps the link lines current.
+
+    # The viewport.
+
+    def set_view(self, origin: Optional[Tuple[float, float]] = None, zoom: Optional[float] = None, size: Optional[Tuple[int, int]] = None) -> None:
+        """Change what the view shows. Every item is recreated at the next sync, as all their coordinates change."""
+        if origin is not None:
+            self.origin = origin
+        if zoom is not None:
+            self.zoom = min(MAX_ZOOM, max(MIN_ZOOM, zoom))
+        if size is not None:
+            self.view_size = size
+        self.clear()
+
+    def zoom_at(self, px: float, py: float, factor: float) -> None: # This function zooms by a factor, keeping the world point under canvas pixel (px, py) where it is.
+        wx, wy = self.origin[0] + px / self.zoom, self.origin[1] + py / self.zoom
+        zoom = min(MAX_ZOOM, max(MIN_ZOOM, self.zoom * factor))
+        self.set_view(origin=(wx - px / zoom, wy - py / zoom), zoom=zoom)
+
+    def pan(self, dx: float, dy: float) -> None: # This function scrolls the view by (dx, dy) pixels. Existing items are shifted, and the next sync culls or adds around the edges.
+        self.origin = (self.origin[0] - dx / self.zoom, self.origin[1] - dy / self.zoom)
+        self.canvas.move("all", dx, dy)
+        self._walls_synced = None
+
+    def fit(self, width: int, height: int) -> float: # This function returns the zoom that shows the whole world in a (width, height) pixel view, capped at the starting zoom.
+        return min(self.cell_size, width / max(1, self.world.width), height / max(1, self.world.height))
+
+    def to_cell(self, px: float, py: float) -> Tuple[int, int]: # This function converts a canvas pixel into the world cell drawn there.
+        return math.floor(self.origin[0] + px / self.zoom), math.floor(self.origin[1] + py / self.zoom)
+
+    def view_rect(self) -> Tuple[int, int, int, int]: # This function returns the (x0, y0, x1, y1) range of cells at least partly in view, clipped to the world (x1 and y1 exclusive).
+        if self.view_size is None:
+            return 0, 0, self.world.width, self.world.height
+        ox, oy = self.origin
+        width, height = self.view_size
+        return (max(0, math.floor(ox)), max(0, math.floor(oy)),
+                min(self.world.width, math.ceil(ox + width / self.zoom)), min(self.world.height, math.ceil(oy + height / self.zoom)))
+
+    def in_view(self, position: Tuple[float, float]) -> bool:
+        x0, y0, x1, y1 = self.view_rect()
+        return x0 - 1 < position[0] < x1 and y0 - 1 < position[1] < y1
+
+    def nodes_in_view(self) -> List[Node]: # This function returns the nodes standing in view, looked up whichever way touches fewer entries: cell by cell, or node by node.
+        x0, y0, x1, y1 = self.view_rect()
+        nodes = self.world.network.nodes
+        if x0 == 0 and y0 == 0 and x1 == self.world.width and y1 == self.world.height:
+            return list(nodes) # The whole world is in view.
+        if (x1 - x0) * (y1 - y0) < len(nodes):
+            cells = nodes.cells
+            return [cells[(x, y)] for y in range(y0, y1) for x in range(x0, x1) if (x, y) in cells]
+        return [node for node in nodes if x0 <= node.position[0] < x1 and y0 <= node.position[1] < y1]
+
+    def _walls_in_view(self) -> List[Tuple[int, int]]:
+        x0, y0, x1, y1 = self.view_rect()
+        walls = self.world.walls
+        if (x1 - x0) * (y1 - y0) < len(walls):
+            wall_cells = set(walls)
+            return [(x, y) for y in range(y0, y1) for x in range(x0, x1) if (x, y) in wall_cells]
+        return [(x, y) for x, y in walls if x0 <= x < x1 and y0 <= y < y1]
+
+    def _screen(self, position: Tuple[float, float]) -> Tuple[float, float]: # This function converts a world position into the canvas pixel at its cell's top left.
+        return (position[0] - self.origin[0]) * self.zoom, (position[1] - self.origin[1]) * self.zoom
+
+    def _center(self, position: Tuple[float, float]) -> Tuple[float, float]:
+        x, y = self._screen(position)
+        return x + self.zoom / 2, y + self.zoom / 2
+
+    # Drawing.
+
+    def display_pos(self, node: Node) -> Tuple[float, float]: # This function returns where a node is currently drawn during animations.
+        return self.display_positions.get(node, node.position)
+
+    def display_color(self, node: Node) -> str: # This function returns the colour a node is currently drawn with (ignoring adhoc being disabled).
+        return self.display_colors.get(node, node.base_color)
+
+    def _node_state(self, node: Node, animated: bool) -> Tuple[float, float, str]: # This function returns where and in which colour a node should be drawn.
+        x, y = self.display_positions.get(node, node.position) if animated else node.position
+        return x, y, self.display_colors.get(node, node.base_color) if node.adhoc_enabled else DISABLED_COLOR
+
+    def sync(self, animated: bool = False) -> None:
+        """Bring the whole canvas in line with the view of the world: add or remove node, link and wall items, and update anything that changed."""
+        nodes = self.nodes_in_view()
+        if animated:
+            shown = set(nodes)
+            nodes += [node for node, position in self.display_positions.items() if node not in shown and self.in_view(position)] # Nodes sliding into view.
+        aggregated = self.image_factory is not None and (self.zoom < DETAIL_MIN_ZOOM or len(nodes) > MAX_DETAIL_NODES)
+        if aggregated != self.aggregated:
+            self.clear()
+            self.aggregated = aggregated
+        if aggregated:
+            self._draw_heatmap(nodes)
+            return
+        self.sync_walls()
+        present = set(nodes)
+        for node in [node for node in self._node_items if node not in present]:
+            self._remove_node(node) # Left the world, or the view.
+            if node not in self.world.network.nodes:
+                self.display_positions.pop(node, None)
+                self.display_colors.pop(node, None)
+        # Every pair with a node in view should have a line (up to MAX_LINKS); lines for pairs no longer linked, or out of view, are removed.
+        # A one-way link from a node out of view (possible with unequal ranges) is drawn once that node comes into view.
+        wanted: Dict[Pair, None] = {}
+        for node in nodes:
+            for neighbor in node.neighbors:
+                wanted[_pair(node, neighbor)] = None
+        for pair in [pair for pair in self._link_items if pair not in wanted]:
+            self._remove_link(pair)
+        for pair in wanted:
+            if pair not in self._link_items:
+                if len(self._link_items) >= MAX_LINKS:
+                    break
+                self._add_link(pair)
+        self.links_hidden = len(wanted) - len(self._link_items)
+        self.update_nodes(nodes, animated)
+
+    def sync_walls(self) -> None: # This function creates rectangles for walls in view, and deletes the ones that left it.
+        key = (self.view_rect(), len(self.world.walls))
+        if key == self._walls_synced:
+            return
+        self._walls_synced = key
+        walls = self._walls_in_view()
+        visible = set(walls)
+        for wall in [wall for wall in self._wall_items if wall not in visible]:
+            self.canvas.delete(self._wall_items.pop(wall))
+        for wx, wy in walls:
+            if (wx, wy) not in self._wall_items:
+                x1, y1 = self._screen((wx, wy))
+                self._wall_items[(wx, wy)] = self.canvas.create_rectangle(x1, y1, x1 + self.zoom, y1 + self.zoom, fill=WALL_COLOR)
+                self.items_created += 1
+                if metrics.enabled:
+                    metrics.count("canvas.items_created")
+                for item in self._node_items.get(self.world.node_at((wx, wy)), ()):
+                    self.canvas.tag_raise(item) # Keep walls under nodes, as they were when the whole canvas was redrawn.
+
+    def update_nodes(self, nodes: Iterable[Node], animated: bool = False) -> None:
+        """Redraw only the given nodes in view (and the links attached to them), and only if their position or colour changed."""
+        if self.aggregated:
+            return # The heatmap is redrawn by sync.
+        canvas = self.canvas
+        size = self.zoom
+        ox, oy = self.origin
+        vx0, vy0, vx1, vy1 = self.view_rect()
+        inset = size / 12 # The gap between an oval and its cell's edges (5 pixels at the default 60 pixel cells).
+        labelled = size >= LABEL_MIN_ZOOM
+        for node in nodes:
+            state = self._node_state(node, animated)
+            if self._node_drawn.get(node) == state:
+                continue
+            x, y, color = state
+            items = self._node_items.get(node)
+            if items is None and not (vx0 - 1 < x < vx1 and vy0 - 1 < y < vy1):
+                continue # Culled (out of view, as in_view): it gets items if it comes into view.
+            x1, y1 = (x - ox) * size, (y - oy) * size
+            if items is None:
+                oval = canvas.create_oval(x1 + inset, y1 + inset, x1 + size - inset, y1 + size - inset, fill=color)
+                if labelled:
+                    items = oval, canvas.create_text(x1 + size / 2, y1 + size / 2, text=node.node_name[:3], fill='white', font=('Arial', 12, 'bold'))
+                else:
+                    items = oval,
+                self._node_items[node] = items
+                self.items_created += len(items)
+                if metrics.enabled:
+                    metrics.count("canvas.items_created", len(items))
+            else:
+                oval = items[0]
+                drawn = self._node_drawn[node]
+                if drawn[:2] != state[:2]:
+                    canvas.coords(oval, x1 + inset, y1 + inset, x1 + size - inset, y1 + size - inset)
+                    if len(items) > 1:
+                        canvas.coords(items[1], x1 + size / 2, y1 + size / 2)
+                    for pair in self._links_by_node.get(node, ()):
+                        self._place_link(pair, animated)
+                if drawn[2] != color:
+                    canvas.itemconfig(oval, fill=color)
+            self._node_drawn[node] = state
+
+    def _draw_heatmap(self, nodes: List[Node]) -> None: # This function draws how many of the given nodes fall in each block of pixels, as one image covering the view.
+        width, height = self.view_size or (self.world.width * self.zoom, self.world.height * self.zoom)
+        columns, rows = max(1, math.ceil(width / HEAT_PIXEL)), max(1, math.ceil(height / HEAT_PIXEL))
+        scale = self.zoom / HEAT_PIXEL # Heatmap pixels per cell.
+        ox, oy = self.origin
+        counts = [0] * (columns * rows)
+        for node in nodes:
+            x, y = node.position
+            column, row = int((x + 0.5 - ox) * scale), int((y + 0.5 - oy) * scale)
+            if 0 <= column < columns and 0 <= row < rows:
+                counts[row * columns + column] += 1
+        colors = [HEAT_BACKGROUND] * len(counts)
+        for x, y in self._walls_in_view():
+            column, row = int((x + 0.5 - ox) * scale), int((y + 0.5 - oy) * scale)
+            if 0 <= column < columns and 0 <= row < rows:
+                colors[row * columns + column] = WALL_COLOR
+        peak = max(counts, default=0)
+        levels = len(HEAT_COLORS)
+        for index, count in enumerate(counts):
+            if count:
+                colors[index] = HEAT_COLORS[min(levels - 1, (count - 1) * levels // peak)]
+        image = self.image_factory(columns, rows)
+        image.put(" ".join("{" + " ".join(colors[row * columns:(row + 1) * columns]) + "}" for row in range(rows)))
+        if HEAT_PIXEL > 1:
+            image = image.zoom(HEAT_PIXEL)
+        self._heat_image = image
+        if self._heat_item is None:
+            self._heat_item = self.canvas.create_image(0, 0, image=image, anchor="nw")
+            self.items_created += 1
+            if metrics.enabled:
+                metrics.count("canvas.items_created")
+        else:
+            self.canvas.coords(self._heat_item, 0, 0) # Panning shifted it; the new image covers the view from the corner again.
+            self.canvas.itemconfig(self._heat_item, image=image)
+
+    def apply_link_delta(self, delta: LinkDelta) -> None:
+        """Add lines for links that came up between drawn nodes and remove lines for pairs that are no longer linked in either direction."""
+        if self.aggregated:
+            return
+        for node, neighbor in delta.down:
+            pair = _pair(node, neighbor)
+            if pair in self._link_items and node not in neighbor.neighbors and neighbor not in node.neighbors:
+                self._remove_link(pair)
+        for node, neighbor in delta.up:
+            pair = _pair(node, neighbor)
+            if pair not in self._link_items and (node in self._node_items or neighbor in self._node_items):
+                if len(self._link_items) >= MAX_LINKS:
+                    self.links_hidden += 1
+                else:
+                    self._add_link(pair)
+
+    def _add_link(self, pair: Pair) -> None:
+        a, b = pair
+        (ax, ay), (bx, by) = a.position, b.position
+        size = self.zoom
+        ox, oy = self.origin[0] - 0.5, self.origin[1] - 0.5 # Shifted half a cell, so lines join cell centres.
+        line = self.canvas.create_line((ax - ox) * size, (ay - oy) * size, (bx - ox) * size, (by - oy) * size, fill=LINK_COLOR, width=max(1, size / 12))
+        self.canvas.tag_lower(line) # Links sit underneath walls and nodes.
+        self.items_created += 1
+        if metrics.enabled:
+            metrics.count("canvas.items_created")
+        self._link_items[pair] = line
+        self._links_by_node.setdefault(a, set()).add(pair)
+        self._links_by_node.setdefault(b, set()).add(pair)
+
+    def _place_link(self, pair: Pair, animated: bool) -> None: # This function moves a link line to follow its two nodes.
+        a, b = pair
+        a_pos = self.display_positions.get(a, a.position) if animated else a.position
+        b_pos = self.display_positions.get(b, b.position) if animated else b.position
+        self.canvas.coords(self._link_items[pair], *self._center(a_pos), *self._center(b_pos))
+
+    def _remove_link(self, pair: Pair) -> None:
+        line = self._link_items.pop(pair, None)
+        if line is None:
+            return
+        self.canvas.delete(line)
+        for node in pair:
+            pairs = self._links_by_node.get(node)
+            if pairs is not None:
+                pairs.discard(pair)
+
+    def _remove_node(self, node: Node) -> None:
+        for item in self._node_items.pop(node, ()):
+            self.canvas.delete(item)
+        self._node_drawn.pop(node, None)
+        for pair in list(self._links_by_node.pop(node, ())):
+            self._remove_link(pair)
+
+    def clear(self) -> None:
+        """Delete every item and forget them, so the next sync recreates everything."""
+        self.canvas.delete('all')
+        self._node_items.clear()
+        self._node_drawn.clear()
+        self._link_items.clear()
+        self._links_by_node.clear()
+        self._wall_items.clear()
+        self._walls_synced = None
+        self._heat_item = None
+        self._heat_image = None
+        self.links_hidden = 0
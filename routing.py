@@ -0,0 +1,170 @@
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+from node import Node
+from network import Link, LinkDelta
+
+Path = List[Node] # A route from a source to a target, including both ends.
+
+
+class RoutingProtocol:
+    """
+    Base class for multi-hop routing protocols plugged into a Network with Network.set_routing.
+    A protocol answers route queries, and is told about every link that came up or went down so it can keep its caches valid.
+    Links are directed: a hop from a to b is usable when b is in a's neighbor list, the same rule send_message uses for direct delivery.
+    """
+
+    def route(self, source: Node, target: Node) -> Optional[Path]:
+        """Return a path from source to target (including both), or None if the target can't be reached."""
+        raise NotImplementedError
+
+    def links_changed(self, delta: LinkDelta) -> None:
+        """Called by the network after every neighbor update with the links that appeared and disappeared."""
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        """Forget every cached route."""
+        raise NotImplementedError
+
+    @staticmethod
+    def _walk_back(parents: Dict[Node, Node], source: Node, target: Node) -> Path: # This function rebuilds a path by following parent pointers back from the target.
+        path = [target]
+        while path[-1] is not source:
+            path.append(parents[path[-1]])
+        path.reverse()
+        return path
+
+
+class LinkStateRouting(RoutingProtocol):
+    """
+    Proactive, OLSR-style link-state routing.
+    Each source that sends gets a cached shortest-path (fewest hops) tree over the whole topology, so every later route from it is a parent-pointer walk.
+    A tree is only thrown away when a changed link actually affects it:
+      - a link going down invalidates the trees that used it as a tree edge,
+      - a link coming up invalidates the trees it would give a shorter path (only the trees that reach its first node are checked).
+    """
+
+    def __init__(self):
+        self._trees: Dict[Node, Tuple[Dict[Node, int], Dict[Node, Node]]] = {} # Maps a source to its (hop distances, parent pointers).
+        self._sources_by_edge: Dict[Link, Set[Node]] = {} # Maps a tree edge (parent, child) to the sources whose trees use it.
+        self._sources_by_node: Dict[Node, Set[Node]] = {} # Maps a node to the sources whose trees reach it, so a new link is only checked against the trees containing its start.
+
+    def route(self, source: Node, target: Node) -> Optional[Path]:
+        tree = self._trees.get(source)
+        if tree is None:
+            tree = self._build_tree(source)
+        distances, parents = tree
+        if target not in distances:
+            return None
+        return self._walk_back(parents, source, target)
+
+    def _build_tree(self, source: Node) -> Tuple[Dict[Node, int], Dict[Node, Node]]: # This function runs one breadth first search from a source and caches the resulting tree.
+        distances = {source: 0}
+        parents: Dict[Node, Node] = {}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            hops = distances[node] + 1
+            for neighbor in node.neighbors:
+                if neighbor not in distances:
+                    distances[neighbor] = hops
+                    parents[neighbor] = node
+                    queue.append(neighbor)
+        self._trees[source] = distances, parents
+        for child, parent in parents.items():
+            self._sources_by_edge.setdefault((parent, child), set()).add(source)
+        for node in distances:
+            self._sources_by_node.setdefault(node, set()).add(source)
+        return distances, parents
+
+    def _drop_tree(self, source: Node) -> None: # This function forgets a source's tree and unindexes its edges.
+        distances, parents = self._trees.pop(source)
+        for child, parent in parents.items():
+            sources = self._sources_by_edge.get((parent, child))
+            if sources is not None:
+                sources.discard(source)
+                if not sources:
+                    del self._sources_by_edge[(parent, child)]
+        for node in distances:
+            sources = self._sources_by_node.get(node)
+            if sources is not None:
+                sources.discard(source)
+                if not sources:
+                    del self._sources_by_node[node]
+
+    def links_changed(self, delta: LinkDelta) -> None:
+        stale: Set[Node] = set()
+        for link in delta.down:
+            stale.update(self._sources_by_edge.get(link, ()))
+        trees = self._trees
+        for a, b in delta.up:
+            for source in self._sources_by_node.get(a, ()):
+                if source in stale:
+                    continue
+                distances = trees[source][0]
+                if b not in distances or distances[a] + 1 < distances[b]:
+                    stale.add(source) # The new link reaches b sooner (or at all), so this tree is no longer shortest.
+        for source in stale:
+            self._drop_tree(source)
+
+    def reset(self) -> None:
+        self._trees.clear()
+        self._sources_by_edge.clear()
+        self._sources_by_node.clear()
+
+
+class ReactiveRouting(RoutingProtocol):
+    """
+    Reactive, on-demand routing in the style of AODV/DSR.
+    A route is only discovered (with a breadth first search that stops at the target) the first time a source asks for it,
+    then kept in a route cache keyed by (source, target). Cached routes are indexed by the links they use,
+    so a link going down invalidates exactly the routes through it. New links never invalidate a working route.
+    """
+
+    def __init__(self):
+        self._routes: Dict[Tuple[Node, Node], Path] = {} # Maps (source, target) to its cached route.
+        self._routes_by_link: Dict[Link, Set[Tuple[Node, Node]]] = {} # Maps a link to the cached routes that hop across it.
+
+    def route(self, source: Node, target: Node) -> Optional[Path]:
+        key = (source, target)
+        path = self._routes.get(key)
+        if path is None:
+            path = self._discover(source, target)
+            if path is None:
+                return None # Failed discoveries aren't cached, a later link could make the target reachable.
+            self._routes[key] = path
+            for link in zip(path, path[1:]):
+                self._routes_by_link.setdefault(link, set()).add(key)
+        return path
+
+    def _discover(self, source: Node, target: Node) -> Optional[Path]: # This function floods a route request outwards from the source until it reaches the target.
+        if source is target:
+            return [source]
+        parents: Dict[Node, Node] = {source: source}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            for neighbor in node.neighbors:
+                if neighbor in parents:
+                    continue
+                parents[neighbor] = node
+                if neighbor is target:
+                    return self._walk_back(parents, source, target)
+                queue.append(neighbor)
+        return None
+
+    def links_changed(self, delta: LinkDelta) -> None:
+        for link in delta.down:
+            for key in self._routes_by_link.pop(link, ()):
+                path = self._routes.pop(key, None)
+                if path is None:
+                    continue # Already invalidated by another link that went down.
+                for other_link in zip(path, path[1:]):
+                    keys = self._routes_by_link.get(other_link)
+                    if keys is not None:
+                        keys.discard(key)
+                        if not keys:
+                            del self._routes_by_link[other_link]
+
+    def reset(self) -> None:
+        self._routes.clear()
+        self._routes_by_link.clear()
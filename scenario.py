@@ -0,0 +1,140 @@
+"""
+Scenario files describe a world and everything in it as JSON, for example:
+
+{
+    "width": 10, "height": 10, "seed": 1,
+    "walls": [[4, 4], [4, 5]],
+    "nodes": [
+        {"id": 1, "name": "Phone", "position": [1, 1], "comm_range": 2, "color": "#ff0000"},
+        {"id": 2, "name": "Tablet", "position": [2, 2], "comm_range": 2, "color": "#007fff", "adhoc": false}
+    ]
+}
+
+Only width and height are required. Nodes default to a communication range of 100, red, with adhoc enabled.
+
+Large deployments are better written as JSON Lines (a .jsonl file), which load_world streams instead of parsing whole:
+the first line holds the world's settings (everything above except nodes), and every line after it is one node record,
+or one wall written as {"wall": [x, y]}:
+
+{"width": 10, "height": 10, "seed": 1, "walls": [[4, 4]]}
+{"wall": [4, 5]}
+{"id": 1, "name": "Phone", "position": [1, 1], "comm_range": 2, "color": "#ff0000"}
+{"id": 2, "name": "Tablet", "position": [2, 2], "comm_range": 2, "color": "#007fff", "adhoc": false}
+"""
+
+import json
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+from world import NodeSpec, World
+
+BATCH_SIZE = 10000 # Node records validated and created together by the bulk loader.
+
+
+def load_scenario(path: str) -> Dict[str, Any]:
+    """Read a scenario file from disk."""
+    with open(path, encoding="utf-8") as scenario_file:
+        return json.load(scenario_file)
+
+
+def stream_scenario(path: str) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+    """
+    Open a scenario file, returning its settings and an iterator over its wall and node records (in file order).
+    JSON Lines files (.jsonl) are read one line at a time, so memory stays flat however many nodes they hold; plain JSON files are read whole.
+    """
+    if not path.endswith(".jsonl"):
+        scenario = load_scenario(path)
+        return scenario, iter(scenario.get("nodes", []))
+    scenario_file = open(path, encoding="utf-8")
+    header = json.loads(scenario_file.readline())
+
+    def records() -> Iterator[Dict[str, Any]]:
+        yield from header.get("nodes", []) # Small files may still list their nodes in the first line.
+        with scenario_file:
+            for line in scenario_file:
+                if line.strip():
+                    yield json.loads(line)
+    return header, records()
+
+
+def load_world(path: str, vectorized: bool = False, seed: Optional[int] = None, batch_size: int = BATCH_SIZE, neighbors: bool = True) -> World:
+    """
+    Build the World a scenario file describes with the bulk loader (see populate). A seed given here overrides the scenario's own.
+    Neighbors are built once at the end, unless neighbors is False (e.g. when the caller is about to plug in a link model and build them itself).
+    """
+    header, records = stream_scenario(path)
+    world = _new_world(header, vectorized, seed)
+    populate(world, records, batch_size)
+    if neighbors:
+        world.network.update_neighbors()
+    return world
+
+
+def build_world(scenario: Dict[str, Any], vectorized: bool = False, seed: Optional[int] = None) -> World:
+    """Create a World and populate it with the walls and nodes described by a scenario. A seed given here overrides the scenario's own."""
+    world = _new_world(scenario, vectorized, seed)
+    populate(world, scenario.get("nodes", []))
+    return world
+
+
+def populate(world: World, records: Iterable[Dict[str, Any]], batch_size: int = BATCH_SIZE) -> int:
+    """
+    Stream wall and node records into a world. Walls are added as they come; node records are collected into batches of batch_size,
+    each checked against the occupancy index and created in one World.create_nodes call. Returns how many nodes were created.
+    Neighbors aren't built; call world.network.update_neighbors once afterwards.
+    """
+    created = 0
+    batch = []
+    for record in records:
+        if "wall" in record:
+            x, y = record["wall"]
+            world.add_wall((x, y))
+            continue
+        x, y = record["position"]
+        batch.append(NodeSpec(record["id"], record.get("name", f"Node {record['id']}"), (x, y), record.get("comm_range", 100), record.get("color", "#ff0000"), record.get("adhoc", True)))
+        if len(batch) == batch_size:
+            created += len(world.create_nodes(batch))
+            batch = []
+    if batch:
+        created += len(world.create_nodes(batch))
+    return created
+
+
+def save_scenario(world: World, path: str) -> None:
+    """Write a world's settings, walls and nodes to a JSON Lines scenario file (one node per line), for load_world."""
+    with open(path, "w", encoding="utf-8") as scenario_file:
+        scenario_file.write(json.dumps({"width": world.width, "height": world.height, "walls": [list(wall) for wall in world.walls]}) + "\n")
+        for node in world.network.nodes:
+            record = {"id": node.node_id, "name": node.node_name, "position": list(node.position), "comm_range": node.comm_range, "color": node.base_color}
+            if not node.adhoc_enabled:
+                record["adhoc"] = False
+            scenario_file.write(json.dumps(record) + "\n")
+
+
+def _new_world(settings: Dict[str, Any], vectorized: bool, seed: Optional[int]) -> World: # This function creates an empty World with a scenario's size, seed and walls.
+    world = World(settings["width"], settings["height"], vectorized=vectorized or settings.get("vectorized", False), seed=settings.get("seed") if seed is None else seed)
+    for x, y in settings.get("walls", []):
+        world.add_wall((x, y))
+    return world
+
+
+def random_world(width: int, height: int, node_count: int, comm_range: int = 2, wall_count: int = 0, seed: Optional[int] = None, vectorized: bool = False,
+                 walls: Optional[Iterable[Tuple[int, int]]] = None) -> World:
+    """
+    Create a World with nodes scattered over distinct random free cells.
+    Walls are either wall_count random cells, or (if given) an explicit layout of wall coordinates, which nodes are kept off.
+    """
+    world = World(width, height, vectorized=vectorized, seed=seed)
+    for x, y in walls or ():
+        world.add_wall((x, y))
+    if world.walls:
+        free = [cell for cell in range(width * height) if (cell % width, cell // width) not in world._wall_cells]
+        wall_count = 0
+    else:
+        free = range(width * height)
+    if node_count + wall_count > len(free):
+        raise ValueError(f"Cannot place {node_count} nodes and {wall_count} walls in a {width}x{height} world.")
+    cells = world.rng.sample(free, node_count + wall_count) # Distinct cells, so nothing collides.
+    for cell in cells[:wall_count]:
+        world.add_wall((cell % width, cell // width))
+    for node_id, cell in enumerate(cells[wall_count:], start=1):
+        world.create_node(node_id, f"Node {node_id}", (cell % width, cell // width), comm_range)
+    return world
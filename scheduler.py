@@ -0,0 +1,121 @@
+import heapq
+import itertools
+from typing import Any, Callable, List, Optional, Tuple
+
+
+class Event:
+    """
+    A callback scheduled to run at a point in simulated time.
+    Cancelled events stay in the queue but are skipped when their time comes, so cancelling is constant time.
+    """
+    __slots__ = ("time", "callback", "args", "cancelled")
+
+    def __init__(self, time: float, callback: Callable[..., Any], args: Tuple[Any, ...]):
+        self.time: float = time # The simulated time this event fires at.
+        self.callback: Callable[..., Any] = callback # The function to call when it fires.
+        self.args: Tuple[Any, ...] = args # The arguments to call it with.
+        self.cancelled: bool = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+    def __repr__(self):
+        return f"Event at {self.time}: {getattr(self.callback, '__name__', self.callback)}"
+
+
+class Timer:
+    """A repeating event, created by EventScheduler.every. Cancelling it stops every future repetition."""
+
+    def __init__(self, scheduler: 'EventScheduler', interval: float, callback: Callable[..., Any], args: Tuple[Any, ...]):
+        if interval <= 0:
+            raise ValueError("A repeating timer needs a positive interval.")
+        self.scheduler: EventScheduler = scheduler
+        self.interval: float = interval # Simulated time between repetitions.
+        self.callback: Callable[..., Any] = callback
+        self.args: Tuple[Any, ...] = args
+        self.cancelled: bool = False
+        self._next: Optional[Event] = None # The event for the next repetition.
+
+    def _start(self, delay: float) -> None:
+        self._next = self.scheduler.schedule(delay, self._fire)
+
+    def _fire(self) -> None:
+        self._next = self.scheduler.schedule(self.interval, self._fire) # Schedule the next repetition first, so the callback can cancel it.
+        self.callback(*self.args)
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        if self._next is not None:
+            self._next.cancel()
+
+
+class EventScheduler:
+    """
+    A discrete-event simulation kernel: a heap of events ordered by simulated time.
+    Running the scheduler jumps the clock straight from one event to the next, so idle stretches of simulated time cost nothing.
+    Events scheduled for the same time run in the order they were scheduled.
+    """
+
+    def __init__(self, start_time: float = 0.0):
+        self._now: float = start_time # The current simulated time.
+        self._queue: List[Tuple[float, int, Event]] = [] # Heap of (time, sequence number, event).
+        self._sequence = itertools.count() # Breaks ties between events at the same time, keeping them first in, first out.
+
+    @property
+    def now(self) -> float:
+        return self._now
+
+    def __len__(self) -> int: # The number of events still queued (including cancelled ones that haven't been skipped yet).
+        return len(self._queue)
+
+    def schedule(self, delay: float, callback: Callable[..., Any], *args: Any) -> Event:
+        """Schedule callback(*args) to run delay units of simulated time from now."""
+        if delay < 0:
+            raise ValueError("Events can't be scheduled in the past.")
+        return self.schedule_at(self._now + delay, callback, *args)
+
+    def schedule_at(self, time: float, callback: Callable[..., Any], *args: Any) -> Event:
+        """Schedule callback(*args) to run at an absolute simulated time."""
+        if time < self._now:
+            raise ValueError(f"Cannot schedule an event at {time}, the clock is already at {self._now}.")
+        event = Event(time, callback, args)
+        heapq.heappush(self._queue, (time, next(self._sequence), event))
+        return event
+
+    def every(self, interval: float, callback: Callable[..., Any], *args: Any, delay: Optional[float] = None) -> Timer:
+        """Run callback(*args) every interval units of simulated time, first after delay (defaults to one interval)."""
+        timer = Timer(self, interval, callback, args)
+        timer._start(interval if delay is None else delay)
+        return timer
+
+    def peek(self) -> Optional[float]:
+        """Return the time of the next event that will actually run, or None if there are none."""
+        queue = self._queue
+        while queue and queue[0][2].cancelled:
+            heapq.heappop(queue) # Discard cancelled events at the front as we find them.
+        return queue[0][0] if queue else None
+
+    def step(self) -> bool:
+        """Run the next event, advancing the clock to its time. Returns False if there was nothing left to run."""
+        if self.peek() is None:
+            return False
+        time, _, event = heapq.heappop(self._queue)
+        self._now = time
+        event.callback(*event.args)
+        return True
+
+    def run(self, until: Optional[float] = None, max_events: Optional[int] = None) -> int:
+        """
+        Run events in time order until the queue is empty, the next event is later than until, or max_events have run.
+        If until is given, the clock finishes at until (even if the last event was earlier). Returns the number of events run.
+        """
+        processed = 0
+        while max_events is None or processed < max_events:
+            next_time = self.peek()
+            if next_time is None or (until is not None and next_time > until):
+                break
+            self.step()
+            processed += 1
+        if until is not None and until > self._now and (max_events is None or processed < max_events):
+            self._now = until
+        return processed
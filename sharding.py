@@ -0,0 +1,311 @@
+"""
+Spatially sharded multi-process simulation: the world's grid is split into tiles, and each tile is stepped by its own worker process.
+
+Node state (positions, ranges, adhoc flags) and the wall grid live in shared memory as NumPy arrays, with positions double-buffered
+between ticks. Workers never send node state to each other; every tick, each worker
+  1. plans the moves of the nodes on its tile, reading only the nodes within HALO cells of it (its halo), which is as far as the
+     batch movement rules (vector_engine.plan_moves) can carry a conflict in one step, and writes them into the next position buffer;
+  2. waits at a barrier until every tile's moves are written;
+  3. recomputes the neighbor lists of the nodes that were, or now are, on its tile, reading only the nodes within comm range of it,
+     and reports the links that changed for the nodes it owned.
+A node crossing into another tile migrates without any copying: ownership follows position, and the tile it left reports its link
+changes one last time. Each worker only rescans the whole node array every MARGIN ticks, to pick up the nodes that could drift into its halo meanwhile.
+
+The random draws for each tick come from the world engine's own stream, drawn exactly as the engine would, so a sharded run produces
+the same positions and links, tick for tick, as the same vectorized World stepped in one process (and the world carries on identically afterwards).
+
+    with world.shard(tiles=(4, 2)) as sharded:
+        for _ in range(100):
+            result = sharded.step()
+    # The world now holds the positions and neighbor lists the sharded run reached.
+"""
+
+import math
+import multiprocessing
+import traceback
+from multiprocessing import shared_memory
+from typing import Dict, List, NamedTuple, Tuple
+from vector_engine import OFFSETS, plan_moves
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, only the vectorized engine (and so sharding) needs it.
+    np = None
+
+HALO = 2 * len(OFFSETS) + 1 # Each movement round can be swayed by claimants 2 cells away, so 8 rounds reach 16 cells, plus the cells they block.
+MARGIN = 8 # Ticks between a worker's full rescans of the node array; nodes move at most one cell per tick, so its halo is padded by this much.
+
+Bounds = Tuple[int, int, int, int] # A tile's x0, y0, x1, y1 (the upper bounds excluded).
+
+
+class TickResult(NamedTuple):
+    """What one sharded step changed. Links are (node index, neighbor index) rows, indexing the world engine's nodes."""
+    tick: int
+    moved: int
+    links_up: 'np.ndarray'
+    links_down: 'np.ndarray'
+
+
+class ShardedWorld:
+    """
+    Steps a vectorized World across worker processes, one per tile of a cols x rows split of its grid (see the module docstring).
+    The world is snapshotted when this is created: nodes, walls, ranges and adhoc flags must not change while it runs, and a world
+    with a link model can't be sharded. Use it as a context manager (or call sync() and close()) to write the results back into the world.
+    """
+
+    def __init__(self, world, tiles: Tuple[int, int] = (2, 2)):
+        if world.engine is None:
+            raise ValueError("Only vectorized worlds (World(..., vectorized=True)) can be sharded, as the tiles run the engine's batch movement rules.")
+        if world.network.link_model is not None:
+            raise ValueError("Sharded worlds only support free space links, not a link model.")
+        cols, rows = tiles
+        if not (1 <= cols <= world.width and 1 <= rows <= world.height):
+            raise ValueError(f"Can't split a {world.width}x{world.height} world into {cols}x{rows} tiles.")
+        self.world = world
+        self.tick: int = 0
+        engine = world.engine
+        self.count: int = len(engine.nodes)
+        self._memory: Dict[str, shared_memory.SharedMemory] = {}
+        self._specs: Dict[str, Tuple[str, tuple, str]] = {} # What a worker needs to attach each shared array: its memory's name, shape and dtype.
+        self._positions = self._share("positions", (2, self.count, 2), np.int64) # [tick % 2] holds the positions at that tick.
+        self._positions[0] = engine.positions[:self.count]
+        self._share("ranges", (self.count,), np.float64)[:] = engine.comm_ranges[:self.count]
+        self._share("adhoc", (self.count,), np.bool_)[:] = engine.adhoc[:self.count]
+        walls = self._share("walls", (world.height, world.width), np.bool_)
+        walls[:] = False
+        for x, y in world._wall_cells:
+            walls[y, x] = True
+        self._randoms = self._share("randoms", (self.count, len(OFFSETS)), np.float64)
+        self.rng = engine.rng # Drawn from exactly as the engine would, so the world can carry on after the sharded run.
+
+        max_range = float(engine.comm_ranges[:self.count].max(initial=1))
+        context = multiprocessing.get_context()
+        self._barrier = context.Barrier(cols * rows)
+        self._connections = []
+        self._workers = []
+        try:
+            for col in range(cols):
+                for row in range(rows):
+                    bounds = (col * world.width // cols, row * world.height // rows, (col + 1) * world.width // cols, (row + 1) * world.height // rows)
+                    connection, worker_connection = context.Pipe()
+                    process = context.Process(target=_serve, args=(worker_connection, self._barrier, self._specs, world.width, world.height, bounds, max_range),
+                                              name=f"shard-{col}-{row}", daemon=True)
+                    process.start()
+                    self._connections.append(connection)
+                    self._workers.append(process)
+            self._gather() # Wait for every worker's initial neighbor lists.
+        except BaseException:
+            self.close()
+            raise
+
+    def _share(self, name: str, shape: tuple, dtype) -> 'np.ndarray':
+        size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        memory = self._memory[name] = shared_memory.SharedMemory(create=True, size=size)
+        self._specs[name] = (memory.name, shape, np.dtype(dtype).str)
+        return np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+
+    @property
+    def positions(self) -> 'np.ndarray':
+        """The current position of every node, as a (count, 2) array (a copy)."""
+        return self._positions[self.tick % 2].copy()
+
+    def step(self) -> TickResult:
+        """Move every node one step and update every neighbor list, across all the workers."""
+        self.rng.random(out=self._randoms)
+        for connection in self._connections:
+            connection.send(("step", self.tick))
+        results = self._gather()
+        self.tick += 1
+        up = np.sort(np.concatenate([result[1] for result in results]))
+        down = np.sort(np.concatenate([result[2] for result in results]))
+        return TickResult(self.tick, sum(result[0] for result in results), _pairs(up, self.count), _pairs(down, self.count))
+
+    def links(self) -> 'np.ndarray':
+        """Every directed link right now, as sorted (node index, neighbor index) rows."""
+        for connection in self._connections:
+            connection.send(("links", None))
+        return _pairs(np.sort(np.concatenate(self._gather())), self.count)
+
+    def sync(self) -> None:
+        """Write the current positions back into the world, and rebuild its occupancy index and neighbor lists to match."""
+        self.world.engine.positions[:self.count] = self._positions[self.tick % 2]
+        self.world.rebuild_occupancy()
+        self.world.network.update_neighbors()
+
+    def close(self) -> None:
+        """Stop the workers and free the shared memory. The world keeps whatever was last synced into it."""
+        for connection in self._connections:
+            try:
+                connection.send(("stop", None))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._workers:
+            process.join(5)
+            if process.is_alive():
+                process.terminate()
+        self._connections, self._workers = [], []
+        for memory in self._memory.values():
+            memory.close()
+            memory.unlink()
+        self._memory = {}
+
+    def _gather(self) -> List:
+        results = [connection.recv() for connection in self._connections]
+        for result in results:
+            if isinstance(result, _WorkerError):
+                raise RuntimeError(f"A shard worker failed:\n{result.details}")
+        return results
+
+    def __enter__(self) -> 'ShardedWorld':
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        try:
+            if exc_type is None:
+                self.sync()
+        finally:
+            self.close()
+
+
+class _WorkerError(NamedTuple):
+    details: str
+
+
+def _pairs(keys: 'np.ndarray', count: int) -> 'np.ndarray':
+    return np.stack(np.divmod(keys, count), axis=1) if count else np.empty((0, 2), dtype=np.int64)
+
+
+class _Tile:
+    """The state one worker keeps about its tile: the nodes that could matter to it, and the last neighbor lists of the nodes it owns."""
+
+    def __init__(self, arrays: Dict[str, 'np.ndarray'], width: int, height: int, bounds: Bounds, max_range: float):
+        self.positions = arrays["positions"]
+        self.ranges = arrays["ranges"]
+        self.adhoc = arrays["adhoc"]
+        self.walls = arrays["walls"]
+        self.randoms = arrays["randoms"]
+        self.count: int = len(self.ranges)
+        self.width, self.height = width, height
+        self.bounds: Bounds = bounds
+        self.cell_size: float = max(1.0, max_range) # Like the network's grid, so only the 3x3 cells around a node can hold its neighbors.
+        self.link_reach: int = math.ceil(max(0.0, max_range)) + 1 # Neighbors of nodes that just left the tile are up to one cell further out.
+        self.reach: int = max(HALO, self.link_reach) + MARGIN + 1
+        self._owned = np.zeros(self.count, dtype=bool) # Scratch flags, so filtering links by their node is one lookup per link.
+        self.candidates = self._rescan(0)
+        self.rescanned: int = 0
+        owned = self.candidates[self._within(self.positions[0][self.candidates], 0)]
+        nearby = self.candidates[self._within(self.positions[0][self.candidates], self.link_reach)]
+        self.previous = self._link_keys(owned, nearby, self.positions[0]) # Sorted link keys (node * count + neighbor) of the nodes owned now.
+
+    def _within(self, positions: 'np.ndarray', pad: int) -> 'np.ndarray':
+        x0, y0, x1, y1 = self.bounds
+        x, y = positions[:, 0], positions[:, 1]
+        return (x >= x0 - pad) & (x < x1 + pad) & (y >= y0 - pad) & (y < y1 + pad)
+
+    def _rescan(self, tick: int) -> 'np.ndarray': # This function finds every node that could reach this tile's halo within MARGIN ticks.
+        return np.flatnonzero(self._within(self.positions[tick % 2][:self.count], self.reach))
+
+    def step(self, tick: int, barrier) -> Tuple[int, 'np.ndarray', 'np.ndarray']:
+        current, following = self.positions[tick % 2], self.positions[(tick + 1) % 2]
+        if tick - self.rescanned >= MARGIN:
+            self.candidates = self._rescan(tick)
+            self.rescanned = tick
+
+        # Plan the moves of every node in the halo, in creation order, but only keep those of the nodes on this tile.
+        local = self.candidates[self._within(current[self.candidates], HALO)]
+        local_positions = current[local]
+        x0, y0, x1, y1 = self.bounds
+        bx0, by0 = max(0, x0 - HALO - 1), max(0, y0 - HALO - 1)
+        bx1, by1 = min(self.width, x1 + HALO + 1), min(self.height, y1 + HALO + 1)
+        destinations, _ = plan_moves(local_positions, self.randoms[local], self.walls[by0:by1, bx0:bx1].copy(), self.width, self.height, (bx0, by0))
+        on_tile = self._within(local_positions, 0)
+        owned = local[on_tile]
+        following[owned] = destinations[on_tile]
+        moved = int(np.count_nonzero((destinations[on_tile] != local_positions[on_tile]).any(axis=1)))
+        barrier.wait() # Every tile's moves have to be in before anyone looks across its edges.
+
+        # Recompute the lists of the nodes that were or are on this tile; report changes for the ones that were.
+        following_positions = following[self.candidates]
+        arrived = self.candidates[self._within(following_positions, 0)]
+        nearby = self.candidates[self._within(following_positions, self.link_reach)]
+        flags = self._owned
+        flags[owned] = True
+        flags[arrived] = True
+        subjects = np.flatnonzero(flags)
+        flags[subjects] = False
+        keys = self._link_keys(subjects, nearby, following)
+        flags[owned] = True
+        kept = keys[flags[keys // self.count]]
+        flags[owned] = False
+        up = np.setdiff1d(kept, self.previous, assume_unique=True)
+        down = np.setdiff1d(self.previous, kept, assume_unique=True)
+        flags[arrived] = True
+        self.previous = keys[flags[keys // self.count]]
+        flags[arrived] = False
+        return moved, up, down
+
+    def _link_keys(self, subjects: 'np.ndarray', nearby: 'np.ndarray', positions: 'np.ndarray') -> 'np.ndarray':
+        """The sorted keys (node * count + neighbor) of every link from subjects, found among nearby with the same rules as Network.update_neighbors."""
+        if subjects.size == 0 or nearby.size == 0:
+            return np.empty(0, dtype=np.int64)
+        size = self.cell_size
+        span = int(self.height // size) + 3 # Cell keys are column * span + row, with room for the rows just outside the world.
+        nearby_positions = positions[nearby]
+        nearby_keys = (nearby_positions[:, 0] // size).astype(np.int64) * span + (nearby_positions[:, 1] // size).astype(np.int64)
+        order = np.argsort(nearby_keys, kind="stable")
+        sorted_keys = nearby_keys[order]
+        subject_positions = positions[subjects]
+        subject_keys = (subject_positions[:, 0] // size).astype(np.int64) * span + (subject_positions[:, 1] // size).astype(np.int64)
+        by_cell = np.argsort(subject_keys, kind="stable") # Looking cells up in sorted order keeps the searches cache friendly.
+        subjects, subject_keys = subjects[by_cell], subject_keys[by_cell]
+        found = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                wanted = subject_keys + (dx * span + dy)
+                starts = np.searchsorted(sorted_keys, wanted, "left")
+                counts = np.searchsorted(sorted_keys, wanted, "right") - starts
+                total = int(counts.sum())
+                if not total:
+                    continue
+                # Expand each subject into one row per node bucketed in that cell.
+                node = np.repeat(subjects, counts)
+                neighbor = nearby[order[np.arange(total) + np.repeat(starts - (np.cumsum(counts) - counts), counts)]]
+                found.append((node, neighbor))
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        node = np.concatenate([pair[0] for pair in found])
+        neighbor = np.concatenate([pair[1] for pair in found])
+        offset = positions[neighbor] - positions[node]
+        comm_range = self.ranges[node]
+        linked = ((node != neighbor) & self.adhoc[node] & self.adhoc[neighbor] & (comm_range >= 0) # A negative range can never cover any distance.
+                  & ((offset * offset).sum(axis=1) <= comm_range * comm_range))
+        keys = node[linked] * self.count + neighbor[linked]
+        keys.sort() # Already unique, as every subject and every nearby node is listed once.
+        return keys
+
+
+def _serve(connection, barrier, specs: Dict[str, Tuple[str, tuple, str]], width: int, height: int, bounds: Bounds, max_range: float) -> None:
+    """A worker process: attach the shared arrays, then answer step and links requests until told to stop."""
+    memory = {name: shared_memory.SharedMemory(name=spec[0]) for name, spec in specs.items()}
+    try:
+        arrays = {name: np.ndarray(spec[1], dtype=np.dtype(spec[2]), buffer=memory[name].buf) for name, spec in specs.items()}
+        tile = _Tile(arrays, width, height, bounds, max_range)
+        connection.send(None)
+        while True:
+            command, tick = connection.recv()
+            if command == "stop":
+                break
+            if command == "step":
+                connection.send(tile.step(tick, barrier))
+            elif command == "links":
+                connection.send(tile.previous)
+    except Exception:
+        barrier.abort() # Don't leave the other workers waiting on this one forever.
+        try:
+            connection.send(_WorkerError(traceback.format_exc()))
+        except (BrokenPipeError, OSError):
+            pass
+    finally:
+        arrays = tile = None # Drop every view of the shared buffers before closing them.
+        for block in memory.values():
+            block.close()
@@ -0,0 +1,54 @@
+from typing import Dict, Iterator, Set, Tuple
+from node import Node
+
+Cell = Tuple[int, int]
+
+
+class SpatialGrid:
+    """
+    A uniform bucket grid that indexes nodes by the cell their position falls in.
+    Cells are cell_size wide, so every node within cell_size of a point sits in that point's cell or one of the 8 cells around it.
+    This lets the network test only nearby candidate pairs instead of every pair of nodes.
+    """
+
+    def __init__(self, cell_size: float):
+        self.cell_size: float = max(1, cell_size) # A cell can never be smaller than one world square, even when every range is 0.
+        self._cells: Dict[Cell, Set[Node]] = {} # Maps a cell to the nodes currently bucketed inside it.
+        self._node_cells: Dict[Node, Cell] = {} # Maps a node to the cell it was bucketed into, so it can be found again after it moves.
+
+    def cell_of(self, position: Tuple[float, float]) -> Cell: # This function converts a world position into the grid cell that contains it.
+        return int(position[0] // self.cell_size), int(position[1] // self.cell_size)
+
+    def insert(self, node: Node) -> None: # This function buckets a node by its current position.
+        cell = self.cell_of(node.position)
+        self._cells.setdefault(cell, set()).add(node)
+        self._node_cells[node] = cell
+
+    def remove(self, node: Node) -> None: # This function removes a node from whichever cell it was bucketed into.
+        cell = self._node_cells.pop(node, None)
+        if cell is None:
+            return
+        bucket = self._cells[cell]
+        bucket.discard(node)
+        if not bucket:
+            del self._cells[cell] # Drop empty buckets so sparse worlds don't accumulate dead cells.
+
+    def __contains__(self, node: Node) -> bool:
+        return node in self._node_cells
+
+    def __len__(self) -> int:
+        return len(self._node_cells)
+
+    def nearby(self, position: Tuple[float, float]) -> Iterator[Node]: # This function yields every node bucketed in the 3x3 block of cells around a position.
+        cx, cy = self.cell_of(position)
+        cells = self._cells
+        for gx in (cx - 1, cx, cx + 1):
+            for gy in (cy - 1, cy, cy + 1):
+                bucket = cells.get((gx, gy))
+                if bucket:
+                    yield from bucket
+
+    def count_nearby(self, position: Tuple[float, float]) -> int: # This function counts the nodes nearby() would yield, without yielding them.
+        cx, cy = self.cell_of(position)
+        cells = self._cells
+        return sum(len(cells.get((gx, gy), ())) for gx in (cx - 1, cx, cx + 1) for gy in (cy - 1, cy, cy + 1))
@@ -0,0 +1,176 @@
+"""
+Monte Carlo parameter sweeps: run the same scenario across many seeds, node counts, ranges and wall layouts, in parallel.
+
+Each run builds its own World with its own seeded random stream, derived from the sweep's base seed and the run's index,
+so a run's result never depends on which worker process ran it or in what order runs finished. Results stream back as runs
+complete, and are folded into the summary strictly in run order, so the summary is identical for any number of workers.
+"""
+
+import argparse
+import itertools
+import json
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from connectivity import Connectivity
+from scenario import random_world
+
+Params = Dict[str, Any]
+Result = Dict[str, Any]
+
+DEFAULT_PARAMS: Params = {"width": 30, "height": 30, "nodes": 50, "comm_range": 2, "walls": 0, "steps": 20}
+SWEPT_BY_SEED = "seed" # The one parameter that is varied per run rather than per configuration.
+
+
+def run_seed(base_seed: int, index: int) -> int:
+    """Derive the seed for one run from the sweep's base seed and the run's index (stable across processes and Python versions)."""
+    return random.Random(f"{base_seed}:{index}").getrandbits(63)
+
+
+def grid(repeats: int = 1, base_seed: int = 0, **axes: Iterable[Any]) -> List[Params]:
+    """
+    Expand a sweep into one parameter dict per run: every combination of the given axes (e.g. nodes=[50, 100], comm_range=[2, 3]),
+    repeated with a different seed each time. Parameters that aren't swept take their DEFAULT_PARAMS value.
+    """
+    names = list(axes)
+    runs = []
+    for combination in itertools.product(*(list(axes[name]) for name in names)):
+        for _ in range(repeats):
+            params = dict(DEFAULT_PARAMS, **dict(zip(names, combination)))
+            params[SWEPT_BY_SEED] = run_seed(base_seed, len(runs))
+            runs.append(params)
+    return runs
+
+
+def run_scenario(params: Params) -> Result:
+    """
+    Run one randomly populated world and measure its connectivity. This is the default sweep runner;
+    it is a top-level function so worker processes can pickle it. Returns per-run averages over every tick.
+    """
+    walls = params["walls"] # Either a number of random walls, or an explicit layout of [x, y] wall coordinates.
+    wall_count, layout = (0, walls) if isinstance(walls, (list, tuple)) else (walls, None)
+    world = random_world(params["width"], params["height"], params["nodes"], params["comm_range"], wall_count, params["seed"], walls=layout)
+    network = world.network
+    network.update_neighbors()
+    connectivity = Connectivity()
+    network.set_connectivity(connectivity) # Keeps the components up to date from each tick's link changes, instead of walking the graph every tick.
+    totals = {"avg_degree": 0.0, "isolated_fraction": 0.0, "components": 0.0, "largest_component_fraction": 0.0}
+    for _ in range(params["steps"]):
+        moves = world.step()
+        world.apply_moves(moves)
+        network.update_neighbors_incremental(node for node, old_pos, new_pos in moves if old_pos != new_pos)
+        count = len(network.nodes) or 1
+        partitions = connectivity.stats()
+        totals["avg_degree"] += sum(len(node.neighbors) for node in network.nodes) / count
+        totals["isolated_fraction"] += sum(1 for node in network.nodes if not node.neighbors) / count
+        totals["components"] += partitions.components
+        totals["largest_component_fraction"] += partitions.largest / count
+    steps = params["steps"] or 1
+    return {name: total / steps for name, total in totals.items()}
+
+
+class RunningStats:
+    """Mean, standard deviation, minimum and maximum of a stream of values, updated one value at a time (Welford's method)."""
+
+    def __init__(self):
+        self.count: int = 0
+        self.mean: float = 0.0
+        self._squares: float = 0.0 # Sum of squared differences from the mean.
+        self.minimum: float = math.inf
+        self.maximum: float = -math.inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        difference = value - self.mean
+        self.mean += difference / self.count
+        self._squares += difference * (value - self.mean)
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self._squares / (self.count - 1)) if self.count > 1 else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {"count": self.count, "mean": self.mean, "std": self.std, "min": self.minimum, "max": self.maximum}
+
+
+class SweepSummary:
+    """Aggregates run results per configuration (every parameter except the seed), folding them in strictly in run order."""
+
+    def __init__(self, runs: List[Params]):
+        self.runs: List[Params] = runs
+        self.results: List[Optional[Result]] = [None] * len(runs) # Each run's own result, by run index.
+        self.groups: Dict[Tuple, Dict[str, RunningStats]] = {} # Maps a configuration to the running stats of each metric.
+        self._next: int = 0 # The next run index to fold into the stats. Later runs wait until every earlier run has arrived.
+
+    @staticmethod
+    def configuration(params: Params) -> Tuple:
+        return tuple(sorted((name, json.dumps(value) if isinstance(value, (list, tuple)) else value) # Wall layouts are lists, which can't be dictionary keys.
+                            for name, value in params.items() if name != SWEPT_BY_SEED))
+
+    def add(self, index: int, result: Result) -> None:
+        self.results[index] = result
+        while self._next < len(self.runs) and self.results[self._next] is not None:
+            stats = self.groups.setdefault(self.configuration(self.runs[self._next]), {})
+            for metric, value in self.results[self._next].items():
+                stats.setdefault(metric, RunningStats()).add(value)
+            self._next += 1
+
+    def as_dict(self) -> List[Dict[str, Any]]:
+        return [
+            {"params": dict(configuration), "metrics": {metric: stats.as_dict() for metric, stats in metrics.items()}}
+            for configuration, metrics in self.groups.items()
+        ]
+
+
+def _completed(runs: List[Params], runner: Callable[[Params], Result], workers: Optional[int]) -> Iterator[Tuple[int, Result]]: # This function yields (index, result) pairs as runs finish.
+    if workers == 1:
+        for index, params in enumerate(runs):
+            yield index, runner(params) # Run in this process, which is easier to debug and gives identical results.
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(runner, params): index for index, params in enumerate(runs)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def run_sweep(runs: List[Params], workers: Optional[int] = None, runner: Callable[[Params], Result] = run_scenario,
+              on_result: Optional[Callable[[int, Params, Result], None]] = None) -> SweepSummary:
+    """
+    Fan runs out across a process pool (one process per core by default; workers=1 runs everything in this process).
+    on_result, if given, is called with (index, params, result) as each run finishes, in completion order.
+    Returns the summary, which is the same no matter how many workers were used.
+    """
+    summary = SweepSummary(runs)
+    for index, result in _completed(runs, runner, workers):
+        if on_result is not None:
+            on_result(index, runs[index], result)
+        summary.add(index, result)
+    return summary
+
+
+def _int_list(text: str) -> List[int]:
+    return [int(value) for value in text.split(",")]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run a Monte Carlo connectivity sweep over a process pool and print the summary as JSON.")
+    parser.add_argument("--repeats", type=int, default=10, help="Runs (seeds) per configuration.")
+    parser.add_argument("--seed", type=int, default=0, help="Base seed that every run's seed is derived from.")
+    parser.add_argument("--nodes", type=_int_list, default=[DEFAULT_PARAMS["nodes"]], help="Comma separated node counts.")
+    parser.add_argument("--range", dest="comm_range", type=_int_list, default=[DEFAULT_PARAMS["comm_range"]], help="Comma separated communication ranges.")
+    parser.add_argument("--walls", type=_int_list, default=[DEFAULT_PARAMS["walls"]], help="Comma separated random wall counts.")
+    parser.add_argument("--size", type=int, default=DEFAULT_PARAMS["width"], help="Width and height of the (square) world.")
+    parser.add_argument("--steps", type=int, default=DEFAULT_PARAMS["steps"], help="Ticks per run.")
+    parser.add_argument("--workers", type=int, help="Worker processes (defaults to one per core).")
+    args = parser.parse_args(argv)
+    runs = grid(args.repeats, args.seed, nodes=args.nodes, comm_range=args.comm_range, walls=args.walls,
+                width=[args.size], height=[args.size], steps=[args.steps])
+    summary = run_sweep(runs, workers=args.workers)
+    print(json.dumps(summary.as_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import random
+from collections import deque
+from connectivity import Connectivity
+from scenario import random_world
+
+
+def bfs_components(network):
+    """Every component as a frozenset of nodes, treating a link in either direction as connecting two nodes."""
+    adjacent = {node: set() for node in network.nodes}
+    for node in network.nodes:
+        for neighbor in node.neighbors:
+            adjacent[node].add(neighbor)
+            adjacent[neighbor].add(node)
+    components, seen = set(), set()
+    for start in adjacent:
+        if start in seen:
+            continue
+        seen.add(start)
+        members, queue = {start}, deque([start])
+        while queue:
+            for other in adjacent[queue.popleft()]:
+                if other not in seen:
+                    seen.add(other)
+                    members.add(other)
+                    queue.append(other)
+        components.add(frozenset(members))
+    return components
+
+
+def test_components_match_bfs_under_mobility():
+    world = random_world(20, 20, 70, 3, 10, seed=5)
+    network = world.network
+    network.update_neighbors()
+    connectivity = Connectivity()
+    network.set_connectivity(connectivity)
+    rng = random.Random(5)
+    next_id = 1000
+    for tick in range(1, 61):
+        changed = rng.sample(list(network.nodes), 10)
+        for node in changed:
+            world.move_node_random(node, max_step=2)
+        if tick % 6 == 0:
+            world.remove_node(rng.choice(list(network.nodes)))
+        if tick % 5 == 0:
+            free = [(x, y) for x in range(20) for y in range(20) if not world.is_occupied((x, y))]
+            world.create_node(next_id, f"N{next_id}", rng.choice(free), comm_range=3)
+            next_id += 1
+        network.update_neighbors_incremental(changed)
+        expected = bfs_components(network)
+        assert {frozenset(connectivity.component_of(node)) for node in network.nodes} == expected
+        assert connectivity.sizes() == sorted((len(members) for members in expected), reverse=True)
+        stats = connectivity.stats()
+        assert stats.components == len(expected) and stats.nodes == len(network.nodes)
+        assert stats.isolated == sum(1 for node in network.nodes if not node.neighbors and not any(node in other.neighbors for other in network.nodes))
@@ -0,0 +1,27 @@
+import io
+import headless
+from dtn import DTNRouter, Epidemic
+from scenario import random_world
+from world import World
+
+
+def test_epidemic_spread_ends_when_messages_outnumber_buffers():
+    world = World(20, 3, seed=1)
+    chain = [world.create_node(index, f"N{index}", (index, 1), comm_range=1) for index in range(4)]
+    target = world.create_node(9, "T", (15, 1), comm_range=1)
+    world.network.update_neighbors()
+    router = DTNRouter(Epidemic(), buffer_capacity=2)
+    world.network.set_dtn(router)
+    for index in range(10):
+        assert router.store(chain[index % 4], target, str(index)) is False
+    stats = router.stats()
+    assert stats.created == 10 and stats.delivered == 0
+    assert stats.in_flight + stats.lost == 10
+    assert all(router.buffered(node) <= 2 for node in chain)
+
+
+def test_headless_epidemic_run_finishes_with_full_buffers():
+    world = random_world(30, 30, 60, 3, 0, 3, False)
+    out = io.StringIO()
+    headless.run(world, 30, out=out, dtn=DTNRouter(Epidemic(), buffer_capacity=4), dtn_messages=20, seed=3)
+    assert len(out.getvalue().splitlines()) == 30
@@ -0,0 +1,41 @@
+import random
+from scenario import random_world
+
+
+def neighbor_lists(network):
+    return {node.node_id: [neighbor.node_id for neighbor in node.neighbors] for node in network.nodes}
+
+
+def links(network):
+    return {(node, neighbor) for node in network.nodes for neighbor in node.neighbors}
+
+
+def test_incremental_updates_match_a_full_rebuild():
+    world = random_world(20, 20, 80, 3, 15, seed=2)
+    network = world.network
+    network.update_neighbors()
+    rng = random.Random(2)
+    next_id = 1000
+    for tick in range(1, 61):
+        before = links(network)
+        changed = rng.sample(list(network.nodes), 10) # Only some nodes move, so stale links elsewhere would go unnoticed by a full rescan.
+        for node in changed:
+            world.move_node_random(node, max_step=2)
+        for node in rng.sample(list(network.nodes), 3):
+            node.adhoc_enabled = not node.adhoc_enabled
+            changed.append(node)
+        if tick % 7 == 0:
+            world.remove_node(rng.choice(list(network.nodes)))
+        if tick % 5 == 0:
+            free = [(x, y) for x in range(20) for y in range(20) if not world.is_occupied((x, y))]
+            world.create_node(next_id, f"N{next_id}", rng.choice(free), comm_range=3)
+            next_id += 1
+        delta = network.update_neighbors_incremental(changed)
+        after = links(network)
+        assert delta.up == after - before
+        assert delta.down == before - after
+        if tick % 4 == 0: # Let a few incremental updates build on each other before checking against a rebuild.
+            incremental = neighbor_lists(network)
+            full = network.update_neighbors()
+            assert not full.up and not full.down
+            assert neighbor_lists(network) == incremental
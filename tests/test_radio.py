@@ -0,0 +1,20 @@
+from radio import line_cells
+
+
+def test_line_cells_between_equal_endpoints_is_empty():
+    assert list(line_cells((3, 3), (3, 3))) == []
+
+
+def test_line_cells_between_adjacent_endpoints_is_empty():
+    assert list(line_cells((3, 3), (4, 3))) == []
+    assert list(line_cells((3, 3), (3, 2))) == []
+    assert list(line_cells((3, 3), (4, 4))) == []
+
+
+def test_line_cells_on_a_diagonal():
+    assert list(line_cells((0, 0), (3, 3))) == [(1, 1), (2, 2)]
+    assert list(line_cells((3, 0), (0, 3))) == [(2, 1), (1, 2)]
+
+
+def test_line_cells_on_a_straight_line():
+    assert list(line_cells((2, 5), (8, 5))) == [(3, 5), (4, 5), (5, 5), (6, 5), (7, 5)]
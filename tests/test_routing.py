@@ -0,0 +1,48 @@
+import random
+from collections import deque
+from routing import LinkStateRouting, ReactiveRouting
+from scenario import random_world
+
+
+def bfs_distances(source):
+    distances = {source: 0}
+    queue = deque([source])
+    while queue:
+        node = queue.popleft()
+        for neighbor in node.neighbors:
+            if neighbor not in distances:
+                distances[neighbor] = distances[node] + 1
+                queue.append(neighbor)
+    return distances
+
+
+def check_routes(protocol, shortest):
+    world = random_world(25, 25, 120, 3, 10, seed=4)
+    network = world.network
+    network.update_neighbors()
+    network.set_routing(protocol)
+    rng = random.Random(4)
+    nodes = list(network.nodes)
+    for _ in range(40):
+        moves = world.step()
+        world.apply_moves(moves)
+        network.update_neighbors_incremental(node for node, old_pos, new_pos in moves if old_pos != new_pos)
+        for _ in range(25):
+            source, target = rng.sample(nodes, 2)
+            path = protocol.route(source, target)
+            distances = bfs_distances(source)
+            if target not in distances:
+                assert path is None
+                continue
+            assert path is not None and path[0] is source and path[-1] is target
+            assert all(b in a.neighbors for a, b in zip(path, path[1:])) # Every hop is a live link, so no stale route survived.
+            if shortest:
+                assert len(path) - 1 == distances[target]
+
+
+def test_link_state_routes_match_bfs_under_mobility():
+    check_routes(LinkStateRouting(), shortest=True)
+
+
+def test_reactive_routes_stay_valid_under_mobility():
+    check_routes(ReactiveRouting(), shortest=False)
@@ -0,0 +1,185 @@
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
+from metrics import metrics
+from node import Node
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, only the vectorized engine needs it.
+    np = None
+
+# The 8 adjacent offsets a node can step to (including diagonals, excluding staying still).
+OFFSETS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if not (dx == 0 and dy == 0)]
+
+
+class ArrayNode(Node):
+    """
+    A Node whose position, communication range and adhoc flag are stored in a VectorEngine's arrays.
+    It behaves exactly like a Node, but acts as a view over one row of the engine's arrays, so the engine can plan every move in one batch.
+    """
+    __slots__ = ("_engine", "_index")
+
+    def __init__(self, engine: 'VectorEngine', index: int, node_id: int, node_name: str, position: tuple[int, int], comm_range: int = 100, base_color: str = "#ff0000"):
+        self._engine: VectorEngine = engine # The engine whose arrays hold this node's simulation state.
+        self._index: int = index # This node's row in the engine's arrays.
+        super().__init__(node_id, node_name, position, comm_range, base_color)
+
+    @property
+    def _position(self) -> tuple[int, int]:
+        return tuple(self._engine.positions[self._index].tolist())
+
+    @_position.setter
+    def _position(self, value: tuple[int, int]) -> None:
+        self._engine.positions[self._index] = value
+
+    @property
+    def _comm_range(self) -> int:
+        return self._engine.comm_ranges[self._index].item()
+
+    @_comm_range.setter
+    def _comm_range(self, value: int) -> None:
+        self._engine.comm_ranges[self._index] = value
+
+    @property
+    def adhoc_enabled(self) -> bool:
+        return bool(self._engine.adhoc[self._index])
+
+    @adhoc_enabled.setter
+    def adhoc_enabled(self, value: bool) -> None:
+        self._engine.adhoc[self._index] = value
+
+
+class VectorEngine:
+    """
+    A struct-of-arrays movement engine for World.step.
+    Positions, ranges and adhoc flags for every node are kept in NumPy arrays, and all moves for a step are planned in one batch:
+    each round, every node that hasn't moved yet proposes its next (randomly ordered) adjacent cell, and when several nodes claim the same free cell
+    the node that was created first wins it. The same rules as World.step apply: no node moves into a wall, an occupied cell, or a cell another node claimed this step.
+    """
+
+    def __init__(self, world, seed: Optional[int] = None, capacity: int = 1024):
+        if np is None:
+            raise ImportError("The vectorized engine requires NumPy. Install it with 'pip install numpy'.")
+        self.world = world # The world this engine moves nodes around in (used for its size and walls).
+        self.rng = np.random.default_rng(seed) # The engine's own random stream, used to order each node's candidate moves.
+        self.positions = np.zeros((capacity, 2), dtype=np.int64) # Row i holds the (x, y) position of nodes[i].
+        self.comm_ranges = np.zeros(capacity, dtype=np.float64) # Row i holds the communication range of nodes[i].
+        self.adhoc = np.zeros(capacity, dtype=bool) # Row i holds whether nodes[i] has adhoc enabled.
+        self.nodes: List[ArrayNode] = [] # The nodes viewing each row, in creation order.
+        self._wall_cells = None # Flattened wall cell indices, rebuilt lazily after walls change.
+
+    def create_node(self, node_id: int, node_name: str, position: tuple[int, int], comm_range: int = 100, base_color: str = "#ff0000") -> ArrayNode:
+        """Append a row to the arrays and return a node viewing it."""
+        index = len(self.nodes)
+        if index == len(self.positions):
+            self._grow()
+        node = ArrayNode(self, index, node_id, node_name, position, comm_range, base_color)
+        self.nodes.append(node)
+        return node
+
+    def remove_node(self, node: ArrayNode) -> None:
+        """Delete a node's row, shifting later rows up so the arrays stay in creation order."""
+        index = node._index
+        count = len(self.nodes)
+        last_state = node._position, node._comm_range, node.adhoc_enabled
+        for array in (self.positions, self.comm_ranges, self.adhoc):
+            array[index:count - 1] = array[index + 1:count]
+        del self.nodes[index]
+        for later in self.nodes[index:]:
+            later._index -= 1
+        # Detach the removed node onto private one-row arrays holding its last state, so it still reads sensibly.
+        node._engine = SimpleNamespace(
+            positions=np.array([last_state[0]], dtype=np.int64),
+            comm_ranges=np.array([last_state[1]], dtype=np.float64),
+            adhoc=np.array([last_state[2]], dtype=bool),
+        )
+        node._index = 0
+
+    def walls_changed(self) -> None:
+        """Called by the World whenever a wall is added, so the cached wall cells are rebuilt on the next step."""
+        self._wall_cells = None
+
+    def _grow(self) -> None: # This function doubles the capacity of every array.
+        capacity = len(self.positions) * 2
+        self.positions = np.resize(self.positions, (capacity, 2))
+        self.comm_ranges = np.resize(self.comm_ranges, capacity)
+        self.adhoc = np.resize(self.adhoc, capacity)
+
+    def step(self) -> List[Tuple[Node, Tuple[int, int], Tuple[int, int]]]:
+        """
+        Plan one move for every node in a single batch.
+        Returns:
+          - List of tuples: (node, original_position, new_position), in the same form as World.step.
+        """
+        positions = self.positions[:len(self.nodes)]
+        destinations = self.plan()
+        old = zip(positions[:, 0].tolist(), positions[:, 1].tolist())
+        new = zip(destinations[:, 0].tolist(), destinations[:, 1].tolist())
+        return list(zip(self.nodes, old, new))
+
+    def plan(self):
+        """
+        Plan one move for every node in a single batch, without building any Python tuples.
+        Returns:
+          - An array of shape (node count, 2), where row i is the planned destination of nodes[i] (its own position if it can't move).
+        """
+        count = len(self.nodes)
+        width, height = self.world.width, self.world.height
+        if self._wall_cells is None:
+            walls = np.array(sorted(self.world._wall_cells), dtype=np.int64).reshape(-1, 2)
+            self._wall_cells = walls[:, 1] * width + walls[:, 0]
+        blocked = np.zeros((height, width), dtype=bool)
+        blocked.reshape(-1)[self._wall_cells] = True
+        destinations, probed = plan_moves(self.positions[:count], self.rng.random((count, len(OFFSETS))), blocked, width, height)
+        if metrics.enabled:
+            metrics.count("world.cells_probed", probed)
+        return destinations
+
+
+def plan_moves(positions, randoms, blocked, width: int, height: int, origin: Tuple[int, int] = (0, 0)):
+    """
+    The batch movement rules of VectorEngine.plan, for any set of nodes listed in creation order.
+    randoms holds one row of uniform draws per node, whose argsort is the order that node tries its adjacent cells in.
+    blocked is a boolean grid (indexed [y, x]) of the area starting at origin, True where there is a wall; every node's cell is marked in it too,
+    so it is modified. The area has to contain every cell the nodes could step to that is inside the width x height world.
+    Returns:
+      - The destinations array (as in VectorEngine.plan), and how many candidate cells were checked.
+    """
+    count = len(positions)
+    ox, oy = origin
+    box_width = blocked.shape[1]
+    blocked = blocked.reshape(-1)
+    offsets = np.array(OFFSETS, dtype=np.int64)
+
+    # Every wall and every node's current cell starts out blocked, exactly like the 'reserved' set in World.step.
+    blocked[(positions[:, 1] - oy) * box_width + positions[:, 0] - ox] = True
+
+    # Give every node its own random ordering of the 8 adjacent cells.
+    choices = np.argsort(randoms, axis=1)
+    destinations = positions.copy()
+    pending = np.arange(count) # Nodes that haven't found a move yet, in creation order.
+    probed = 0 # How many candidate cells were checked.
+    for round_index in range(len(OFFSETS)):
+        if pending.size == 0:
+            break
+        probed += pending.size
+        candidates = positions[pending] + offsets[choices[pending, round_index]]
+        inside = (
+            (candidates[:, 0] >= 0) & (candidates[:, 0] < width)
+            & (candidates[:, 1] >= 0) & (candidates[:, 1] < height)
+        )
+        claimants = pending[inside]
+        cells = (candidates[inside, 1] - oy) * box_width + candidates[inside, 0] - ox
+        free = ~blocked[cells]
+        claimants, cells = claimants[free], cells[free]
+        # When several nodes claim one cell, np.unique keeps the first claimant, which is the earliest created node.
+        won_cells, first = np.unique(cells, return_index=True)
+        winners = claimants[first]
+        destinations[winners, 0] = won_cells % box_width + ox
+        destinations[winners, 1] = won_cells // box_width + oy
+        blocked[won_cells] = True # Reserve the destination so no other node claims it this step.
+        still_pending = np.ones(pending.size, dtype=bool)
+        still_pending[np.searchsorted(pending, winners)] = False
+        pending = pending[still_pending]
+    # Nodes left pending had no valid move, so they stay in place (their destination is still their position).
+    return destinations, probed
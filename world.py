@@ -1,7 +1,23 @@
 import random
-from typing import List, Tuple
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
 from node import Node
+from eventlog import WARNING, log
+from metrics import metrics
 from network import Network
+from scheduler import EventScheduler, Timer
+from sharding import ShardedWorld
+from vector_engine import VectorEngine
+
+class NodeSpec(NamedTuple):
+    """Everything needed to create one node, for World.create_nodes."""
+    node_id: int
+    node_name: str
+    position: Tuple[int, int]
+    comm_range: int = 100
+    base_color: str = "#ff0000"
+    adhoc_enabled: bool = True
+
 
 class World:
     """
@@ -9,26 +25,79 @@ class World:
     Handles spatial logic: boundaries, collision, movement. Determines what objects "exist".
     """
 
-    def __init__(self, width: int, height: int):
+    def __init__(self, width: int, height: int, vectorized: bool = False, seed: Optional[int] = None):
         self.width: int = width
         self.height: int = height
         self.network: Network = Network()
+        # The random stream used for movement. Seeded worlds get their own stream, so runs are reproducible and independent of each other;
+        # unseeded worlds share the global random module, as before.
+        self.rng = random.Random(seed) if seed is not None else random
         self.walls: List[Tuple[int, int]] = []  # Each wall is a coordinate (x, y)
+        # Occupancy index, so collision checks don't have to scan every node and wall.
+        # It is kept in sync by create_node, add_wall, remove_node, move_node_random and apply_moves.
+        self._occupants: Dict[Tuple[int, int], Node] = self.network.nodes.cells  # Maps each occupied cell to the node standing on it (the network registry's cell index, shared).
+        self._wall_cells: Set[Tuple[int, int]] = set()  # The same coordinates as walls, as a set for constant time lookups.
+        # Optional NumPy engine that stores node state in arrays and plans every move in one batch (requires NumPy).
+        self.engine: Optional[VectorEngine] = VectorEngine(self, seed) if vectorized else None
 
     # This is a factory function for creating nodes. The World governs what exists.
     def create_node(self, node_id: int, node_name: str, position: tuple[int, int], comm_range: int = 100, base_color: str = "#ff0000") -> Node:
         """Factory method to create, register, and return a Node."""
         if self.is_occupied(position) or not self.in_bounds(position):
-            print(f"Failed to add node {node_name} at {position}: space occupied or out of bounds.")
+            if log.threshold <= WARNING:
+                log.emit(WARNING, "world.create_failed", f"Failed to add node {node_name} at {position}: space occupied or out of bounds.", node_id=node_id, position=position)
             return None
-        node = Node(node_id, node_name, position, comm_range, base_color)
-        self.network.add_node(node)
+        if self.engine is not None:
+            node = self.engine.create_node(node_id, node_name, position, comm_range, base_color)
+        else:
+            node = Node(node_id, node_name, position, comm_range, base_color)
+        self.network.add_node(node)  # Registering the node also indexes its cell.
         return node
 
+    def create_nodes(self, specs: Iterable[NodeSpec]) -> List[Node]:
+        """
+        Bulk version of create_node: validate a batch of specs against the occupancy index, then create and register every valid one at once.
+        Specs that are out of bounds, on a wall or an occupied cell (including one claimed earlier in the batch), or that reuse a node_id, are skipped
+        with the same warning as create_node. Neighbors aren't updated, so call network.update_neighbors once after the last batch.
+        """
+        nodes = []
+        claimed_ids = set()
+        occupants, wall_cells, registry = self._occupants, self._wall_cells, self.network.nodes
+        for spec in specs:
+            position = spec.position
+            if position in occupants or position in wall_cells or not self.in_bounds(position) or spec.node_id in claimed_ids or registry.get(spec.node_id) is not None:
+                if log.threshold <= WARNING:
+                    log.emit(WARNING, "world.create_failed", f"Failed to add node {spec.node_name} at {position}: space occupied, out of bounds or id taken.", node_id=spec.node_id, position=position)
+                continue
+            if self.engine is not None:
+                node = self.engine.create_node(spec.node_id, spec.node_name, position, spec.comm_range, spec.base_color)
+            else:
+                node = Node(spec.node_id, spec.node_name, position, spec.comm_range, spec.base_color)
+            if not spec.adhoc_enabled:
+                node.adhoc_enabled = False
+            occupants[position] = node # Claimed straight away, so later specs in the batch see it. Registering below indexes it again.
+            claimed_ids.add(spec.node_id)
+            nodes.append(node)
+        self.network.add_nodes(nodes)
+        return nodes
+
+    def remove_node(self, node: Node) -> None:
+        """Remove a node from the world and its network, freeing the cell it stood on."""
+        self._vacate(node)
+        if self.engine is not None and node in self.network.nodes:
+            self.engine.remove_node(node)
+        self.network.remove_node(node)
+
     def add_wall(self, pos: Tuple[int, int]):
         """Add a wall (impassable space) at given coordinate."""
-        if self.in_bounds(pos):
+        if self.in_bounds(pos) and pos not in self._wall_cells:
             self.walls.append(pos)
+            self._wall_cells.add(pos)
+            if self.engine is not None:
+                self.engine.walls_changed()
+            if self.network.link_model is not None:
+                self.network.link_model.wall_added(pos) # Forget cached line of sight across this cell,
+                self.network.links_may_have_changed(pos) # and have the next neighbor update rescan the nodes around it.
 
     def in_bounds(self, pos: Tuple[int, int]) -> bool:
         x, y = pos
@@ -36,12 +105,37 @@ class World:
 
     def is_occupied(self, pos: Tuple[int, int]) -> bool:
         """Check if the position is occupied by a node or a wall."""
-        for node in self.network.nodes:
-            if node.position == pos:
-                return True
-        if pos in self.walls:
-            return True
-        return False
+        if metrics.enabled:
+            metrics.count("world.occupancy_checks")
+        return pos in self._occupants or pos in self._wall_cells
+
+    def node_at(self, pos: Tuple[int, int]) -> Node:
+        """Return the node standing at the given position, or None if there isn't one."""
+        return self._occupants.get(pos)
+
+    def apply_moves(self, moves: Iterable[Tuple[Node, Tuple[int, int], Tuple[int, int]]]) -> None:
+        """
+        Commit moves planned by step() (or any (node, old_pos, new_pos) list), keeping the occupancy index in sync.
+        Positions are set directly rather than through Node.move, matching how a planned step is snapped into place.
+        """
+        occupants = self._occupants
+        for node, old_pos, new_pos in moves:
+            if old_pos != new_pos:
+                if occupants.get(old_pos) is node:
+                    del occupants[old_pos]
+                node._position = new_pos
+                occupants[new_pos] = node
+
+    def _vacate(self, node: Node) -> None:
+        """Free the cell a node is standing on in the occupancy index."""
+        if self._occupants.get(node.position) is node:
+            del self._occupants[node.position]
+
+    def rebuild_occupancy(self) -> None:
+        """Rebuild the occupancy index from scratch, e.g. after nodes were moved without going through the World."""
+        self.network.nodes.reindex_cells()
+        self._wall_cells.clear() # Refilled in place, as LineOfSight holds on to this set.
+        self._wall_cells.update(self.walls)
 
     def move_node_random(self, node: Node, max_step: int = 1):
         """Move node to a random adjacent square, avoiding collisions and walls."""
@@ -51,10 +145,12 @@ class World:
             for dy in [-max_step, 0, max_step]
             if not (dx == 0 and dy == 0)
         ]
-        random.shuffle(possible_moves)
+        self.rng.shuffle(possible_moves)
         for new_pos in possible_moves:
             if self.in_bounds(new_pos) and not self.is_occupied(new_pos):
+                self._vacate(node)
                 node.move(new_pos)
+                self._occupants[new_pos] = node
                 return
         # If no move possible, stay in place
 
@@ -66,12 +162,24 @@ class World:
           - No node moves into a wall or already occupied cell.
         Returns:
           - List of tuples: (node, original_position, new_position), used for GUI animation.
+        If the world was created with vectorized=True, the whole step is planned in one batch by the NumPy engine instead.
         """
+        started = time.perf_counter() if metrics.enabled else 0.0
+        if self.engine is not None:
+            moves = self.engine.step()
+        else:
+            moves = self._plan_moves()
+        if started:
+            metrics.observe("world.step", time.perf_counter() - started)
+        return moves
+
+    def _plan_moves(self) -> List[Tuple[Node, Tuple[int, int], Tuple[int, int]]]: # This function plans every node's move one node at a time (see step).
         moves = []  # Stores each node's planned move as (node, old_pos, new_pos).
 
         # 'reserved' keeps track of all cells that are either already occupied,
         # or claimed as a destination by another node for this step.
         reserved = set(node.position for node in self.network.nodes)  # Start with all current node locations.
+        probed = 0  # How many candidate cells were checked, for the metrics registry.
 
         for node in self.network.nodes:
             found = False  # Flag to check if a valid move is found for this node.
@@ -82,8 +190,8 @@ class World:
                 for dy in [-1, 0, 1]
                 if not (dx == 0 and dy == 0)
             ]
-            random.shuffle(possible_moves)  # Shuffle to ensure random movement.
-            for new_pos in possible_moves:
+            self.rng.shuffle(possible_moves)  # Shuffle to ensure random movement.
+            for tried, new_pos in enumerate(possible_moves, 1):
                 # Only allow a move if:
                 #   1. It's inside the world boundaries.
                 #   2. The cell isn't currently occupied (wall or node).
@@ -93,11 +201,54 @@ class World:
                     reserved.add(new_pos)  # Mark destination as reserved so no other node uses it this tick.
                     found = True
                     break  # No need to check further; we found a valid move.
+            probed += tried
             if not found:
                 # If no valid move, the node stays in place (can't overlap others or move into a wall).
                 moves.append((node, node.position, node.position))
                 reserved.add(node.position)  # Still reserve its current cell so others can't overlap it either.
+        if metrics.enabled:
+            metrics.count("world.cells_probed", probed)
         return moves
+
+    def shard(self, tiles: Tuple[int, int] = (2, 2)) -> ShardedWorld:
+        """
+        Split the grid into cols x rows tiles, each stepped by a worker process (see sharding.py). Only vectorized worlds can be sharded.
+        Use the result as a context manager: when it closes, this world holds the positions and neighbor lists it reached.
+        """
+        return ShardedWorld(self, tiles)
+
+    def schedule_steps(self, scheduler: EventScheduler, interval: float = 1.0) -> Timer:
+        """
+        Drive lock-step movement from an event scheduler: every interval, plan a step, apply it,
+        and update neighbors around the nodes that moved. Returns the timer, so it can be cancelled.
+        """
+        return scheduler.every(interval, self._scheduled_step)
+
+    def _scheduled_step(self) -> None:
+        moves = self.step()
+        self.apply_moves(moves)
+        self.network.update_neighbors_incremental(node for node, old_pos, new_pos in moves if old_pos != new_pos)
+
+    def schedule_mobility(self, scheduler: EventScheduler, interval: float = 1.0, nodes: Optional[Iterable[Node]] = None, jitter: float = 0.0) -> List[Timer]:
+        """
+        Give each node (all of them by default) its own recurring move event, every interval units of simulated time,
+        first firing after interval plus a random offset of up to jitter. Only nodes whose move is due do any work,
+        so sparse or slow-moving populations don't cost a loop over every node per tick. Returns the timers, so they can be cancelled.
+        """
+        timers = []
+        for node in list(self.network.nodes if nodes is None else nodes):
+            delay = interval + self.rng.uniform(0, jitter) if jitter else interval
+            timers.append(scheduler.every(interval, self._scheduled_move, node, delay=delay))
+        return timers
+
+    def _scheduled_move(self, node: Node) -> None:
+        if self._occupants.get(node.position) is not node:
+            return # The node has been removed from the world.
+        old_pos = node.position
+        self.move_node_random(node)
+        if node.position != old_pos:
+            self.network.update_neighbors_incremental([node])
+
     def display(self) -> None:
         """Text display of world state (for CLI/demo)."""
         print(f"World {self.width}x{self.height}")
@@ -1,4 +1,11 @@
+import time
 import tkinter as tk
+from typing import Union
+from bridge import RemoteWorld
+from eventlog import WARNING, LogEvent, log
+from metrics import metrics
+from recording import TraceReplay
+from renderer import WorldRenderer
 from world import World
 from tkinter import ttk
 
@@ -10,26 +17,49 @@ PICTO_BORDER  = "#aad0ee" # Primary border colour
 PICTO_BTN     = "#5db9ff" # Primary button colour
 PICTO_FONT    = "Helvetica" # Primary font
 
+FRAME_BUDGET_MS   = 16   # Target time between rendered frames (about 60 frames per second). Frames that run late are dropped, not queued.
+STEP_ANIMATION_MS = 400  # How long the movement of one step takes to animate (shortened automatically in run mode to fit the tick rate).
+FADE_ANIMATION_MS = 300  # How long a node takes to fade in or out of gray when adhoc mode is toggled.
+VIEW_SIZE         = 600  # The largest the canvas starts out, in pixels. Bigger worlds start zoomed out to fit, and can be zoomed and panned.
+ZOOM_STEP         = 1.25 # How much one mouse wheel notch zooms in or out.
+
 
 class WorldGUI:
-    def __init__(self, world: World):
-        self.world: World = world # A member storing the world instance that the GUI renders.
+    def __init__(self, world: Union[World, TraceReplay, RemoteWorld]):
+        self.world: Union[World, TraceReplay, RemoteWorld] = world # A member storing the world instance that the GUI renders (or a recorded trace it replays, or a simulation running in another process).
+        self.replay: bool = isinstance(world, TraceReplay) # Replays step through recorded ticks instead of simulating, and can't be edited.
+        self.remote: bool = isinstance(world, RemoteWorld) # Remote worlds are stepped and edited by their own process; the GUI only sends commands and draws the frames it publishes.
         self.root: tk.Tk = tk.Tk() # A member storing this worldGUI's instance of a tinker window. Used for modifying the tinker window's attributes.
         self.root.title("MANET Simulator") # Determines the GUI's title
         style = ttk.Style(self.root)
         style.configure('.', font=('Segoe UI', 11))
         self.root.geometry("1200x600")  # Determines the GUI's window size (width * length)
 
-        self.canvas: tk.Canvas = tk.Canvas(self.root, width=world.width * CELL_SIZE, height=world.height * CELL_SIZE, bg=PICTO_BG) # The 2D space where all the nodes reside. It must sit inside the tinker window (root). It has the width/height of the GUI's world * the size of each pixel respectively for scale.
+        view_width, view_height = min(world.width * CELL_SIZE, VIEW_SIZE), min(world.height * CELL_SIZE, VIEW_SIZE)
+        self.canvas: tk.Canvas = tk.Canvas(self.root, width=view_width, height=view_height, bg=PICTO_BG) # The 2D space where all the nodes reside. It must sit inside the tinker window (root). It is a viewport onto the world, as big as the world at CELL_SIZE pixels per cell, up to VIEW_SIZE.
         self.canvas.grid(row=0, column=0, rowspan=2, sticky="nsew") # We use a grid system to keep the panes organised, the play area (canvas) will always appear on top left (row 0, column 0) it occupies 2 rows vertically for formatting.
         self.canvas.bind("<Button-1>", self.on_canvas_click)
+        self.canvas.bind("<Configure>", self.on_canvas_resize)
+        self.canvas.bind("<MouseWheel>", lambda event: self.zoom_view(event, ZOOM_STEP if event.delta > 0 else 1 / ZOOM_STEP)) # Windows and macOS
+        self.canvas.bind("<Button-4>", lambda event: self.zoom_view(event, ZOOM_STEP)) # X11 wheel up
+        self.canvas.bind("<Button-5>", lambda event: self.zoom_view(event, 1 / ZOOM_STEP)) # X11 wheel down
+        for button in (2, 3): # Drag with the middle or right button to pan.
+            self.canvas.bind(f"<ButtonPress-{button}>", self.start_pan)
+            self.canvas.bind(f"<B{button}-Motion>", self.pan_view)
+        self._pan_from = None # The last pointer position of a pan drag.
+        self._view_job = None # The pending after() callback that re-culls the view after panning, or None.
 
         self.log_text: tk.Text = tk.Text(self.root, height=30, width=65, state='disabled', bg='#f7f7f7', font=("Consolas", 12)) # The pane with all of the log text
         self.log_text.grid(row=0, column=1, sticky="nsew") # Management for the log text pane's location on the grid.
 
+        self.controls: tk.Frame = tk.Frame(self.root, bg=PICTO_BG) # Holds the simulation controls underneath the log pane.
+        self.controls.grid(row=1, column=1, sticky='nsew')
+        self.controls.grid_columnconfigure(0, weight=1)
+        self.controls.grid_columnconfigure(1, weight=1)
+
         self.step_button: tk.Button = tk.Button(
-            self.root,
-            text="▶ SIMULATE STEP",
+            self.controls,
+            text="▶ NEXT TICK" if self.replay else "▶ SIMULATE STEP",
             command=self.do_step,
             bg=PICTO_BTN,
             fg="Black",
@@ -41,14 +71,72 @@ class WorldGUI:
             relief="flat",
             highlightthickness=0
         ) # A button for calling do_step on the passed in world object.
-        self.step_button.grid(row=1, column=1, sticky='ew') # Management for the log text pane's position on the grid, currently underneath the log text pane.
+        self.step_button.grid(row=0, column=0, sticky='ew') # Management for the step button's position in the controls, currently underneath the log text pane.
+
+        self.run_button: tk.Button = tk.Button(
+            self.controls,
+            text="▶▶ RUN",
+            command=self.toggle_run,
+            bg=PICTO_BTN,
+            fg="Black",
+            font=(PICTO_FONT, 16, "bold"),
+            width=2,
+            height=1,
+            activebackground=PICTO_BORDER,
+            bd=0,
+            relief="flat",
+            highlightthickness=0
+        ) # A button for stepping the world continuously, at the rate set by the slider below.
+        self.run_button.grid(row=0, column=1, sticky='ew')
+
+        self.ticks_per_second: float = 2.0 # How many steps per second run mode aims for, independent of the render rate.
+        self.rate_slider: tk.Scale = tk.Scale(
+            self.controls,
+            from_=1,
+            to=60,
+            orient="horizontal",
+            label="Steps per second (run mode)",
+            command=self.set_rate,
+            bg=PICTO_BG,
+            highlightthickness=0
+        )
+        self.rate_slider.set(self.ticks_per_second)
+        self.rate_slider.grid(row=1, column=0, columnspan=2, sticky='ew')
+
+        if self.replay:
+            self.tick_slider: tk.Scale = tk.Scale(
+                self.controls,
+                from_=0,
+                to=max(0, len(world) - 1),
+                orient="horizontal",
+                label="Tick (replay)",
+                command=lambda value: self.seek_tick(int(value)),
+                bg=PICTO_BG,
+                highlightthickness=0
+            ) # Scrubs through the trace. Only the ticks landed on are read from disk.
+            self.tick_slider.grid(row=2, column=0, columnspan=2, sticky='ew')
 
         self.root.grid_columnconfigure(0, weight=1) # Management for stretch as the window expands for column 0. (It will grow by the same amount as other columns with a weight of 1)
         self.root.grid_columnconfigure(1, weight=1) # Management for stretch as the window expands, for column 1. (It will grow by the same amount as other columns with a weight of 1)
         self.root.grid_rowconfigure(0, weight=1) # Management for stretch as the window expands, for row 0. (It will grow by the same amount as other rows with a weight of 1)
         self.root.grid_rowconfigure(1, weight=1) # Management for stretch as the window expands, for row 1. (It will grow by the same amount as other rows with a weight of 1)
-        self.step_count: int = 0 # A member to keep track of the current step (GUI end)
+        self.step_count: int = max(0, world.tick) if self.replay else 0 # A member to keep track of the current step (GUI end)
+        # Animations in flight, advanced by the frame loop from wall clock time (so late frames skip ahead instead of piling up).
+        self._moves_in_flight = {} # Maps a node to its (old_pos, new_pos, start_time, duration_ms).
+        self._fades_in_flight = {} # Maps a node to its (start_color, end_color, start_time, duration_ms).
+        self._frame_job = None # The pending after() callback for the next frame, or None while nothing is animating.
+        self.running: bool = False # Whether run mode is stepping the world continuously.
+        self._run_job = None # The pending after() callback for the next run mode step.
+        self._pending_toggles = {} # Remote mode: nodes whose adhoc toggle was sent, mapped to the flag they should end up with.
+        # Show simulation warnings and errors (e.g. undeliverable messages) in the log pane. Routine message events aren't shown,
+        # as they carry message content and the pane only ever shows E2EE-style summaries.
+        log.subscribe(self.on_log_event, WARNING)
+        # Owns every canvas item, and keeps link lines in sync with the network's link changes. Zoomed far out, it draws a heatmap image instead.
+        self.renderer: WorldRenderer = WorldRenderer(self.canvas, world, CELL_SIZE, image_factory=lambda width, height: tk.PhotoImage(master=self.root, width=width, height=height))
+        self.renderer.set_view(zoom=self.renderer.fit(view_width, view_height), size=(view_width, view_height))
         self.draw_world() # A member for keeping track of the current world, this member gets updated every time a change is made to the world.
+        if self.remote:
+            self._poll_job = self.root.after(FRAME_BUDGET_MS, self._poll_remote) # Picks up the simulation's frames and events, once per frame.
 
     def log(self, content) -> None: # This function is used for adding a content to the log pane.
         self.log_text.config(state='normal') # Content is initially editable
@@ -57,90 +145,190 @@ class WorldGUI:
         self.log_text.see('end')
 
 
-    def draw_world(self, animated: bool = False) -> None: # This function is used for rendering all of the objects on the play area (canvas), currently including nodes and walls.
-        self.canvas.delete('all') # We start by clearing out the canvas (graphics, not the actual objects)
+    def on_log_event(self, event: LogEvent) -> None: # This function is the log pane's subscription to the simulation's event log.
+        self.log(event.message)
 
-        # Draw links between neighbors, representing devices that are in range of each other.
-        seen_pairs = set() # Collects pairs of nodes that have already had links drawn between each other.
-        for node in self.world.network.nodes:
-            x1, y1 = node.display_pos if animated else node.position
-            cx1 = x1 * CELL_SIZE + CELL_SIZE // 2
-            cy1 = y1 * CELL_SIZE + CELL_SIZE // 2
-            for neighbor in node.neighbors:
-                # To avoid drawing each connection twice:
-                pair = tuple(sorted([id(node), id(neighbor)]))
-                if pair in seen_pairs:
-                    continue
-                seen_pairs.add(pair)
-                x2, y2 = neighbor.display_pos if animated else neighbor.position
-                cx2 = x2 * CELL_SIZE + CELL_SIZE // 2
-                cy2 = y2 * CELL_SIZE + CELL_SIZE // 2
-                self.canvas.create_line(
-                    cx1, cy1, cx2, cy2,
-                    fill="#3399FF", width=5
-                )
-        # Draw walls (if any)
-        for wx, wy in self.world.walls: # For the world's x-axis and y-axis of each of the world's walls
-            x1, y1 = wx * CELL_SIZE, wy * CELL_SIZE # Render the respective dimensions to scale with the size of each cell.
-            self.canvas.create_rectangle(x1, y1, x1 + CELL_SIZE, y1 + CELL_SIZE, fill='black') # Render walls as black squares based on the above dimensions.
-        # Draw nodes
-        colors = ['red', 'blue', 'green', 'orange', 'purple'] # A list of the available colors for nodes.
-        for index, node in enumerate(self.world.network.nodes): # This loop takes the maps colors to nodes by their respective index. (index 0 in the node list will always be red)
-            if animated:
-                x, y = node.display_pos
-            else:
-                x, y = node.position
-            x1, y1 = x * CELL_SIZE, y * CELL_SIZE
-            color = node.display_color if node.adhoc_enabled else "#808080"
-            self.canvas.create_oval(x1 + 5, y1 + 5, x1 + CELL_SIZE - 5, y1 + CELL_SIZE - 5, fill=color)
-            self.canvas.create_text(x1 + CELL_SIZE // 2, y1 + CELL_SIZE // 2, text=node.node_name[:3], fill='white',
-                                    font=('Arial', 12, 'bold'))
+    def draw_world(self, animated: bool = False, nodes=None) -> None: # This function is used for rendering all of the objects on the play area (canvas), currently including nodes, links and walls.
+        # Canvas items are created once and then only moved or recoloured when something changes (see WorldRenderer).
+        started = time.perf_counter() if metrics.enabled else 0.0
+        if nodes is None:
+            self.renderer.sync(animated) # Bring everything in line with the world, touching only items that changed.
+        else:
+            self.renderer.update_nodes(nodes, animated) # Only redraw the given nodes (and their links), e.g. the ones that are moving.
+        if started:
+            metrics.observe("draw", time.perf_counter() - started)
 
     def do_step(self) -> None: # This function is used for simulating the flow of time in the simulation.
-        self.step_count += 1  # Everytime we call this method, increase the step count by 1. (Used for the GUI)
-        moves = self.world.step()  # List of (node, old_pos, new_pos) for all nodes gets stored in a variable, moves
-        steps = 30  # Int variable for the amount of animation frames for a step (30)
-        delay = 1  # Int variable delay between frames (1).
-
-        # Set display_pos to old_pos for all nodes
-        for node, old_pos, new_pos in moves:
-            node.display_pos = old_pos
-
-        # Animate all nodes moving together
-        for frame in range(1, steps + 1):
+        if self.remote:
+            self.world.request_step()  # The simulation process steps; its frame is animated when _poll_remote picks it up
+            return
+        self.finish_animations()  # A new step always starts from settled positions, so snap anything still animating into place
+        if self.replay:
+            if self.world.tick + 1 >= len(self.world):
+                if self.running:
+                    self.toggle_run()  # The trace has ended
+                return
+            moves = self.world.seek(self.world.tick + 1)  # Positions and links are set to the next recorded tick (the renderer picks up the link changes)
+            self.step_count = self.world.tick
+            self.tick_slider.set(self.world.tick)
+        else:
+            self.step_count += 1  # Everytime we call this method, increase the step count by 1. (Used for the GUI)
+            moves = self.world.step()  # List of (node, old_pos, new_pos) for all nodes gets stored in a variable, moves
+            moves = [(node, old_pos, new_pos) for node, old_pos, new_pos in moves if old_pos != new_pos] # Nodes that stay put don't need animating.
+            moving = [node for node, old_pos, new_pos in moves]
+
+            # The simulation moves on straight away; the animation below only catches the display up with it.
+            self.world.apply_moves(moves)  # Commits logical positions and keeps the world's occupancy index in sync
+            self.world.network.update_neighbors_incremental(moving) # Only nodes that actually moved need their neighbors recomputed (the renderer picks up the link changes).
+        self.show_step(moves)
+
+    def show_step(self, moves) -> None: # This function animates a step's moves (node, old_pos, new_pos) and logs it, whichever way the step was made.
+        moving = [node for node, old_pos, new_pos in moves]
+        # In run mode a step's animation must finish before the next tick, however fast the ticks are.
+        duration = STEP_ANIMATION_MS if not self.running else min(STEP_ANIMATION_MS, 1000 / self.ticks_per_second)
+        now = time.perf_counter()
+        renderer = self.renderer
+        if not renderer.aggregated:  # A heatmap just jumps to the new tick
             for node, old_pos, new_pos in moves:
-                interp_x = old_pos[0] + (new_pos[0] - old_pos[0]) * frame / steps
-                interp_y = old_pos[1] + (new_pos[1] - old_pos[1]) * frame / steps
-                node.display_pos = (interp_x, interp_y)
-            self.draw_world(animated=True)
-            self.root.update()
-            self.root.after(delay)
-
-        # Snap display and logical positions to final value
-        for node, old_pos, new_pos in moves:
-            node.display_pos = new_pos
-            node._position = new_pos
-
-        self.world.network.update_neighbors()
-        self.draw_world(animated=False)
+                if renderer.in_view(old_pos) or renderer.in_view(new_pos):  # Moves off screen have nothing to animate
+                    renderer.display_positions[node] = old_pos  # Start each moving node from where it was
+                    self._moves_in_flight[node] = (old_pos, new_pos, now, duration)
+        self.draw_world(animated=True)
+        self.start_animating()
+
+        if self.running:
+            self.log(f"==== Step {self.step_count}: {len(moving)} nodes moved ====") # One line per tick, so run mode doesn't flood the log pane.
+            return
         self.log(f"\n==== Step {self.step_count} ====")
         for node in self.world.network.nodes:
             neighbors = [n.node_name for n in node.neighbors]
             self.log(f"{node.node_name} at {node.position} neighbors: {neighbors}")
 
-    def animate_node_move(self, node, new_pos, steps=10, delay=20):
-        x0, y0 = node.display_pos
-        x1, y1 = new_pos
-        for s in range(1, steps + 1):
-            interp_x = x0 + (x1 - x0) * s / steps
-            interp_y = y0 + (y1 - y0) * s / steps
-            node.display_pos = (interp_x, interp_y)
-            self.draw_world(animated=True)  # New: pass flag so node draws at display_pos
-            self.root.update()
-            self.root.after(delay)  # 1 ms delay per frame
-        node.display_pos = new_pos  # Snap to grid after anim
-        node._position = new_pos  # Snap logic position
-        self.draw_world(animated=False)
+    def on_canvas_resize(self, event) -> None: # This function keeps the viewport the size of the canvas as the window is resized.
+        if self.renderer.view_size != (event.width, event.height):
+            self.renderer.set_view(size=(event.width, event.height))
+            self.draw_world(animated=True)
+
+    def zoom_view(self, event, factor: float) -> None: # This function zooms the view in or out around the pointer.
+        self.renderer.zoom_at(event.x, event.y, factor)
+        self.draw_world(animated=True)
+
+    def start_pan(self, event) -> None:
+        self._pan_from = (event.x, event.y)
+
+    def pan_view(self, event) -> None: # This function drags the view along with the pointer. Items shift straight away; culling catches up once per frame.
+        if self._pan_from is None:
+            return
+        self.renderer.pan(event.x - self._pan_from[0], event.y - self._pan_from[1])
+        self._pan_from = (event.x, event.y)
+        if self._view_job is None:
+            self._view_job = self.root.after(FRAME_BUDGET_MS, self._sync_view)
+
+    def _sync_view(self) -> None:
+        self._view_job = None
+        self.draw_world(animated=True)
+
+    def seek_tick(self, tick: int) -> None: # This function jumps a replay straight to a recorded tick, without animating.
+        if tick == self.world.tick:
+            return
+        self.finish_animations()
+        self.world.seek(tick)
+        self.step_count = tick
+        self.draw_world()
+
+    def toggle_run(self) -> None: # This function starts or stops run mode, which steps the world continuously.
+        self.running = not self.running
+        self.run_button.config(text="■ STOP" if self.running else "▶▶ RUN")
+        if self.remote:
+            self.world.set_running(self.running, self.ticks_per_second)  # The simulation process keeps its own tick rate
+        elif self.running:
+            self._run_tick()
+        elif self._run_job is not None:
+            self.root.after_cancel(self._run_job)
+            self._run_job = None
+
+    def set_rate(self, value) -> None: # This function is the rate slider's callback.
+        self.ticks_per_second = float(value)
+        if self.remote:
+            self.world.set_rate(self.ticks_per_second)
+
+    def _poll_remote(self) -> None: # This function shows whatever the simulation process has published since the last frame, then schedules the next poll.
+        started = time.perf_counter()
+        self.world.poll()  # Re-emits the simulation's events here (so warnings reach the log pane) and answers inbox requests
+        tick = self.world.tick
+        moves = self.world.refresh()  # Diffs the latest complete frame against the last one in place in shared memory, touching only changed nodes and links; the renderer picks up the link changes
+        if moves is not None:
+            if self.world.tick != tick:
+                self.finish_animations()
+                self.step_count = self.world.tick
+                self.show_step(moves)
+            else:
+                self.draw_world()  # The same tick republished after a toggle
+            for node, enabled in list(self._pending_toggles.items()):
+                if node.adhoc_enabled == enabled:
+                    del self._pending_toggles[node]
+                    self.animate_node_color(node, fade_to_gray=not enabled)
+                    self.log_adhoc_status(node)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._poll_job = self.root.after(max(1, int(FRAME_BUDGET_MS - elapsed_ms)), self._poll_remote)
+
+    def _run_tick(self) -> None: # This function is one run mode tick: step the world, then schedule the next tick to keep the target rate.
+        started = time.perf_counter()
+        self.do_step()
+        if not self.running:
+            return  # The step ended run mode (a replay reached its last tick)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        period_ms = 1000 / self.ticks_per_second
+        self._run_job = self.root.after(max(1, int(period_ms - elapsed_ms)), self._run_tick) # A slow tick eats into the wait before the next one.
+
+    def start_animating(self) -> None: # This function starts the frame loop, if it isn't already running.
+        if self._frame_job is None:
+            self._frame_job = self.root.after(FRAME_BUDGET_MS, self._render_frame)
+
+    def _render_frame(self) -> None: # This function draws one animation frame, then schedules the next one while anything is still animating.
+        started = time.perf_counter()
+        self._advance_animations(started)
+        if self._moves_in_flight or self._fades_in_flight:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._frame_job = self.root.after(max(1, int(FRAME_BUDGET_MS - elapsed_ms)), self._render_frame)
+        else:
+            self._frame_job = None  # Nothing left to animate, so the loop stops until the next animation starts
+
+    def _advance_animations(self, now: float) -> None: # This function moves every animation to where it should be at this moment.
+        display_positions = self.renderer.display_positions
+        display_colors = self.renderer.display_colors
+        moved = []
+        for node, (old_pos, new_pos, started, duration) in list(self._moves_in_flight.items()):
+            t = min(1.0, (now - started) * 1000 / duration) if duration > 0 else 1.0
+            if t >= 1.0:
+                del self._moves_in_flight[node]
+                display_positions.pop(node, None)  # A settled node is drawn at its own position again
+            else:
+                display_positions[node] = (old_pos[0] + (new_pos[0] - old_pos[0]) * t, old_pos[1] + (new_pos[1] - old_pos[1]) * t)
+            moved.append(node)
+        faded = []
+        for node, (start_color, end_color, started, duration) in list(self._fades_in_flight.items()):
+            t = min(1.0, (now - started) * 1000 / duration) if duration > 0 else 1.0
+            color = self.interpolate_color(start_color, end_color, t)
+            if t >= 1.0:
+                del self._fades_in_flight[node]
+            if color == node.base_color.lower():  # Back to its own colour, so nothing needs remembering
+                display_colors.pop(node, None)
+            else:
+                display_colors[node] = color
+            if node not in self._moves_in_flight:
+                faded.append(node)
+        self.draw_world(animated=True, nodes=moved)
+        self.draw_world(nodes=[node for node in faded if node not in moved])
+
+    def finish_animations(self) -> None: # This function snaps every animation still in flight to its final frame.
+        self._advance_animations(float("inf"))
+
+    def animate_node_move(self, node, new_pos, duration=STEP_ANIMATION_MS): # This function moves a single node, animating it without blocking the window.
+        old_pos = self.renderer.display_pos(node)
+        self.world.apply_moves([(node, node.position, new_pos)])  # Snap logic position straight away, the display catches up
+        self._moves_in_flight[node] = (old_pos, new_pos, time.perf_counter(), duration)
+        self.start_animating()
 
     def interpolate_color(self, color1: str, color2: str, t: float) -> str:
         """
@@ -152,28 +340,20 @@ class WorldGUI:
         interp = [int(c1[i] + (c2[i] - c1[i]) * t) for i in range(3)]
         return f'#{interp[0]:02x}{interp[1]:02x}{interp[2]:02x}'
 
-    def animate_node_color(self, node, fade_to_gray: bool, steps=15, delay=20): # This function is for fading between gray or the node's assigned color.
-        start_color = node.display_color
+    def animate_node_color(self, node, fade_to_gray: bool, duration=FADE_ANIMATION_MS): # This function is for fading between gray or the node's assigned color (without blocking the window).
+        start_color = self.renderer.display_color(node)
         end_color = '#808080' if fade_to_gray else node.base_color
-        for i in range(steps + 1):
-            t = i / steps
-            color = self.interpolate_color(start_color, end_color, t)
-            node.display_color = color
-            self.draw_world()
-            self.root.update()
-            self.root.after(delay)
-        node.display_color = end_color
-        self.draw_world()
+        self._fades_in_flight[node] = (start_color, end_color, time.perf_counter(), duration)
+        self.start_animating()
 
     def on_canvas_click(self, event):
+        if self.replay:
+            return  # A recorded run can be watched, but not changed
         # Convert click to cell coords
-        x = event.x // CELL_SIZE
-        y = event.y // CELL_SIZE
-        for node in self.world.network.nodes:
-            nx, ny = node.position
-            if abs(nx - x) < 1 and abs(ny - y) < 1:  # Click is in node cell
-                self.show_node_menu(event, node)
-                break
+        x, y = self.renderer.to_cell(event.x, event.y)
+        node = self.world.network.nodes.at((x, y))  # Constant time lookup of the node standing in the clicked cell
+        if node is not None:
+            self.show_node_menu(event, node)
 
     def show_node_menu(self, event, node): # This function is for rendering a drop down on the click of a node.
         menu = tk.Menu(self.root, tearoff=0, font=(PICTO_FONT, 11))
@@ -186,11 +366,18 @@ class WorldGUI:
         menu.tk_popup(event.x_root, event.y_root)
 
     def toggle_adhoc_status(self, node): # This function is for toggling between a node's adhoc participation status.
+        if self.remote:
+            self._pending_toggles[node] = not self._pending_toggles.get(node, node.adhoc_enabled)
+            self.world.toggle_adhoc(node)  # The fade and log follow once a frame shows the new status
+            return
         old_status = node.adhoc_enabled # First, store the original status
         node.adhoc_enabled = not old_status # If the status was false
         self.animate_node_color(node, fade_to_gray=not node.adhoc_enabled) # Call the fade animation to for gray
-        self.world.network.update_neighbors() # Update the world's neighbors
+        self.world.network.update_neighbors_incremental([node]) # Update the neighbors around the toggled node
         self.draw_world() # Update the GUI representation.
+        self.log_adhoc_status(node)
+
+    def log_adhoc_status(self, node): # This function logs a node's new adhoc status, followed by every node's neighbors.
         # Compose new log message
         state = "enabled" if node.adhoc_enabled else "disabled"
         self.log(f"\n{node.node_name} {state} ad-hoc mode, updating neighbors...\n")
@@ -199,9 +386,13 @@ class WorldGUI:
             neighbors = [n.node_name for n in node.neighbors]
             self.log(f"{node.node_name} at {node.position} neighbors: {neighbors}")
 
-    def show_inbox(self, node):
+    def show_inbox(self, node, messages=None):
+        if self.remote and messages is None:
+            self.world.request_inbox(node, lambda messages: self.show_inbox(node, messages))  # The inbox lives in the simulation process, so the window opens once it replies
+            return
         # Retrieve the messages stored on the node (these are tuples of sender_id and text)
-        messages = node._messages
+        if messages is None:
+            messages = node.messages
 
         # Create a new window (child of root) to display the inbox
         win = tk.Toplevel(self.root)
@@ -247,8 +438,8 @@ class WorldGUI:
             # For each message in the inbox...
             for sender_id, text in messages:
                 # Look up sender's name using sender_id for display (fallback to ID if not found)
-                sender_name = next((n.node_name for n in self.world.network.nodes if n.node_id == sender_id),
-                                   f"ID {sender_id}")
+                sender = self.world.network.nodes.get(sender_id)
+                sender_name = sender.node_name if sender is not None else f"ID {sender_id}"
                 # Select color for bubble: own messages are blue, others are white
                 bubble_color = PICTO_BUBBLE if sender_name == node.node_name else PICTO_BUBBLE2
                 # Messages you sent are right-aligned, others left (classic chat look)
@@ -349,7 +540,10 @@ class WorldGUI:
             msg = msg_entry.get().strip()
             # Only send if both a recipient was found and the message isn't empty
             if recipient and msg:
-                self.world.network.send_message(node, recipient, msg)  # Passes message through the network
+                if self.remote:
+                    self.world.send_message(node, recipient, msg)  # Delivered by the simulation process's network
+                else:
+                    self.world.network.send_message(node, recipient, msg)  # Passes message through the network
                 # Log the event as an E2EE-style delivery (no message content)
                 self.log(
                     f"[SECURE MESSAGE] {node.node_name} → {recipient.node_name}: Message sent securely using E2EE protocol.")
@@ -376,6 +570,10 @@ class WorldGUI:
 
 
     def run(self) -> None: # Run the GUI, loop rendering until closed.
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            if self.remote:
+                self.world.close() # Stop the simulation process along with the window.
 
 